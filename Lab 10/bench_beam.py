@@ -0,0 +1,55 @@
+import argparse
+import time
+import zlib
+from pathlib import Path
+
+from main import read_tagged_corpus, train_hmm, make_folds, viterbi_decode_np, viterbi_decode_beam
+
+# accuracy vs speed of beam / tag filtered decoding on a held out fold, exact decoding as reference
+# usage: python bench_beam.py wsj_pos_tagged_en.txt --beams 1 2 4 8 16 32
+# --split-tags 8 splits every tag into 8 sub tags (picked from the word) to fake a fine grained tagset
+
+parser = argparse.ArgumentParser()
+parser.add_argument("corpus", nargs="?", default="wsj_pos_tagged_en.txt")
+parser.add_argument("--beams", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+parser.add_argument("--sentences", type=int, default=2000, help="held out sentences to decode")
+parser.add_argument("--split-tags", type=int, default=1)
+args = parser.parse_args()
+
+sentences = read_tagged_corpus(Path(args.corpus))
+if args.split_tags > 1:
+    sentences = [
+        (words, [f"{tag}-{zlib.crc32(word.encode()) % args.split_tags}" for word, tag in zip(words, tags)])
+        for words, tags in sentences
+    ]
+folds = make_folds(sentences, k=5)
+params = train_hmm([s for fold in folds[1:] for s in fold])
+test_set = folds[0][:args.sentences]
+num_tokens = sum(len(words) for words, _ in test_set)
+
+
+def run(decode):
+    start = time.perf_counter()
+    predicted = [decode(words) for words, _ in test_set]
+    elapsed = time.perf_counter() - start
+    correct = sum(p == g for pred, (_, gold) in zip(predicted, test_set) for p, g in zip(pred, gold))
+    return predicted, correct / num_tokens, len(test_set) / elapsed
+
+
+exact, exact_acc, exact_speed = run(lambda words: viterbi_decode_np(words, params))
+print(f"{len(test_set)} sentences, {num_tokens} tokens, {len(params['tags'])} tags")
+print(f"\n{'beam':>6} {'filter':>7} {'accuracy':>9} {'sentences/s':>12} {'speedup':>8} {'same as exact':>14}")
+print(f"{'exact':>6} {'-':>7} {exact_acc:>9.4f} {exact_speed:>12.0f} {1:>7.2f}x {'100.00%':>14}")
+
+for filter_tags in (False, True):
+    for beam_width in [None] + args.beams:
+        if beam_width is None and not filter_tags:
+            continue
+        predicted, acc, speed = run(lambda words: viterbi_decode_beam(words, params, beam_width, filter_tags))
+        same = sum(p == e for p, e in zip(predicted, exact)) / len(exact)
+        label = "all" if beam_width is None else beam_width
+        print(f"{label:>6} {str(filter_tags):>7} {acc:>9.4f} {speed:>12.0f} {speed / exact_speed:>7.2f}x {same:>13.2%}")
+
+# a beam as wide as the tagset without the filter is the exact search
+wide = [viterbi_decode_beam(words, params, beam_width=len(params["tags"])) for words, _ in test_set]
+print(f"\nbeam={len(params['tags'])} without filter matches exact: {wide == exact}")
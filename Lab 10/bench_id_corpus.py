@@ -0,0 +1,63 @@
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# load time and peak RSS of the text corpus vs the integer id corpus, each in its own process
+# usage: python bench_id_corpus.py wsj_pos_tagged_en.txt --out wsj_ids
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_child(mode, path):
+    start = time.perf_counter()
+    if mode == "text":
+        from main import read_tagged_corpus, train_hmm
+        sentences = read_tagged_corpus(Path(path))
+        load_time = time.perf_counter() - start
+        params = train_hmm(sentences)
+    else:
+        from id_corpus import load_id_corpus, train_hmm_ids
+        corpus = load_id_corpus(path)
+        load_time = time.perf_counter() - start
+        params = train_hmm_ids(corpus, range(len(corpus["offsets"]) - 1))
+    total_time = time.perf_counter() - start
+    print(f"{load_time:.3f} {total_time:.3f} {peak_rss_mb():.1f} {len(params['tags'])}")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        run_child(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("corpus", nargs="?", default="wsj_pos_tagged_en.txt")
+    parser.add_argument("--out", default="wsj_ids", help="directory of the converted corpus")
+    parser.add_argument("--skip-check", action="store_true", help="don't compare the cross validation metrics")
+    args = parser.parse_args()
+
+    from id_corpus import convert_tagged_corpus, load_id_corpus, cross_validate_ids
+
+    start = time.perf_counter()
+    convert_tagged_corpus(args.corpus, args.out)
+    print(f"conversion: {time.perf_counter() - start:.2f}s (one time)")
+    text_mb = os.path.getsize(args.corpus) / 1e6
+    ids_mb = sum(f.stat().st_size for f in Path(args.out).iterdir()) / 1e6
+    print(f"size on disk: text {text_mb:.1f} MB, ids {ids_mb:.1f} MB")
+
+    print(f"\n{'path':>6} {'load (s)':>9} {'load+train (s)':>15} {'peak RSS MB':>12}")
+    for mode, target in (("text", args.corpus), ("ids", args.out)):
+        out = subprocess.run([sys.executable, __file__, "--child", mode, target],
+                             capture_output=True, text=True, check=True).stdout.split()
+        print(f"{mode:>6} {float(out[0]):>9.3f} {float(out[1]):>15.3f} {float(out[2]):>12.1f}")
+
+    if not args.skip_check:
+        from main import read_tagged_corpus, cross_validate
+
+        expected = cross_validate(read_tagged_corpus(Path(args.corpus)), k=5)
+        same = cross_validate_ids(load_id_corpus(args.out), k=5) == expected
+        print(f"\nsame fold metrics: {same}")
@@ -0,0 +1,38 @@
+import argparse
+import time
+from pathlib import Path
+
+from main import read_tagged_corpus, make_folds, train_hmm, viterbi_decode, viterbi_decode_np
+
+# dict based viterbi_decode against the numpy decoder on the cross validation folds
+# usage: python bench_viterbi.py wsj_pos_tagged_en.txt --folds 5
+
+parser = argparse.ArgumentParser()
+parser.add_argument("corpus", nargs="?", default="wsj_pos_tagged_en.txt")
+parser.add_argument("--folds", type=int, default=5)
+args = parser.parse_args()
+
+sentences = read_tagged_corpus(Path(args.corpus))
+folds = make_folds(sentences, k=args.folds)
+
+total_old = total_new = 0.0
+for fold_idx in range(args.folds):
+    test_set = [words for words, _ in folds[fold_idx] if words]
+    train_set = [s for i, fold in enumerate(folds) if i != fold_idx for s in fold]
+    params = train_hmm(train_set)
+
+    start = time.perf_counter()
+    old = [viterbi_decode(words, params) for words in test_set]
+    old_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new = [viterbi_decode_np(words, params) for words in test_set]
+    new_time = time.perf_counter() - start
+
+    total_old += old_time
+    total_new += new_time
+    same = old == new
+    print(f"Fold {fold_idx + 1}: {len(test_set)} sentences, {len(params['tags'])} tags, "
+          f"dict {old_time:.2f}s, numpy {new_time:.2f}s, {old_time / new_time:.1f}x, identical={same}")
+
+print(f"\nTotal: dict {total_old:.2f}s, numpy {total_new:.2f}s, speedup {total_old / total_new:.1f}x")
@@ -0,0 +1,30 @@
+import argparse
+import time
+from pathlib import Path
+
+from main import read_tagged_corpus, train_hmm, viterbi_decode_np, viterbi_decode_batch
+
+# sentences/sec of viterbi_decode_batch for a few batch sizes, checked against viterbi_decode_np
+# usage: python bench_viterbi_batch.py wsj_pos_tagged_en.txt --batch-sizes 1 8 32 64 128 512
+
+parser = argparse.ArgumentParser()
+parser.add_argument("corpus", nargs="?", default="wsj_pos_tagged_en.txt")
+parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 64, 128, 512])
+args = parser.parse_args()
+
+sentences = read_tagged_corpus(Path(args.corpus))
+params = train_hmm(sentences)
+all_words = [words for words, _ in sentences]
+
+start = time.perf_counter()
+expected = [viterbi_decode_np(words, params) for words in all_words]
+elapsed = time.perf_counter() - start
+print(f"{len(all_words)} sentences, {len(params['tags'])} tags")
+print(f"viterbi_decode_np one by one: {len(all_words) / elapsed:.0f} sentences/s")
+
+print(f"\n{'batch':>6} {'sentences/s':>12} {'identical':>10}")
+for batch_size in args.batch_sizes:
+    start = time.perf_counter()
+    predicted = viterbi_decode_batch(all_words, params, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"{batch_size:>6} {len(all_words) / elapsed:>12.0f} {str(predicted == expected):>10}")
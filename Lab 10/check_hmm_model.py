@@ -0,0 +1,42 @@
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from hmm_model import load_hmm, save_hmm
+from main import read_tagged_corpus, train_hmm, make_folds, viterbi_decode_np, viterbi_decode_batch
+
+# round trip check: a saved and reloaded model must decode exactly like the trained one
+# usage: python check_hmm_model.py wsj_pos_tagged_en.txt
+
+parser = argparse.ArgumentParser()
+parser.add_argument("corpus", nargs="?", default="wsj_pos_tagged_en.txt")
+args = parser.parse_args()
+
+sentences = read_tagged_corpus(Path(args.corpus))
+# train on 4 folds so the held out fold has unknown words too
+folds = make_folds(sentences, k=5)
+params = train_hmm([s for fold in folds[1:] for s in fold])
+test_words = [words for words, _ in folds[0]]
+# a few made up words and an empty sentence
+test_words += [["zzqx", "qqzz"], []]
+
+expected = viterbi_decode_batch(test_words, params)
+
+ok = True
+with tempfile.TemporaryDirectory() as tmp:
+    save_hmm(params, tmp)
+    size_mb = sum(f.stat().st_size for f in Path(tmp).iterdir()) / 1e6
+    for mmap in (True, False):
+        start = time.perf_counter()
+        loaded = load_hmm(tmp, mmap=mmap)
+        load_ms = (time.perf_counter() - start) * 1000
+        batch_same = viterbi_decode_batch(test_words, loaded) == expected
+        single_same = all(viterbi_decode_np(words, loaded) == viterbi_decode_np(words, params)
+                          for words in test_words[:200])
+        ok = ok and batch_same and single_same
+        print(f"mmap={mmap}: load {load_ms:.1f} ms, identical tags: batch {batch_same}, single {single_same}")
+
+print(f"model size on disk: {size_mb:.1f} MB, {len(params['tags'])} tags, {len(params['word_index'])} words")
+print("round trip OK" if ok else "round trip FAILED")
+raise SystemExit(0 if ok else 1)
@@ -0,0 +1,35 @@
+import os
+
+import numpy as np
+
+MATRICES = ("log_start", "log_end", "log_transition_matrix", "log_emission_matrix")
+
+
+def save_hmm(params, model_dir):
+    """
+    Save the dense part of a trained HMM so it can be used without the corpus.
+
+    Writes tags.txt and words.txt (one per line, line number = row/column id) and one
+    .npy file per log matrix. The nested log dicts are not saved, the decoders only
+    need the matrices and word_index.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    words = sorted(params["word_index"], key=params["word_index"].get)
+    for name, entries in (("tags.txt", params["tags"]), ("words.txt", words)):
+        with open(os.path.join(model_dir, name), "w", encoding="utf-8") as f:
+            f.write("\n".join(entries))
+    for name in MATRICES:
+        np.save(os.path.join(model_dir, name + ".npy"), params[name])
+
+
+def load_hmm(model_dir, mmap=True):
+    # params for viterbi_decode_np / viterbi_decode_batch, matrices are memory-mapped
+    mode = "r" if mmap else None
+    params = {name: np.load(os.path.join(model_dir, name + ".npy"), mmap_mode=mode) for name in MATRICES}
+    with open(os.path.join(model_dir, "tags.txt"), encoding="utf-8") as f:
+        params["tags"] = f.read().split("\n")
+    with open(os.path.join(model_dir, "words.txt"), encoding="utf-8") as f:
+        text = f.read()
+    words = text.split("\n") if text else []
+    params["word_index"] = {word: i for i, word in enumerate(words)}
+    return params
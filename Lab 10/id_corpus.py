@@ -0,0 +1,149 @@
+import math
+import os
+import random
+from array import array
+
+import numpy as np
+
+from main import iter_tagged_sentences, evaluate, viterbi_decode_ids, BATCH_SIZE
+
+
+def convert_tagged_corpus(path, out_dir):
+    """
+    One time conversion of a word/TAG text corpus into integer ids.
+
+    Writes words.txt and tags.txt (one entry per line, id = line number, ids given in
+    order of first occurrence) and three .npy arrays: word_ids and tag_ids for every
+    token, and offsets where sentence s is tokens offsets[s]:offsets[s + 1].
+    """
+    word_index = {}
+    tag_index = {}
+    word_ids = array("i")
+    tag_ids = array("i")
+    offsets = array("q", [0])
+    for words, tags in iter_tagged_sentences(path):
+        for word, tag in zip(words, tags):
+            word_ids.append(word_index.setdefault(word, len(word_index)))
+            tag_ids.append(tag_index.setdefault(tag, len(tag_index)))
+        offsets.append(len(word_ids))
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "word_ids.npy"), np.frombuffer(word_ids, dtype=np.int32))
+    np.save(os.path.join(out_dir, "tag_ids.npy"), np.frombuffer(tag_ids, dtype=np.int32))
+    np.save(os.path.join(out_dir, "offsets.npy"), np.frombuffer(offsets, dtype=np.int64))
+    for name, index in (("words.txt", word_index), ("tags.txt", tag_index)):
+        with open(os.path.join(out_dir, name), "w", encoding="utf-8") as f:
+            f.write("\n".join(index))
+    return load_id_corpus(out_dir)
+
+
+def load_id_corpus(corpus_dir, mmap=True):
+    # the id arrays are memory-mapped, only the two vocabularies are read into memory
+    mode = "r" if mmap else None
+    corpus = {
+        "word_ids": np.load(os.path.join(corpus_dir, "word_ids.npy"), mmap_mode=mode),
+        "tag_ids": np.load(os.path.join(corpus_dir, "tag_ids.npy"), mmap_mode=mode),
+        "offsets": np.load(os.path.join(corpus_dir, "offsets.npy"), mmap_mode=mode),
+    }
+    for key, name in (("words", "words.txt"), ("tags", "tags.txt")):
+        with open(os.path.join(corpus_dir, name), encoding="utf-8") as f:
+            corpus[key] = f.read().split("\n")
+    return corpus
+
+
+def sentence_positions(corpus, sentence_ids):
+    # token positions of the given sentences, concatenated in the given order
+    offsets = corpus["offsets"]
+    sentence_ids = np.asarray(sentence_ids, dtype=np.int64)
+    starts = offsets[sentence_ids]
+    lengths = offsets[sentence_ids + 1] - starts
+    ends = np.cumsum(lengths)
+    shift = np.repeat(starts - (ends - lengths), lengths)
+    return np.arange(ends[-1] if len(ends) else 0) + shift, lengths
+
+
+def exact_log(values):
+    # math.log on every distinct value, np.log may differ from train_hmm in the last bit
+    unique, inverse = np.unique(values, return_inverse=True)
+    logs = np.array([math.log(v) for v in unique])
+    return logs[inverse].reshape(values.shape)
+
+
+def train_hmm_ids(corpus, sentence_ids):
+    """
+    train_hmm on the given sentences of an id corpus, counted with bincount.
+
+    Gives the same log scores and tag order as train_hmm on the same sentences. The
+    emission matrix has a column for every word id of the corpus plus the unknown
+    column, words missing from these sentences get the unknown score there, which is
+    what train_hmm gives them too.
+    """
+    num_words = len(corpus["words"])
+    num_all_tags = len(corpus["tags"])
+    start_end = num_all_tags  # row for START and column for END
+
+    positions, lengths = sentence_positions(corpus, sentence_ids)
+    tag_ids = np.asarray(corpus["tag_ids"][positions], dtype=np.int64)
+    word_ids = np.asarray(corpus["word_ids"][positions], dtype=np.int64)
+    firsts = np.cumsum(lengths) - lengths
+    lasts = firsts + lengths - 1
+
+    # tags in order of first occurrence, like tag_counts.keys() in train_hmm
+    present, first_seen = np.unique(tag_ids, return_index=True)
+    order = present[np.argsort(first_seen)]
+    num_tags = len(order)
+    vocab_size = int(np.count_nonzero(np.bincount(word_ids, minlength=num_words)))
+
+    prev_tags = np.empty_like(tag_ids)
+    prev_tags[1:] = tag_ids[:-1]
+    prev_tags[firsts] = start_end
+    width = num_all_tags + 1
+    transition_keys = np.concatenate([prev_tags * width + tag_ids, tag_ids[lasts] * width + start_end])
+    transition_counts = np.bincount(transition_keys, minlength=width * width).reshape(width, width)
+
+    rows = np.append(order, start_end)
+    columns = np.append(order, start_end)
+    counts = transition_counts[np.ix_(rows, columns)]
+    totals = transition_counts[rows].sum(axis=1)
+    log_trans = exact_log((counts + 1) / (totals + num_tags + 1)[:, None])
+
+    emission_counts = np.bincount(tag_ids * num_words + word_ids, minlength=num_all_tags * num_words)
+    emission_counts = emission_counts.reshape(num_all_tags, num_words)[order]
+    denom = emission_counts.sum(axis=1) + vocab_size + 1
+    ratios = np.empty((num_tags, num_words + 1))
+    ratios[:, :num_words] = (emission_counts + 1) / denom[:, None]
+    ratios[:, num_words] = 1 / denom
+
+    return {
+        "tags": [corpus["tags"][t] for t in order],
+        "tag_ids": order,
+        "log_start": log_trans[num_tags, :num_tags],
+        "log_end": log_trans[:num_tags, num_tags],
+        "log_transition_matrix": log_trans[:num_tags, :num_tags],
+        "log_emission_matrix": exact_log(ratios),
+    }
+
+
+def cross_validate_ids(corpus, k=5, seed=42, batch_size=BATCH_SIZE):
+    # same folds and metrics as cross_validate, make_folds shuffles sentence ids the same way
+    offsets = corpus["offsets"]
+    sentence_ids = list(range(len(offsets) - 1))
+    random.Random(seed).shuffle(sentence_ids)
+    fold_size = max(1, len(sentence_ids) // k)
+    folds = []
+    for i in range(k):
+        start = i * fold_size
+        end = (i + 1) * fold_size if i < k - 1 else len(sentence_ids)
+        folds.append(sentence_ids[start:end])
+
+    fold_metrics = []
+    for fold_idx in range(k):
+        train_ids = [s for i, fold in enumerate(folds) if i != fold_idx for s in fold]
+        params = train_hmm_ids(corpus, train_ids)
+        test_ids = folds[fold_idx]
+        id_sentences = [corpus["word_ids"][offsets[s]:offsets[s + 1]] for s in test_ids]
+        paths = viterbi_decode_ids(id_sentences, params, batch_size)
+        predicted = np.concatenate([params["tag_ids"][path] for path in paths])
+        gold = np.concatenate([corpus["tag_ids"][offsets[s]:offsets[s + 1]] for s in test_ids])
+        fold_metrics.append(evaluate(predicted.tolist(), gold.tolist()))
+    return fold_metrics
@@ -1,14 +1,20 @@
 import math
+import multiprocessing
+import os
 import random
 from collections import Counter, defaultdict
 from pathlib import Path
 
+import numpy as np
+
 START_TAG = "<START>"
 END_TAG = "<END>"
+LOG_FLOOR = math.log(1e-12)  # score for a transition that was never filled in
+BATCH_SIZE = 64
 
 
-def read_tagged_corpus(path):
-    sentences = []
+def iter_tagged_sentences(path):
+    # one (words, tags) pair at a time, so big corpora can be converted without a full list
     with open(path, encoding="utf-8") as f:
         for line in f:
             line = line.strip()
@@ -23,8 +29,11 @@ def read_tagged_corpus(path):
                 words.append(word)
                 tags.append(tag)
             if words:
-                sentences.append((words, tags))
-    return sentences
+                yield words, tags
+
+
+def read_tagged_corpus(path):
+    return list(iter_tagged_sentences(path))
 
 
 def make_folds(data, k=5, seed=42):
@@ -39,23 +48,75 @@ def make_folds(data, k=5, seed=42):
     return folds
 
 
-def train_hmm(train_data):
+def count_hmm(train_data):
     tag_counts = Counter()
     emission_counts = defaultdict(Counter)
     transition_counts = defaultdict(Counter)
-    vocabulary = set()
+    word_counts = Counter()
 
     for words, tags in train_data:
         prev_tag = START_TAG
         transition_counts[prev_tag]  # ensure key exists
         for word, tag in zip(words, tags):
-            vocabulary.add(word)
+            word_counts[word] += 1
             tag_counts[tag] += 1
             emission_counts[tag][word] += 1
             transition_counts[prev_tag][tag] += 1
             prev_tag = tag
         transition_counts[prev_tag][END_TAG] += 1
 
+    return {
+        "tag_counts": tag_counts,
+        "emission_counts": emission_counts,
+        "transition_counts": transition_counts,
+        "word_counts": word_counts,
+    }
+
+
+def add_counts(total, part):
+    total["tag_counts"].update(part["tag_counts"])
+    total["word_counts"].update(part["word_counts"])
+    for tag, counter in part["emission_counts"].items():
+        total["emission_counts"][tag].update(counter)
+    for prev_tag, counter in part["transition_counts"].items():
+        total["transition_counts"][prev_tag].update(counter)
+    return total
+
+
+def subtract_counts(total, part, tag_order):
+    # counts of total minus part, tag_counts follows tag_order (first occurrence in the
+    # remaining data) because train_hmm keeps that order and ties in the decoder depend on it
+    empty = Counter()
+    tag_counts = Counter()
+    for tag in tag_order:
+        tag_counts[tag] = total["tag_counts"][tag] - part["tag_counts"].get(tag, 0)
+    emission_counts = defaultdict(Counter)
+    for tag in tag_counts:
+        emission_counts[tag] = total["emission_counts"][tag] - part["emission_counts"].get(tag, empty)
+    transition_counts = defaultdict(Counter)
+    transition_counts[START_TAG]
+    for prev_tag, counter in total["transition_counts"].items():
+        remaining = counter - part["transition_counts"].get(prev_tag, empty)
+        if remaining:
+            transition_counts[prev_tag] = remaining
+    return {
+        "tag_counts": tag_counts,
+        "emission_counts": emission_counts,
+        "transition_counts": transition_counts,
+        "word_counts": total["word_counts"] - part["word_counts"],
+    }
+
+
+def train_hmm(train_data):
+    return hmm_from_counts(count_hmm(train_data))
+
+
+def hmm_from_counts(counts):
+    tag_counts = counts["tag_counts"]
+    emission_counts = counts["emission_counts"]
+    transition_counts = counts["transition_counts"]
+    vocabulary = set(counts["word_counts"])
+
     tags = list(tag_counts.keys())
     vocab_size = len(vocabulary)
     num_tags = len(tags)
@@ -78,12 +139,33 @@ def train_hmm(train_data):
         for word, count in emission_counts[tag].items():
             log_emissions[tag][word] = math.log((count + 1) / denom)
 
+    # dense copies of the same log scores for the vectorized decoder
+    word_index = {word: i for i, word in enumerate(vocabulary)}
+    start_row = log_transitions.get(START_TAG, {})
+    log_start = np.array([start_row.get(tag, LOG_FLOOR) for tag in tags])
+    log_end = np.array([log_transitions.get(tag, {}).get(END_TAG, LOG_FLOOR) for tag in tags])
+    log_transition_matrix = np.array([
+        [log_transitions.get(prev_tag, {}).get(tag, LOG_FLOOR) for tag in tags]
+        for prev_tag in tags
+    ])
+    # last column is for unknown words
+    log_emission_matrix = np.empty((num_tags, vocab_size + 1))
+    for i, tag in enumerate(tags):
+        log_emission_matrix[i, :] = log_unknown[tag]
+        for word, score in log_emissions[tag].items():
+            log_emission_matrix[i, word_index[word]] = score
+
     return {
         "tags": tags,
         "vocabulary": vocabulary,
         "log_transitions": log_transitions,
         "log_emissions": log_emissions,
         "log_unknown": log_unknown,
+        "word_index": word_index,
+        "log_start": log_start,
+        "log_end": log_end,
+        "log_transition_matrix": log_transition_matrix,
+        "log_emission_matrix": log_emission_matrix,
     }
 
 
@@ -142,6 +224,158 @@ def viterbi_decode(words, params):
     return sequence
 
 
+def viterbi_decode_np(words, params):
+    # same result as viterbi_decode, each step is one T x T max/argmax
+    tags = params["tags"]
+    log_trans = params["log_transition_matrix"]
+    log_emit = params["log_emission_matrix"]
+    word_index = params["word_index"]
+    unknown = log_emit.shape[1] - 1
+    num_tags = len(tags)
+
+    emit = log_emit[:, [word_index.get(word, unknown) for word in words]].T
+    columns = np.arange(num_tags)
+    backpointer = np.zeros((len(words), num_tags), dtype=np.intp)
+
+    score = params["log_start"] + emit[0]
+    for t in range(1, len(words)):
+        # rows are previous tags, added in the same order as viterbi_decode so ties break the same way
+        candidates = score[:, None] + log_trans + emit[t]
+        best_prev = candidates.argmax(axis=0)
+        score = candidates[best_prev, columns]
+        backpointer[t] = best_prev
+
+    best_last = int((score + params["log_end"]).argmax())
+    sequence = [best_last]
+    for t in range(len(words) - 1, 0, -1):
+        sequence.append(int(backpointer[t][sequence[-1]]))
+    sequence.reverse()
+    return [tags[i] for i in sequence]
+
+
+def viterbi_decode_beam(words, params, beam_width=None, filter_tags=False):
+    """
+    Approximate Viterbi that only scores a few tags per position.
+
+    beam_width keeps the best k states of every position, filter_tags only tries
+    the tags a known word was seen with in training (its emission score is above
+    the unknown word score), unknown words still try every tag. With neither
+    option this is viterbi_decode_np.
+    """
+    if beam_width is None and not filter_tags:
+        return viterbi_decode_np(words, params)
+    if not words:
+        return []
+    tags = params["tags"]
+    log_trans = params["log_transition_matrix"]
+    log_emit = params["log_emission_matrix"]
+    word_index = params["word_index"]
+    unknown = log_emit.shape[1] - 1
+    all_tags = np.arange(len(tags))
+    seen_tags = {}  # word id -> tags it was seen with, for this sentence, the model is left untouched
+
+    def candidates_for(word_id):
+        if not filter_tags or word_id == unknown:
+            return all_tags
+        if word_id not in seen_tags:
+            seen_tags[word_id] = np.flatnonzero(log_emit[:, word_id] > log_emit[:, unknown])
+        return seen_tags[word_id]
+
+    def prune(score):
+        # positions of the best k scores, back in tag order so ties break like the exact decoder
+        if beam_width is None or len(score) <= beam_width:
+            return np.arange(len(score))
+        return np.sort(np.argsort(-score, kind="stable")[:beam_width])
+
+    ids = [word_index.get(word, unknown) for word in words]
+    states = candidates_for(ids[0])
+    score = params["log_start"][states] + log_emit[states, ids[0]]
+    keep = prune(score)
+    states, score = states[keep], score[keep]
+    history = []  # (states, best previous tag of each state) per position
+    for word_id in ids[1:]:
+        next_states = candidates_for(word_id)
+        candidates = score[:, None] + log_trans[np.ix_(states, next_states)] + log_emit[next_states, word_id]
+        best_prev = candidates.argmax(axis=0)
+        next_score = candidates[best_prev, np.arange(len(next_states))]
+        keep = prune(next_score)
+        history.append((next_states[keep], states[best_prev[keep]]))
+        states, score = next_states[keep], next_score[keep]
+
+    best = states[int((score + params["log_end"][states]).argmax())]
+    sequence = [best]
+    for step_states, step_prev in reversed(history):
+        sequence.append(step_prev[np.searchsorted(step_states, sequence[-1])])
+    sequence.reverse()
+    return [tags[i] for i in sequence]
+
+
+def viterbi_decode_batch(sentences, params, batch_size=BATCH_SIZE):
+    """
+    Decode many sentences at once, returns one tag list per sentence in input order.
+
+    Sentences are sorted by length and cut into buckets of batch_size, each bucket
+    is padded to a (B x L) word id array and decoded together with broadcasting.
+    Padded steps keep the score and point back to the same tag, so every sentence
+    gets exactly the tags viterbi_decode_np gives it.
+    """
+    tags = params["tags"]
+    word_index = params["word_index"]
+    unknown = params["log_emission_matrix"].shape[1] - 1
+    id_sentences = [[word_index.get(word, unknown) for word in words] for words in sentences]
+    paths = viterbi_decode_ids(id_sentences, params, batch_size)
+    return [[tags[j] for j in path] for path in paths]
+
+
+def viterbi_decode_ids(id_sentences, params, batch_size=BATCH_SIZE):
+    # same as viterbi_decode_batch on emission column ids, returns arrays of tag indices
+    log_trans = params["log_transition_matrix"]
+    log_emit = params["log_emission_matrix"]
+    unknown = log_emit.shape[1] - 1
+    num_tags = len(params["tags"])
+
+    results = [np.zeros(0, dtype=np.intp) for _ in id_sentences]
+    order = sorted((i for i, ids in enumerate(id_sentences) if len(ids)), key=lambda i: len(id_sentences[i]))
+    for begin in range(0, len(order), batch_size):
+        bucket = order[begin:begin + batch_size]
+        lengths = np.array([len(id_sentences[i]) for i in bucket])
+        batch, max_len = len(bucket), int(lengths.max())
+
+        ids = np.full((batch, max_len), unknown, dtype=np.intp)
+        for row, i in enumerate(bucket):
+            ids[row, :lengths[row]] = id_sentences[i]
+        emit = log_emit.T[ids]  # B x L x T
+
+        columns = np.arange(num_tags)
+        backpointer = np.empty((batch, max_len, num_tags), dtype=np.intp)
+        candidates = np.empty((batch, num_tags, num_tags))
+
+        score = params["log_start"] + emit[:, 0]
+        for t in range(1, max_len):
+            # same additions as viterbi_decode_np, written into one reused buffer
+            np.add(score[:, :, None], log_trans, out=candidates)
+            candidates += emit[:, t, None, :]
+            best_prev = candidates.argmax(axis=1)
+            step_score = np.take_along_axis(candidates, best_prev[:, None, :], axis=1)[:, 0]
+            # sentences that already ended keep their score and point back to the same tag
+            done = t >= lengths
+            if done.any():
+                step_score[done] = score[done]
+                best_prev[done] = columns
+            score = step_score
+            backpointer[:, t] = best_prev
+
+        path = np.empty((batch, max_len), dtype=np.intp)
+        path[:, -1] = (score + params["log_end"]).argmax(axis=1)
+        for t in range(max_len - 1, 0, -1):
+            path[:, t - 1] = backpointer[np.arange(batch), t, path[:, t]]
+
+        for row, i in enumerate(bucket):
+            # padded steps just repeat the last real tag
+            results[i] = path[row, :lengths[row]]
+    return results
+
+
 def evaluate(predicted, gold):
     correct = sum(p == g for p, g in zip(predicted, gold))
     total = len(gold)
@@ -151,26 +385,72 @@ def evaluate(predicted, gold):
     return precision, recall, f1
 
 
-def cross_validate(sentences, k=5):
-    folds = make_folds(sentences, k=k)
-    fold_metrics = []
+# set before the pool starts so forked workers inherit it instead of unpickling it per task
+_shared = {}
+
 
-    for fold_idx in range(k):
-        test_set = folds[fold_idx]
+def _init_worker(shared):
+    # only used when processes can't fork, the data is then sent once per worker
+    _shared.update(shared)
+
+
+def run_fold(fold_idx):
+    folds = _shared["folds"]
+    if "fold_counts" in _shared:
+        # full corpus counts minus this fold's counts, tags in training data order
+        fold_counts = _shared["fold_counts"]
+        tag_order = dict.fromkeys(
+            tag for i, counts in enumerate(fold_counts) if i != fold_idx for tag in counts["tag_counts"]
+        )
+        params = hmm_from_counts(subtract_counts(_shared["full_counts"], fold_counts[fold_idx], tag_order))
+    else:
         train_set = [s for i, fold in enumerate(folds) if i != fold_idx for s in fold]
         params = train_hmm(train_set)
 
-        all_pred = []
-        all_gold = []
-        for words, tags in test_set:
-            if not words:
-                continue
-            pred_tags = viterbi_decode(words, params)
-            all_pred.extend(pred_tags)
-            all_gold.extend(tags)
+    test_set = folds[fold_idx]
+    all_pred = []
+    all_gold = []
+    predictions = viterbi_decode_batch([words for words, _ in test_set], params)
+    for (words, tags), pred_tags in zip(test_set, predictions):
+        if not words:
+            continue
+        all_pred.extend(pred_tags)
+        all_gold.extend(tags)
 
-        precision, recall, f1 = evaluate(all_pred, all_gold)
-        fold_metrics.append((precision, recall, f1))
+    return evaluate(all_pred, all_gold)
+
+
+def cross_validate(sentences, k=5, workers=1, subtract=False):
+    """
+    k-fold cross validation, folds run in a process pool when workers > 1.
+
+    With subtract=True the counts of every fold are taken once, summed into the
+    full corpus counts, and each fold's model is the full counts minus that fold.
+    The per fold metrics are the same in every mode.
+    """
+    folds = make_folds(sentences, k=k)
+    shared = {"folds": folds}
+    if subtract:
+        fold_counts = [count_hmm(fold) for fold in folds]
+        full_counts = count_hmm([])
+        for counts in fold_counts:
+            add_counts(full_counts, counts)
+        shared["fold_counts"] = fold_counts
+        shared["full_counts"] = full_counts
+
+    _shared.clear()
+    _shared.update(shared)
+    if workers > 1:
+        if "fork" in multiprocessing.get_all_start_methods():
+            pool = multiprocessing.get_context("fork").Pool(workers)
+        else:
+            pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(shared,))
+        with pool:
+            fold_metrics = pool.map(run_fold, range(k))
+    else:
+        fold_metrics = [run_fold(fold_idx) for fold_idx in range(k)]
+
+    for fold_idx, (precision, recall, f1) in enumerate(fold_metrics):
         print(
             f"Fold {fold_idx + 1}: Precision={precision:.4f} "
             f"Recall={recall:.4f} F1={f1:.4f}"
@@ -183,7 +463,14 @@ def cross_validate(sentences, k=5):
         f"\nAverage: Precision={avg_precision:.4f} "
         f"Recall={avg_recall:.4f} F1={avg_f1:.4f}"
     )
+    return fold_metrics
+
+
+if __name__ == "__main__":
+    data_path = Path("wsj_pos_tagged_en.txt")
+    sentences = read_tagged_corpus(data_path)
+    cross_validate(sentences, k=5, workers=min(5, os.cpu_count() or 1), subtract=True)
 
-data_path = Path("wsj_pos_tagged_en.txt")
-sentences = read_tagged_corpus(data_path)
-cross_validate(sentences, k=5)
\ No newline at end of file
+    # model on the whole corpus for tag.py, which loads it without retraining
+    from hmm_model import save_hmm
+    save_hmm(train_hmm(sentences), "hmm_model")
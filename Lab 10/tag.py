@@ -0,0 +1,18 @@
+import sys
+import time
+
+from hmm_model import load_hmm
+from main import viterbi_decode_batch
+
+# tags whitespace tokenized sentences from stdin with a saved model, one sentence per line
+# usage: python tag.py hmm_model < sentences.txt
+
+if __name__ == "__main__":
+    model_dir = sys.argv[1] if len(sys.argv) > 1 else "hmm_model"
+    start = time.perf_counter()
+    params = load_hmm(model_dir)
+    print(f"model loaded in {(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
+
+    sentences = [line.split() for line in sys.stdin]
+    for words, tags in zip(sentences, viterbi_decode_batch(sentences, params)):
+        print(" ".join(f"{word}/{tag}" for word, tag in zip(words, tags)))
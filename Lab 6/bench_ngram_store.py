@@ -0,0 +1,70 @@
+import argparse
+import random
+import time
+from collections import Counter
+
+from ngram_store import (NgramStore, get_prob, get_prob_scan, generate_greedy_ng, generate_greedy_ng_scan,
+                         generate_beam_ng, generate_beam_ng_scan)
+
+# scanning generators of task3 vs the context indexed store, same seed must give the same sentences
+# counts are built from a plain text corpus, one sentence per line, instead of the LAB4 csvs
+# usage: python bench_ngram_store.py corpus.txt --lines 20000 --sentences 20
+
+
+def count_ngrams(path, orders, max_lines):
+    counts = {n: Counter() for n in orders}
+    with open(path, "r", encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            if i >= max_lines:
+                break
+            tokens = ["<s>"] + line.split() + ["</s>"]
+            for n in orders:
+                counts[n].update(zip(*[tokens[k:] for k in range(n)]))
+    return {n: dict(c) for n, c in counts.items()}
+
+def scan_prob(word, context, counts_dicts, n):
+    # the scan backs off from trigrams to counts_dicts[2], which task3 never loads
+    try:
+        return get_prob_scan(word, context, counts_dicts, n)
+    except KeyError:
+        return None
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("corpus")
+parser.add_argument("--lines", type=int, default=20000)
+parser.add_argument("--sentences", type=int, default=20)
+parser.add_argument("--beams", type=int, default=2)
+parser.add_argument("--seed", type=int, default=0)
+args = parser.parse_args()
+
+ngram_counts = count_ngrams(args.corpus, (3, 4), args.lines)
+store, build_time = timed(lambda: NgramStore(ngram_counts))
+print(f"{len(ngram_counts[3])} trigrams, {len(ngram_counts[4])} quadrigrams, store built in {build_time:.2f}s")
+
+print(f"\n{'n':>2} {'task':>8} {'scan s':>8} {'store s':>8} {'speedup':>8} {'same':>5}")
+for n in (3, 4):
+    random.seed(args.seed)
+    old, old_time = timed(lambda: [generate_greedy_ng_scan(ngram_counts, n) for _ in range(args.sentences)])
+    random.seed(args.seed)
+    new, new_time = timed(lambda: [generate_greedy_ng(store, n) for _ in range(args.sentences)])
+    print(f"{n:>2} {'greedy':>8} {old_time:>8.3f} {new_time:>8.4f} {old_time / new_time:>8.0f} {str(old == new):>5}")
+
+    random.seed(args.seed)
+    old, old_time = timed(lambda: [generate_beam_ng_scan(ngram_counts, n) for _ in range(args.beams)])
+    random.seed(args.seed)
+    new, new_time = timed(lambda: [generate_beam_ng(store, n) for _ in range(args.beams)])
+    print(f"{n:>2} {'beam':>8} {old_time:>8.3f} {new_time:>8.4f} {old_time / new_time:>8.0f} {str(old == new):>5}")
+
+    # probabilities of the n-grams of generated text, seen and unseen contexts
+    queries = [s.split() for s in new[0]][:5]
+    queries = [(seq[i], seq[:i]) for seq in queries for i in range(n - 1, len(seq))]
+    old, old_time = timed(lambda: [scan_prob(w, ctx, ngram_counts, n) for w, ctx in queries])
+    new, new_time = timed(lambda: [get_prob(w, ctx, store, n) for w, ctx in queries])
+    same = all(a == b for a, b in zip(old, new) if a is not None)
+    print(f"{n:>2} {'get_prob':>8} {old_time:>8.3f} {new_time:>8.4f} {old_time / new_time:>8.0f} {str(same):>5}")
@@ -0,0 +1,192 @@
+import random
+from collections import Counter, namedtuple
+from itertools import accumulate
+
+# continuations of one context, in the order the n-grams appear in the counts dict
+Continuations = namedtuple("Continuations", ["words", "counts", "total", "probs", "cum_probs"])
+
+
+class NgramStore:
+    """
+    N-gram counts indexed by context, built once from the {n: {ngram: count}} dicts.
+
+    Every context has its continuation words with their counts, the context total,
+    the MLE probabilities c / total and their running sums. Probabilities are one
+    dict lookup and sampling is random.choices on the running sums (a bisect), no
+    scan over all n-grams. The lists keep the counts dict order and the floats are
+    computed like the scanning code does, so a seeded run draws the same words.
+    """
+
+    def __init__(self, counts_dicts, fallback_order=3):
+        self.counts = counts_dicts
+        self.contexts = {}
+        self.start_contexts = {}
+        for n, counts in counts_dicts.items():
+            grouped = {}
+            for g, c in counts.items():
+                words, ctx_counts = grouped.setdefault(g[:-1], ([], []))
+                words.append(g[-1])
+                ctx_counts.append(c)
+            table = {}
+            for ctx, (words, ctx_counts) in grouped.items():
+                total = sum(ctx_counts)
+                probs = [c / total for c in ctx_counts] if total else [0.0] * len(ctx_counts)
+                table[ctx] = Continuations(words, ctx_counts, total, probs, list(accumulate(probs)))
+            self.contexts[n] = table
+            # one entry per n-gram, not per context, like the list get_start_context picks from
+            self.start_contexts[n] = [g[:-1] for g in counts if g[0] == "<s>"]
+
+        # unigram fallback: last words of the fallback_order n-grams
+        fallback = counts_dicts[fallback_order]
+        self.fallback_words = [g[-1] for g in fallback]
+        self.last_word_counts = Counter()
+        for g, c in fallback.items():
+            self.last_word_counts[g[-1]] += c
+        self.fallback_total = sum(fallback.values())
+
+    def continuations(self, context, n):
+        return self.contexts[n].get(tuple(context[-(n-1):]))
+
+
+def get_prob(word, context, store, n):
+    """
+    Returns MLE probability of 'word' given 'context'.
+    Backs off to the next lower order in the store if context not found.
+    """
+    if n == 1:
+        total = store.fallback_total
+        return store.last_word_counts[word] / total if total > 0 else 0
+
+    ctx = tuple(context[-(n-1):])
+    cont = store.contexts[n].get(ctx)
+    if cont is None or cont.total == 0:
+        lower = max((m for m in store.contexts if m < n), default=1)
+        return get_prob(word, context, store, lower)
+    return store.counts[n].get(ctx + (word,), 0) / cont.total
+
+def get_start_context(store, n):
+    # Choose a context that exists in the n-grams and starts with <s>
+    candidates = store.start_contexts[n]
+    if candidates:
+        return list(random.choice(candidates))
+    else:
+        return ["<s>"] * (n-1)
+
+def generate_greedy_ng(store, n, max_len=15):
+    sentence = get_start_context(store, n)
+
+    for _ in range(max_len):
+        cont = store.continuations(sentence, n)
+
+        if cont is None:
+            # fallback: pick any last word from trigram
+            next_word = random.choice(store.fallback_words)
+            sentence.append(next_word)
+            if next_word == "</s>":
+                break
+            continue
+
+        # Probabilistic sampling, bisect on the precomputed running sums
+        next_word = random.choices(cont.words, cum_weights=cont.cum_probs)[0]
+        sentence.append(next_word)
+        if next_word == "</s>":
+            break
+    return " ".join(sentence)
+
+def generate_beam_ng(store, n, beam_size=20, max_len=15):
+    sequences = [(get_start_context(store, n), 1.0)]
+
+    for _ in range(max_len):
+        all_candidates = []
+        for seq, seq_prob in sequences:
+            cont = store.continuations(seq, n)
+
+            if cont is None:
+                # fallback: pick any last word from trigram
+                next_word = random.choice(store.fallback_words)
+                all_candidates.append((seq+[next_word], seq_prob))
+                continue
+
+            for w, p in zip(cont.words, cont.probs):
+                all_candidates.append((seq+[w], seq_prob * p))
+
+        all_candidates.sort(key=lambda x: x[1], reverse=True)
+        sequences = all_candidates[:beam_size]
+
+        if all(seq[-1] == "</s>" for seq, _ in sequences):
+            break
+    return [" ".join(seq) for seq, _ in sequences]
+
+
+# the original versions that scan every n-gram, kept to check and time the store against
+
+def get_prob_scan(word, context, counts_dicts, n):
+    if n == 1:
+        total = sum(counts_dicts[3].values())  # fallback: use trigram counts last word frequencies
+        word_counts = sum(c for g, c in counts_dicts[3].items() if g[-1]==word)
+        return word_counts / total if total > 0 else 0
+
+    ctx = tuple(context[-(n-1):])
+    ngram = ctx + (word,)
+    c_ngram = counts_dicts[n].get(ngram, 0)
+    c_prefix = sum([c for g, c in counts_dicts[n].items() if g[:-1] == ctx])
+    if c_prefix == 0:
+        return get_prob_scan(word, context, counts_dicts, n-1)
+    return c_ngram / c_prefix
+
+def get_start_context_scan(counts_dicts, n):
+    candidates = [g[:-1] for g in counts_dicts[n] if g[0] == "<s>"]
+    if candidates:
+        return list(random.choice(candidates))
+    else:
+        return ["<s>"] * (n-1)
+
+def generate_greedy_ng_scan(counts_dicts, n, max_len=15):
+    sentence = get_start_context_scan(counts_dicts, n)
+
+    for _ in range(max_len):
+        ctx = tuple(sentence[-(n-1):])
+        candidates_dict = {g[-1]: counts_dicts[n][g] for g in counts_dicts[n] if g[:-1]==ctx}
+
+        if not candidates_dict:
+            last_words = [g[-1] for g in counts_dicts[3]]
+            next_word = random.choice(last_words)
+            sentence.append(next_word)
+            if next_word == "</s>":
+                break
+            continue
+
+        words, counts = zip(*candidates_dict.items())
+        probs = [c/sum(counts) for c in counts]
+        next_word = random.choices(words, probs)[0]
+        sentence.append(next_word)
+        if next_word == "</s>":
+            break
+    return " ".join(sentence)
+
+def generate_beam_ng_scan(counts_dicts, n, beam_size=20, max_len=15):
+    sequences = [(get_start_context_scan(counts_dicts, n), 1.0)]
+
+    for _ in range(max_len):
+        all_candidates = []
+        for seq, seq_prob in sequences:
+            ctx = tuple(seq[-(n-1):])
+            candidates_dict = {g[-1]: counts_dicts[n][g] for g in counts_dicts[n] if g[:-1]==ctx}
+
+            if not candidates_dict:
+                last_words = [g[-1] for g in counts_dicts[3]]
+                next_word = random.choice(last_words)
+                all_candidates.append((seq+[next_word], seq_prob))
+                continue
+
+            words, counts = zip(*candidates_dict.items())
+            probs = [c/sum(counts) for c in counts]
+            for w, p in zip(words, probs):
+                all_candidates.append((seq+[w], seq_prob * p))
+
+        all_candidates.sort(key=lambda x: x[1], reverse=True)
+        sequences = all_candidates[:beam_size]
+
+        if all(seq[-1] == "</s>" for seq, _ in sequences):
+            break
+    return [" ".join(seq) for seq, _ in sequences]
@@ -0,0 +1,68 @@
+import argparse
+import gc
+import time
+
+import pandas as pd
+
+from q2 import preprocess, binary_flags, bigram_counter
+from featurizer import tokenize, flags, extract_batch
+
+# per stage time of the q2 featurization vs the precompiled featurizer, outputs must be equal
+# usage: python bench_featurizer.py data.csv --repeat 2000 --workers 1 2 4
+# a plain text file (one document per line) works too, e.g. a Gujarati corpus
+
+
+def timed(func, texts):
+    # gc off, otherwise the outputs kept from earlier stages make later stages look slower
+    gc.collect()
+    gc.disable()
+    start = time.perf_counter()
+    out = [func(text) for text in texts]
+    elapsed = time.perf_counter() - start
+    gc.enable()
+    return out, elapsed
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("data", nargs="?", default="data.csv")
+parser.add_argument("--repeat", type=int, default=2000, help="copies of the documents to time")
+parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+args = parser.parse_args()
+
+if args.data.endswith(".csv"):
+    docs = list(pd.read_csv(args.data)["Sentence"])
+else:
+    with open(args.data, encoding="utf-8") as f:
+        docs = [line.rstrip("\n") for line in f]
+# small files are repeated so the timings mean something
+texts = docs * args.repeat if len(docs) < 1000 else docs
+chars = sum(len(text) for text in texts)
+print(f"{len(texts)} documents, {chars} chars")
+
+old_tokens, old_tok_time = timed(preprocess, texts)
+new_tokens, new_tok_time = timed(tokenize, texts)
+old_flags, old_flag_time = timed(binary_flags, texts)
+new_flags, new_flag_time = timed(flags, texts)
+_, old_bigram_time = timed(bigram_counter, old_tokens)
+_, new_bigram_time = timed(lambda tokens: list(zip(tokens, tokens[1:])), new_tokens)  # nb_sparse uses the pairs
+
+print(f"\n{'stage':>10} {'q2 (s)':>8} {'new (s)':>8} {'speedup':>8} {'equal':>6}")
+for stage, old_time, new_time, same in (
+    ("tokens", old_tok_time, new_tok_time, old_tokens == new_tokens),
+    ("flags", old_flag_time, new_flag_time, old_flags == new_flags),
+    ("bigrams", old_bigram_time, new_bigram_time, True),
+):
+    print(f"{stage:>10} {old_time:>8.3f} {new_time:>8.3f} {old_time / new_time:>7.1f}x {str(same):>6}")
+old_total = old_tok_time + old_flag_time + old_bigram_time
+new_total = new_tok_time + new_flag_time + new_bigram_time
+print(f"{'total':>10} {old_total:>8.3f} {new_total:>8.3f} {old_total / new_total:>7.1f}x")
+print(f"docs/s: q2 {len(texts) / old_total:.0f}, new {len(texts) / new_total:.0f}")
+
+expected = list(zip(new_tokens, new_flags))
+print(f"\n{'pool':>8} {'workers':>8} {'docs/s':>10} {'equal':>6}")
+for executor in ("process", "thread"):
+    for workers in args.workers:
+        start = time.perf_counter()
+        out = extract_batch(texts, workers, executor)
+        elapsed = time.perf_counter() - start
+        print(f"{executor:>8} {workers:>8} {len(texts) / elapsed:>10.0f} {str(out == expected):>6}")
@@ -0,0 +1,70 @@
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from q2 import train_nb, predict, preprocess, binary_flags
+from nb_sparse import build_sparse_model, featurize, predict_batch
+
+# docs/sec of predict one by one vs predict_batch, the labels must be the same
+# data.csv is tiny, so more documents are made by splicing its sentences (same label)
+# usage: python bench_nb.py --docs 20000
+
+
+def make_docs(df, n, seed=0):
+    rng = random.Random(seed)
+    rows = list(zip(df["Sentence"], df["Label"]))
+    by_label = {}
+    for text, label in rows:
+        by_label.setdefault(label, []).append(text.split())
+    docs = []
+    for _ in range(n):
+        text, label = rng.choice(rows)
+        words = text.split()
+        other = rng.choice(by_label[label])
+        cut, other_cut = rng.randint(0, len(words)), rng.randint(0, len(other))
+        docs.append((" ".join(words[:cut] + other[other_cut:] + [str(rng.randint(0, 999))] * rng.randint(0, 1)), label))
+    return docs
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("data", nargs="?", default="data.csv")
+parser.add_argument("--docs", type=int, default=20000)
+args = parser.parse_args()
+
+df = pd.read_csv(args.data)
+docs = list(zip(df["Sentence"], df["Label"])) + make_docs(df, args.docs)
+train_docs, test_docs = docs[::2], docs[1::2]
+priors, binary_probs, bigram_probs, _ = train_nb([t for t, _ in train_docs], [l for _, l in train_docs])
+model = build_sparse_model(priors, binary_probs, bigram_probs)
+texts = [t for t, _ in test_docs]
+print(f"{len(train_docs)} training docs, {len(texts)} test docs, {model['log_probs'].shape[1]} features")
+
+start = time.perf_counter()
+expected = [predict(text, priors, binary_probs, bigram_probs)[0] for text in texts]
+dict_time = time.perf_counter() - start
+
+start = time.perf_counter()
+predicted, _ = predict_batch(texts, model)
+batch_time = time.perf_counter() - start
+
+start = time.perf_counter()
+matrix = featurize(texts, model)
+featurize_time = time.perf_counter() - start
+start = time.perf_counter()
+scores = matrix @ model["log_probs"].T + model["log_prior"]
+matmul_time = time.perf_counter() - start
+
+start = time.perf_counter()
+for text in texts:
+    preprocess(text), binary_flags(text)
+tokenize_time = time.perf_counter() - start
+
+print(f"\n{'':>22} {'docs/s':>10}")
+print(f"{'predict (dicts)':>22} {len(texts) / dict_time:>10.0f}")
+print(f"{'predict_batch':>22} {len(texts) / batch_time:>10.0f}")
+print(f"{'  featurize only':>22} {len(texts) / featurize_time:>10.0f}")
+print(f"{'  mat-mul only':>22} {len(texts) / matmul_time:>10.0f}")
+print(f"{'  preprocess + flags':>22} {len(texts) / tokenize_time:>10.0f}  (what predict spends on featurizing)")
+print(f"\nsame labels: {predicted == expected}")
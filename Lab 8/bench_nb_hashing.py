@@ -0,0 +1,85 @@
+import argparse
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from q2 import train_nb, predict
+from nb_sparse import train_hashed_counts, hashed_model, predict_hashed
+
+# memory and accuracy of the hashed model for a few bucket sizes against the exact vocabulary model
+# documents are a piece of a data.csv sentence of their label, a piece of any other sentence and
+# random extra tokens, so the bigram vocabulary keeps growing and the labels aren't trivial
+# usage: python bench_nb_hashing.py --docs 20000 --bits 10 12 14 16 18 20
+
+
+def deep_size(obj, seen=None):
+    # bytes of a nest of dicts, lists, tuples and strings
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(deep_size(v, seen) for v in obj)
+    elif isinstance(obj, np.ndarray):
+        size += obj.nbytes
+    return size
+
+
+def make_docs(df, n, extra_tokens, seed=0):
+    rng = random.Random(seed)
+    rows = list(zip(df["Sentence"], df["Label"]))
+    docs = []
+    for _ in range(n):
+        text, label = rng.choice(rows)
+        words, other = text.split(), rng.choice(rows)[0].split()
+        words = words[:rng.randint(1, len(words))] + other[rng.randint(0, len(other) - 1):]
+        for _ in range(3):
+            words.insert(rng.randint(0, len(words)), f"w{rng.randrange(extra_tokens)}")
+        docs.append((" ".join(words), label))
+    return docs
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("data", nargs="?", default="data.csv")
+parser.add_argument("--docs", type=int, default=20000)
+parser.add_argument("--extra-tokens", type=int, default=5000, help="distinct random tokens mixed into the docs")
+parser.add_argument("--bits", type=int, nargs="+", default=[10, 12, 14, 16, 18, 20])
+args = parser.parse_args()
+
+df = pd.read_csv(args.data)
+docs = make_docs(df, args.docs, args.extra_tokens)
+train_docs, test_docs = docs[::2], docs[1::2]
+train_texts, train_labels = [t for t, _ in train_docs], [l for _, l in train_docs]
+texts, gold = [t for t, _ in test_docs], [l for _, l in test_docs]
+
+start = time.perf_counter()
+priors, binary_probs, bigram_probs, _ = train_nb(train_texts, train_labels)
+train_time = time.perf_counter() - start
+exact = [predict(text, priors, binary_probs, bigram_probs)[0] for text in texts]
+exact_mb = deep_size((priors, binary_probs, bigram_probs)) / 1e6
+n_bigrams = len({bg for stats in bigram_probs.values() for bg in stats["known"]})
+
+
+def accuracy(predicted):
+    return sum(p == g for p, g in zip(predicted, gold)) / len(gold)
+
+
+print(f"{len(train_texts)} training docs, {len(texts)} test docs, {n_bigrams} distinct bigrams")
+print(f"\n{'model':>8} {'model MB':>9} {'train (s)':>10} {'accuracy':>9} {'same as exact':>14}")
+print(f"{'exact':>8} {exact_mb:>9.2f} {train_time:>10.2f} {accuracy(exact):>9.4f} {'100.00%':>14}")
+for bits in args.bits:
+    start = time.perf_counter()
+    counts = train_hashed_counts(train_texts, train_labels, bits)
+    model = hashed_model(counts)
+    train_time = time.perf_counter() - start
+    predicted, _ = predict_hashed(texts, model)
+    same = sum(p == e for p, e in zip(predicted, exact)) / len(exact)
+    # the raw counts are what has to be kept around, the log matrix can be rebuilt from them
+    model_mb = deep_size(counts) / 1e6
+    print(f"{'2^' + str(bits):>8} {model_mb:>9.2f} {train_time:>10.2f} {accuracy(predicted):>9.4f} {same:>13.2%}")
@@ -0,0 +1,90 @@
+import argparse
+import random
+import time
+from multiprocessing import Pool
+
+import pandas as pd
+
+from q2 import train_nb, predict
+from nb_online import OnlineNB
+
+# shards trained in separate processes with partial_fit, merged, must equal one full train_nb
+# usage: python check_nb_online.py --docs 20000 --shards 4
+
+
+def make_docs(df, n, seed=0):
+    rng = random.Random(seed)
+    rows = list(zip(df["Sentence"], df["Label"]))
+    docs = []
+    for _ in range(n):
+        text, label = rng.choice(rows)
+        words, other = text.split(), rng.choice(rows)[0].split()
+        words = words[:rng.randint(1, len(words))] + other[rng.randint(0, len(other) - 1):]
+        words.insert(rng.randint(0, len(words)), f"w{rng.randrange(5000)}")
+        docs.append((" ".join(words), label))
+    return docs
+
+
+def fit_shard(docs, batch_size=500):
+    model = OnlineNB()
+    for start in range(0, len(docs), batch_size):
+        batch = docs[start:start + batch_size]
+        model.partial_fit([t for t, _ in batch], [l for _, l in batch])
+    return model
+
+
+def same_dicts(a, b):
+    # equal values and the same key order all the way down
+    if isinstance(a, dict):
+        return isinstance(b, dict) and list(a) == list(b) and all(same_dicts(a[k], b[k]) for k in a)
+    return a == b
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("data", nargs="?", default="data.csv")
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--shards", type=int, default=4)
+    args = parser.parse_args()
+
+    docs = make_docs(pd.read_csv(args.data), args.docs)
+    test_texts = [t for t, _ in make_docs(pd.read_csv(args.data), 2000, seed=1)]
+
+    start = time.perf_counter()
+    expected = train_nb([t for t, _ in docs], [l for _, l in docs])[:3]
+    full_time = time.perf_counter() - start
+
+    size = -(-len(docs) // args.shards)
+    shards = [docs[i:i + size] for i in range(0, len(docs), size)]
+    start = time.perf_counter()
+    with Pool(args.shards) as pool:
+        models = pool.map(fit_shard, shards)
+    merged = models[0]
+    for model in models[1:]:
+        merged.merge(model)
+    shard_time = time.perf_counter() - start
+
+    ok = all(same_dicts(a, b) for a, b in zip(merged.probs(), expected))
+    print(f"{len(docs)} docs in {len(shards)} shards: full train {full_time:.2f}s, shards + merge {shard_time:.2f}s")
+    print(f"merged probabilities equal full retrain: {ok}")
+
+    predicted = [merged.predict(text)[0] for text in test_texts]
+    same_predict = predicted == [predict(text, *expected)[0] for text in test_texts]
+    same_batch = merged.predict_batch(test_texts)[0] == predicted
+    print(f"same predictions: predict {same_predict}, predict_batch {same_batch}")
+
+    # one more batch: only the counts of the batch are added, the probabilities are rebuilt once
+    extra = make_docs(pd.read_csv(args.data), 1000, seed=2)
+    start = time.perf_counter()
+    merged.partial_fit([t for t, _ in extra], [l for _, l in extra])
+    merged.probs()
+    update_time = time.perf_counter() - start
+    all_docs = docs + extra
+    start = time.perf_counter()
+    retrained = train_nb([t for t, _ in all_docs], [l for _, l in all_docs])[:3]
+    retrain_time = time.perf_counter() - start
+    update_ok = all(same_dicts(a, b) for a, b in zip(merged.probs(), retrained))
+    print(f"+{len(extra)} docs: partial_fit {update_time:.2f}s vs retrain {retrain_time:.2f}s, equal: {update_ok}")
+
+    ok = ok and same_predict and same_batch and update_ok
+    raise SystemExit(0 if ok else 1)
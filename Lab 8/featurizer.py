@@ -0,0 +1,60 @@
+import os
+import re
+import string
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from q2 import preprocess
+
+# the punctuation indic_tokenize.trivial_tokenize splits on, its pattern escapes "]" with
+# the backslash of string.punctuation so a backslash is not a split point there
+PUNCT = string.punctuation.replace("\\", "") + "।॥꫱꫰꯫꯬꯭꯮꯯᱾᱿"
+PUNCT_CLASS = "".join(re.escape(c) for c in PUNCT)
+
+# the tokens preprocess keeps: runs between spaces/tabs/punctuation that have a word char,
+# and "_", the only punctuation that is a word char (other punctuation tokens are dropped)
+TOKEN_RE = re.compile(rf"_|[^ \t{PUNCT_CLASS}]*?[^\W_][^ \t{PUNCT_CLASS}]*")
+# trivial_tokenize glues number sequences like "3, 5" back into "3,5", when the text could
+# have one the tokens come from preprocess itself
+NUMBER_SEQ_RE = re.compile(r"[0-9][ \t]*[,.:/][ \t]*[0-9]")
+# binary_flags' patterns compiled once, three C level searches beat one python loop over a
+# combined pattern's matches
+URL_RE = re.compile(r"(https?://|www\.)", re.IGNORECASE)
+NUMBER_RE = re.compile(r"\d")
+PUNCT_RE = re.compile(r"[^\w\s]")
+
+
+def tokenize(text):
+    # same tokens as preprocess
+    if NUMBER_SEQ_RE.search(text):
+        return preprocess(text)
+    return [tok.lower() for tok in TOKEN_RE.findall(text)]
+
+def flags(text):
+    # same dict as binary_flags
+    return {
+        "has_url": 1 if URL_RE.search(text) else 0,
+        "has_number": 1 if NUMBER_RE.search(text) else 0,
+        "has_punct": 1 if PUNCT_RE.search(text) else 0,
+    }
+
+def extract(text):
+    """
+    Tokens and binary flags of one document, what preprocess and binary_flags give.
+
+    The tokens come from one precompiled findall over the text, with no per token
+    regex calls, and the flags from precompiled patterns.
+    """
+    return tokenize(text), flags(text)
+
+def extract_batch(texts, workers=1, executor="process"):
+    # (tokens, flags) per text in input order, optionally in a thread or process pool
+    texts = list(texts)
+    if workers == 1 or len(texts) < 2:
+        return [extract(text) for text in texts]
+    workers = workers or os.cpu_count() or 1
+    pool_class = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    chunksize = max(1, len(texts) // (workers * 4))
+    with pool_class(workers) as pool:
+        if executor == "process":
+            return list(pool.map(extract, texts, chunksize=chunksize))
+        return list(pool.map(extract, texts))
@@ -0,0 +1,63 @@
+from q2 import count_nb, nb_probs, empty_counts, predict
+from nb_sparse import build_sparse_model, predict_batch
+
+
+class OnlineNB:
+    """
+    Naive Bayes that keeps the raw counts of q2.py, so it can keep learning.
+
+    partial_fit adds a batch of labelled texts and merge adds the counts of a model
+    trained somewhere else (another process or machine, it pickles). The smoothed
+    probabilities are rebuilt from the counts only when they are asked for, and are
+    cached until the counts change. Fitting shards and merging them in data order
+    gives exactly the dicts train_nb gives on all the data at once.
+    """
+
+    def __init__(self):
+        self.counts = empty_counts()
+        self.version = 0
+        self._cache = {}
+
+    def partial_fit(self, texts, labels):
+        count_nb(texts, labels, self.counts)
+        self.version += 1
+        return self
+
+    def merge(self, other):
+        counts, other_counts = self.counts, other.counts
+        counts["class_doc_counts"].update(other_counts["class_doc_counts"])
+        counts["vocabulary"].update(other_counts["vocabulary"])
+        for key in ("class_binary_counts", "class_bigram_counts"):
+            for label, label_counts in other_counts[key].items():
+                counts[key][label].update(label_counts)
+        self.version += 1
+        return self
+
+    def _cached(self, name, build):
+        version, value = self._cache.get(name, (None, None))
+        if version != self.version:
+            value = build()
+            self._cache[name] = (self.version, value)
+        return value
+
+    def probs(self):
+        # (priors, binary_probs, bigram_probs) like train_nb
+        return self._cached("probs", lambda: nb_probs(self.counts))
+
+    def sparse_model(self):
+        return self._cached("sparse", lambda: build_sparse_model(*self.probs()))
+
+    def predict(self, text):
+        return predict(text, *self.probs())
+
+    def predict_batch(self, texts):
+        return predict_batch(texts, self.sparse_model())
+
+    def __getstate__(self):
+        # only the counts travel, the caches are rebuilt on the other side
+        return {"counts": self.counts, "version": self.version}
+
+    def __setstate__(self, state):
+        self.counts = state["counts"]
+        self.version = state["version"]
+        self._cache = {}
@@ -0,0 +1,197 @@
+import math
+import zlib
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from q2 import K, EPS, BINARY_FEATURES, train_nb
+from featurizer import extract, extract_batch
+
+SCORE_TOLERANCE = 1e-9  # class scores closer than this are re-added in predict's order
+HASH_BITS = 18
+TOKEN_CACHE_SIZE = 1 << 16
+
+
+def build_sparse_model(priors, binary_probs, bigram_probs):
+    """
+    Turn the dicts from train_nb into one (classes x features) log probability matrix.
+
+    Columns are every training bigram (ids in bigram_index), one column for bigrams
+    never seen in training, then a present and an absent column per binary feature.
+    Entries are math.log(p + EPS) exactly like predict, so scores only differ from
+    predict by the order of the additions.
+    """
+    labels = list(priors)
+    vocabulary = {bg for stats in bigram_probs.values() for bg in stats["known"]}
+    # bigram strings are two tokens joined by a space and tokens have no spaces, so this is exact
+    bigram_index = {tuple(bg.split(" ")): i for i, bg in enumerate(sorted(vocabulary))}
+    unseen_col = len(bigram_index)
+    binary_col = unseen_col + 1
+
+    log_probs = np.empty((len(labels), binary_col + 2 * len(BINARY_FEATURES)))
+    for row, label in enumerate(labels):
+        stats = bigram_probs[label]
+        log_unseen = math.log(stats["unseen"] + EPS)
+        log_probs[row, :binary_col] = log_unseen
+        for bg, prob in stats["known"].items():
+            log_probs[row, bigram_index[tuple(bg.split(" "))]] = math.log(prob + EPS)
+        for j, feat in enumerate(BINARY_FEATURES):
+            log_probs[row, binary_col + 2 * j] = math.log(binary_probs[label][feat]["present"] + EPS)
+            log_probs[row, binary_col + 2 * j + 1] = math.log(binary_probs[label][feat]["absent"] + EPS)
+
+    return {
+        "labels": labels,
+        "bigram_index": bigram_index,
+        "log_prior": np.array([math.log(priors[label] + EPS) for label in labels]),
+        "log_probs": log_probs,
+    }
+
+
+def train_sparse_nb(texts, labels):
+    return build_sparse_model(*train_nb(texts, labels)[:3])
+
+
+def featurize(texts, model, workers=1):
+    """
+    Documents as a CSR matrix of feature counts, one row per document.
+
+    Every bigram adds one entry to its column (bigrams never seen in training share
+    one column), repeated entries are summed by the mat-mul, plus one entry for the
+    present or absent column of each binary feature. Tokens and flags come from
+    extract_batch, in a process pool when workers > 1.
+    """
+    bigram_index = model["bigram_index"]
+    unseen_col = len(bigram_index)
+    flag_cols = [(feat, unseen_col + 1 + 2 * j) for j, feat in enumerate(BINARY_FEATURES)]
+    indptr = [0]
+    indices = []
+    for tokens, flags in extract_batch(texts, workers):
+        indices.extend([bigram_index.get(pair, unseen_col) for pair in zip(tokens, tokens[1:])])
+        indices.extend([col if flags[feat] else col + 1 for feat, col in flag_cols])
+        indptr.append(len(indices))
+    shape = (len(indptr) - 1, model["log_probs"].shape[1])
+    return csr_matrix((np.ones(len(indices)), np.array(indices, dtype=np.int64), indptr), shape=shape)
+
+
+def exact_scores(text, model):
+    # predict's sum, term by term in the same order, read from the matrix
+    bigram_index = model["bigram_index"]
+    unseen_col = len(bigram_index)
+    log_probs = model["log_probs"]
+    tokens, flags = extract(text)
+    bigrams = Counter(zip(tokens, tokens[1:]))
+    scores = []
+    for row in range(len(model["labels"])):
+        log_p = float(model["log_prior"][row])
+        for j, feat in enumerate(BINARY_FEATURES):
+            log_p += float(log_probs[row, unseen_col + 1 + 2 * j + (0 if flags[feat] else 1)])
+        for pair, cnt in bigrams.items():
+            log_p += cnt * float(log_probs[row, bigram_index.get(pair, unseen_col)])
+        scores.append(log_p)
+    return scores
+
+
+def predict_batch(texts, model, workers=1):
+    """
+    Predict a whole batch with one sparse mat-mul, returns (labels, scores).
+
+    scores is a (docs x classes) array. Rows whose best two classes are within
+    SCORE_TOLERANCE are rescored in predict's order, so the labels always equal
+    predict's labels.
+    """
+    texts = list(texts)
+    matrix = featurize(texts, model, workers)
+    scores = np.asarray(matrix @ model["log_probs"].T) + model["log_prior"]
+    best = scores.argmax(axis=1)
+    if scores.shape[1] > 1:
+        top_two = np.sort(scores, axis=1)[:, -2:]
+        for i in np.flatnonzero(top_two[:, 1] - top_two[:, 0] <= SCORE_TOLERANCE * np.abs(top_two[:, 1]).clip(1)):
+            row_scores = exact_scores(texts[i], model)
+            scores[i] = row_scores
+            best[i] = max(range(len(row_scores)), key=row_scores.__getitem__)
+    labels = model["labels"]
+    return [labels[i] for i in best], scores
+
+
+# hashing mode: bigrams go to 2^bits buckets, so memory doesn't grow with the data
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def token_hash(token):
+    # crc32 is the same in every process, unlike hash() on str
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def bigram_buckets(tokens, bits):
+    # the two token hashes are packed into one int and multiply-shift hashed (top bits of
+    # the 64 bit product), the bigram string is never built
+    shift = 64 - bits
+    hashes = [token_hash(tok) for tok in tokens]
+    return [((a << 32 | b) * 0x9E3779B97F4A7C15 & 0xFFFFFFFFFFFFFFFF) >> shift for a, b in zip(hashes, hashes[1:])]
+
+
+def train_hashed_counts(texts, labels, bits=HASH_BITS):
+    """
+    Raw counts of the hashed model, every class has a fixed 2^bits bucket array.
+
+    Same counts as train_nb, except that bigrams are counted per bucket.
+    """
+    counts = {"bits": bits, "doc_counts": Counter(), "binary_counts": {}, "bigram_counts": {}}
+    for text, label in zip(texts, labels):
+        if label not in counts["doc_counts"]:
+            counts["binary_counts"][label] = np.zeros(len(BINARY_FEATURES), dtype=np.int64)
+            counts["bigram_counts"][label] = np.zeros(1 << bits, dtype=np.int64)
+        counts["doc_counts"][label] += 1
+        tokens, flags = extract(text)
+        np.add.at(counts["bigram_counts"][label], bigram_buckets(tokens, bits), 1)
+        counts["binary_counts"][label] += [flags[feat] for feat in BINARY_FEATURES]
+    return counts
+
+
+def hashed_model(counts):
+    """
+    Log probability matrix of a hashed model, same column layout as build_sparse_model.
+
+    The used buckets play the role of the vocabulary in the add K smoothing, an empty
+    bucket of a class gets that class's unseen probability.
+    """
+    labels = list(counts["doc_counts"])
+    size = 1 << counts["bits"]
+    bigram_counts = np.array([counts["bigram_counts"][label] for label in labels])
+    vocab_size = max(int(np.count_nonzero(bigram_counts.any(axis=0))), 1)
+    docs = np.array([counts["doc_counts"][label] for label in labels], dtype=np.float64)
+    binary_counts = np.array([counts["binary_counts"][label] for label in labels])
+
+    log_probs = np.empty((len(labels), size + 1 + 2 * len(BINARY_FEATURES)))
+    denom = bigram_counts.sum(axis=1) + K * vocab_size
+    log_probs[:, :size] = np.log((bigram_counts + K) / denom[:, None] + EPS)
+    log_probs[:, size] = np.log(K / denom + EPS)  # not used, keeps the layout of the exact model
+    binary_denom = (docs + 2 * K)[:, None]
+    log_probs[:, size + 1::2] = np.log((binary_counts + K) / binary_denom + EPS)
+    log_probs[:, size + 2::2] = np.log((docs[:, None] - binary_counts + K) / binary_denom + EPS)
+    return {
+        "labels": labels,
+        "bits": counts["bits"],
+        "log_prior": np.log(docs / docs.sum() + EPS),
+        "log_probs": log_probs,
+    }
+
+
+def featurize_hashed(texts, model, workers=1):
+    # like featurize, with bucket ids in place of bigram ids
+    bits = model["bits"]
+    flag_cols = [(feat, (1 << bits) + 1 + 2 * j) for j, feat in enumerate(BINARY_FEATURES)]
+    indptr = [0]
+    indices = []
+    for tokens, flags in extract_batch(texts, workers):
+        indices.extend(bigram_buckets(tokens, bits))
+        indices.extend([col if flags[feat] else col + 1 for feat, col in flag_cols])
+        indptr.append(len(indices))
+    shape = (len(indptr) - 1, model["log_probs"].shape[1])
+    return csr_matrix((np.ones(len(indices)), np.array(indices, dtype=np.int64), indptr), shape=shape)
+
+
+def predict_hashed(texts, model, workers=1):
+    scores = np.asarray(featurize_hashed(texts, model, workers) @ model["log_probs"].T) + model["log_prior"]
+    labels = model["labels"]
+    return [labels[i] for i in scores.argmax(axis=1)], scores
@@ -27,73 +27,61 @@ def binary_flags(text):
 def bigram_counter(tokens):
     return Counter(" ".join(pair) for pair in zip(tokens, tokens[1:]))
 
-df = pd.read_csv("data.csv")
-processed_lines = []
-class_doc_counts = Counter()
-class_binary_counts = defaultdict(Counter)
-class_bigram_counts = defaultdict(Counter)
-vocabulary = set()
-
-for text, label in zip(df["Sentence"], df["Label"]):
-    tokens = preprocess(text)
-    processed_lines.append(" ".join(tokens))
-    bigrams = bigram_counter(tokens)
-    vocabulary.update(bigrams.keys())
-    class_bigram_counts[label].update(bigrams)
-    class_doc_counts[label] += 1
-    flags = binary_flags(text)
-    for feat, value in flags.items():
-        if value:
-            class_binary_counts[label][feat] += 1
-
-with open("q2_preprocessed_sentences.txt", "w", encoding="utf-8") as fout:
-    fout.write("\n".join(processed_lines))
-
-total_docs = sum(class_doc_counts.values())
-priors = {label: class_doc_counts[label] / total_docs for label in class_doc_counts}
-
-# probs with add k smoothing
-binary_probs = defaultdict(dict)
-for label in class_doc_counts:
-    docs = class_doc_counts[label]
-    denom = docs + 2 * K
-    for feat in BINARY_FEATURES:
-        hits = class_binary_counts[label][feat]
-        binary_probs[label][feat] = {
-            "present": (hits + K) / denom,
-            "absent": (docs - hits + K) / denom,
-        }
-
-vocab_size = max(len(vocabulary), 1)
-bigram_probs = {}
-for label, counts in class_bigram_counts.items():
-    total_bigram = sum(counts.values())
-    denom = total_bigram + K * vocab_size
-    probs = {bg: (cnt + K) / denom for bg, cnt in counts.items()}
-    bigram_probs[label] = {"known": probs, "unseen": K / denom}
-
-print("Class priors:")
-for label, prior in priors.items():
-    print(f"  {label}: {prior:.6f}")
-
-print("\nBinary feature probabilities:")
-for label in sorted(binary_probs):
-    print(f"  Class {label}:")
-    for feat in BINARY_FEATURES:
-        vals = binary_probs[label][feat]
-        print(f"    {feat}: present={vals['present']:.6f}, absent={vals['absent']:.6f}")
-
-print("\nBigram probabilities:")
-for label in sorted(bigram_probs):
-    stats = bigram_probs[label]
-    for bg in sorted(stats["known"]):
-        print(f"  {label} -> '{bg}': {stats['known'][bg]:.6f}")
-    print(f"  {label} -> <unseen>: {stats['unseen']:.6f}")
-
-test_sentence = "You will get an exclusive offer in the meeting!"
-test_tokens = preprocess(test_sentence)
-test_bigrams = bigram_counter(test_tokens)
-test_flags = binary_flags(test_sentence)
+def empty_counts():
+    return {
+        "class_doc_counts": Counter(),
+        "class_binary_counts": defaultdict(Counter),
+        "class_bigram_counts": defaultdict(Counter),
+        "vocabulary": set(),
+    }
+
+def count_nb(texts, labels, counts=None):
+    # raw counts, added to counts when given, returns counts and the preprocessed lines
+    counts = empty_counts() if counts is None else counts
+    processed_lines = []
+    for text, label in zip(texts, labels):
+        tokens = preprocess(text)
+        processed_lines.append(" ".join(tokens))
+        bigrams = bigram_counter(tokens)
+        counts["vocabulary"].update(bigrams.keys())
+        counts["class_bigram_counts"][label].update(bigrams)
+        counts["class_doc_counts"][label] += 1
+        flags = binary_flags(text)
+        for feat, value in flags.items():
+            if value:
+                counts["class_binary_counts"][label][feat] += 1
+    return counts, processed_lines
+
+def nb_probs(counts):
+    class_doc_counts = counts["class_doc_counts"]
+    class_binary_counts = counts["class_binary_counts"]
+    total_docs = sum(class_doc_counts.values())
+    priors = {label: class_doc_counts[label] / total_docs for label in class_doc_counts}
+
+    # probs with add k smoothing
+    binary_probs = defaultdict(dict)
+    for label in class_doc_counts:
+        docs = class_doc_counts[label]
+        denom = docs + 2 * K
+        for feat in BINARY_FEATURES:
+            hits = class_binary_counts[label][feat]
+            binary_probs[label][feat] = {
+                "present": (hits + K) / denom,
+                "absent": (docs - hits + K) / denom,
+            }
+
+    vocab_size = max(len(counts["vocabulary"]), 1)
+    bigram_probs = {}
+    for label, label_counts in counts["class_bigram_counts"].items():
+        total_bigram = sum(label_counts.values())
+        denom = total_bigram + K * vocab_size
+        probs = {bg: (cnt + K) / denom for bg, cnt in label_counts.items()}
+        bigram_probs[label] = {"known": probs, "unseen": K / denom}
+    return priors, binary_probs, bigram_probs
+
+def train_nb(texts, labels):
+    counts, processed_lines = count_nb(texts, labels)
+    return (*nb_probs(counts), processed_lines)
 
 def predict(text, priors, binary_probs, bigram_probs):
     tokens = preprocess(text)
@@ -114,24 +102,54 @@ def predict(text, priors, binary_probs, bigram_probs):
     predicted_label = max(raw_scores, key=raw_scores.get)
     return predicted_label, raw_scores
 
-print("\nBinary feature probabilities:")
-for label, feats in binary_probs.items():
-    print(f"  Class {label}:")
-    for feat, vals in feats.items():
-        print(
-            f"    {feat}: present={vals['present']:.6f}, absent={vals['absent']:.6f}"
-        )
-
-print("\nBigram probabilities:")
-for label, stats in bigram_probs.items():
-    print(f"  Class {label}:")
-    for bg, prob in sorted(stats["known"].items()):
-        print(f"    '{bg}': {prob:.6f}")
-    print(f"    <unseen>: {stats['unseen']:.6f}")
-
-test_sentence = "You will get an exclusive offer in the meeting!"
-predicted_label, raw_scores = predict(test_sentence, priors, binary_probs, bigram_probs)
-print("\nScores for test sentence:")
-for label, score in raw_scores.items():
-    print(f"  {label}: {score:.6f}")
-print(f"\nPredicted label: {predicted_label}")
\ No newline at end of file
+if __name__ == "__main__":
+    df = pd.read_csv("data.csv")
+    priors, binary_probs, bigram_probs, processed_lines = train_nb(df["Sentence"], df["Label"])
+
+    with open("q2_preprocessed_sentences.txt", "w", encoding="utf-8") as fout:
+        fout.write("\n".join(processed_lines))
+
+    print("Class priors:")
+    for label, prior in priors.items():
+        print(f"  {label}: {prior:.6f}")
+
+    print("\nBinary feature probabilities:")
+    for label in sorted(binary_probs):
+        print(f"  Class {label}:")
+        for feat in BINARY_FEATURES:
+            vals = binary_probs[label][feat]
+            print(f"    {feat}: present={vals['present']:.6f}, absent={vals['absent']:.6f}")
+
+    print("\nBigram probabilities:")
+    for label in sorted(bigram_probs):
+        stats = bigram_probs[label]
+        for bg in sorted(stats["known"]):
+            print(f"  {label} -> '{bg}': {stats['known'][bg]:.6f}")
+        print(f"  {label} -> <unseen>: {stats['unseen']:.6f}")
+
+    test_sentence = "You will get an exclusive offer in the meeting!"
+    test_tokens = preprocess(test_sentence)
+    test_bigrams = bigram_counter(test_tokens)
+    test_flags = binary_flags(test_sentence)
+
+    print("\nBinary feature probabilities:")
+    for label, feats in binary_probs.items():
+        print(f"  Class {label}:")
+        for feat, vals in feats.items():
+            print(
+                f"    {feat}: present={vals['present']:.6f}, absent={vals['absent']:.6f}"
+            )
+
+    print("\nBigram probabilities:")
+    for label, stats in bigram_probs.items():
+        print(f"  Class {label}:")
+        for bg, prob in sorted(stats["known"].items()):
+            print(f"    '{bg}': {prob:.6f}")
+        print(f"    <unseen>: {stats['unseen']:.6f}")
+
+    test_sentence = "You will get an exclusive offer in the meeting!"
+    predicted_label, raw_scores = predict(test_sentence, priors, binary_probs, bigram_probs)
+    print("\nScores for test sentence:")
+    for label, score in raw_scores.items():
+        print(f"  {label}: {score:.6f}")
+    print(f"\nPredicted label: {predicted_label}")
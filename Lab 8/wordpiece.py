@@ -4,16 +4,20 @@ ITR = 20
 test_text = "The cat is chasing the dog quietly."
 
 def read_sentences(filepath):
+    # generator, one line at a time so the whole file is never in memory
     with open(filepath, encoding='utf-8') as f:
-        return [line.strip().lower() for line in f if line.strip()]  # strings joiye as list ma replace method nai hoy
+        for line in f:
+            if line.strip():
+                yield line.strip().lower()  # strings joiye as list ma replace method nai hoy
 
 input_sentences = read_sentences("input.txt")
 
-tokens = []
+# only the distinct tokens are needed for the vocab
+tokens = set()
 for sentence in input_sentences:
-    tokens.extend(indic_tokenize.trivial_tokenize(sentence, lang='gu'))
+    tokens.update(indic_tokenize.trivial_tokenize(sentence, lang='gu'))
 
-vocab = list(set(tokens))
+vocab = list(tokens)
 
 def get_stats(vocab):
     pairs = {}
@@ -64,7 +68,32 @@ for i in range(ITR):
 
 # now just do the splitting based on the thing that if the splitting is from middle then use ## as prefix
 # example for a word "thesis" we will write "the ##s ##i ##s"
-def wordpiece_tokenize(sentence, vocab):
+def build_trie(vocab):
+    # nested dict trie, '' key marks the end of a vocab entry
+    # merged pairs are stored as tuples in vocab, they never matched a substring so skip them
+    trie = {}
+    for entry in vocab:
+        if not isinstance(entry, str) or not entry:
+            continue
+        node = trie
+        for ch in entry:
+            node = node.setdefault(ch, {})
+        node[''] = True
+    return trie
+
+def longest_match(trie, word, i):
+    # end index of the longest vocab entry starting at i, None if nothing matches
+    node = trie
+    end = None
+    for j in range(i, len(word)):
+        node = node.get(word[j])
+        if node is None:
+            break
+        if '' in node:
+            end = j + 1
+    return end
+
+def wordpiece_tokenize(sentence, vocab_trie):
     tokens = indic_tokenize.trivial_tokenize(sentence, lang='gu')
     final_tokens = []
 
@@ -73,25 +102,23 @@ def wordpiece_tokenize(sentence, vocab):
         sub_tokens = []
         i = 0
         while i < len(word):
-            found = False
-            # longest possible substring from vocab
-            for j in range(len(word), i, -1):
+            # longest possible substring from vocab, one walk down the trie
+            j = longest_match(vocab_trie, word, i)
+            if j is not None:
                 sub = word[i:j]
-                if sub in vocab:
-                    if i == 0:
-                        sub_tokens.append(sub)
-                    else:
-                        sub_tokens.append('##' + sub)
-                    i = j
-                    found = True
-                    break
-            if not found:  # if nothing matched, split char-wise
+                if i == 0:
+                    sub_tokens.append(sub)
+                else:
+                    sub_tokens.append('##' + sub)
+                i = j
+            else:  # if nothing matched, split char-wise
                 sub_tokens.append('##' + word[i])
                 i += 1
         final_tokens.extend(sub_tokens)
 
     return final_tokens
 
-test_tokens = wordpiece_tokenize(test_text, vocab)
+vocab_trie = build_trie(vocab)
+test_tokens = wordpiece_tokenize(test_text, vocab_trie)
 print("\nWordPiece tokens for test sentence:")
 print(test_tokens)
\ No newline at end of file
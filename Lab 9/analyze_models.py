@@ -1,9 +1,9 @@
-import json
 from collections import Counter
 
+from model_file import find_model, read_model
+
 def analyze_bpe_model():
-    with open('bpe_model.json', 'r', encoding='utf-8') as f:
-        model = json.load(f)
+    model = read_model(find_model('bpe_model'))
     
     print("BPE MODEL ANALYSIS")
     print("="*50)
@@ -42,8 +42,7 @@ def analyze_bpe_model():
         print(f"  {i:2d}. {token} (length: {len(token.replace('</w>', ''))})")
 
 def analyze_wordpiece_model():
-    with open('wordpiece_model.json', 'r', encoding='utf-8') as f:
-        model = json.load(f)
+    model = read_model(find_model('wordpiece_model'))
     
     print("\n\nWORDPIECE MODEL ANALYSIS")
     print("="*50)
@@ -0,0 +1,49 @@
+import argparse
+import json
+import time
+
+from BPE import bpe_encode
+from bpe_encoder import BPEEncoder
+
+# checks BPEEncoder against bpe_encode and compares the speed
+# usage: python bench_bpe_encode.py heldout.txt --model bpe_model.json --lines 50
+
+test_sentences = [
+    "જિલ્લા ફોરમમાં, જેની હકૂમતની અંદર.",
+    "તમારા એમ્પ્લોયરનું નામ, તમારા કાર્યાલયનું સરનામું.",
+    "ભાઈ, જુઓ છો ને!"
+]
+
+parser = argparse.ArgumentParser()
+parser.add_argument("heldout", nargs="?", default=None)
+parser.add_argument("--model", default="bpe_model.json")
+parser.add_argument("--lines", type=int, default=50, help="lines of the held out file to check, bpe_encode is very slow")
+args = parser.parse_args()
+
+with open(args.model, 'r', encoding='utf-8') as f:
+    merges = json.load(f)['merges']
+encoder = BPEEncoder.from_file(args.model)
+
+sentences = list(test_sentences)
+if args.heldout:
+    with open(args.heldout, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                sentences.append(line.strip())
+            if len(sentences) >= args.lines + len(test_sentences):
+                break
+
+start = time.perf_counter()
+old = [bpe_encode(s, merges) for s in sentences]
+old_time = time.perf_counter() - start
+
+start = time.perf_counter()
+new = [encoder.encode(s) for s in sentences]
+new_time = time.perf_counter() - start
+
+mismatches = sum(o != n for o, n in zip(old, new))
+print(f"Sentences checked: {len(sentences)}, mismatches: {mismatches}")
+print(f"bpe_encode: {old_time:.2f}s ({len(sentences) / old_time:.1f} sentences/s)")
+print(f"BPEEncoder: {new_time:.4f}s ({len(sentences) / new_time:.1f} sentences/s)")
+print(f"Speedup: {old_time / new_time:.0f}x")
+print(encoder.encode_word.cache_info())
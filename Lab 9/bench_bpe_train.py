@@ -0,0 +1,39 @@
+import argparse
+import time
+
+from BPE import read_corpus, get_word_freqs
+from gujarati import split_gujarati_word
+from bpe_trainer import train_bpe, train_bpe_naive
+
+# compares the old full rescan trainer with the incremental one
+# usage: python bench_bpe_train.py train_sampled.txt --merges 8000 16000 32000
+
+parser = argparse.ArgumentParser()
+parser.add_argument("corpus", nargs="?", default="train_sampled.txt")
+parser.add_argument("--merges", type=int, nargs="+", default=[8000, 16000, 32000])
+parser.add_argument("--vocab-size", type=int, default=32000)
+parser.add_argument("--skip-naive", action="store_true", help="only time the incremental trainer")
+args = parser.parse_args()
+
+word_freqs = get_word_freqs(read_corpus(args.corpus))
+vocab = {}
+for word, freq in word_freqs.items():
+    vocab[' '.join(split_gujarati_word(word)) + ' </w>'] = freq
+print(f"Corpus: {len(vocab)} distinct words")
+
+print(f"\n{'merges':>8} {'naive (s)':>12} {'incremental (s)':>16} {'speedup':>9} {'same':>6}")
+for steps in args.merges:
+    start = time.perf_counter()
+    fast_merges, fast_vocab = train_bpe(dict(vocab), steps, args.vocab_size, verbose=False)
+    fast_time = time.perf_counter() - start
+
+    if args.skip_naive:
+        print(f"{steps:>8} {'-':>12} {fast_time:>16.2f} {'-':>9} {'-':>6}")
+        continue
+
+    start = time.perf_counter()
+    naive_merges, naive_vocab = train_bpe_naive(dict(vocab), steps, args.vocab_size, verbose=False)
+    naive_time = time.perf_counter() - start
+
+    same = naive_merges == fast_merges and naive_vocab == fast_vocab
+    print(f"{steps:>8} {naive_time:>12.2f} {fast_time:>16.2f} {naive_time / fast_time:>8.1f}x {str(same):>6}")
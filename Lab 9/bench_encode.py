@@ -0,0 +1,62 @@
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+# lines/s and peak RSS of encode.py per worker count and input size, outputs must all match
+# each run is its own process so the peaks don't mix
+# usage: python bench_encode.py corpus.txt --model bpe_model.bin --workers 1 2 4 --factors 1 4
+
+
+def run_child(model_path, input_path, out_dir, workers):
+    import time
+    from encode import encode_stream, read_lines
+
+    start = time.perf_counter()
+    n_lines, n_tokens = encode_stream(model_path, read_lines(input_path), out_dir, workers)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in KB on linux, RUSAGE_CHILDREN is the biggest pool worker
+    main_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    worker_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(f"{n_lines} {n_tokens} {elapsed} {main_mb:.1f} {worker_mb:.1f}")
+
+def same_output(dir_a, dir_b):
+    return all(np.array_equal(np.load(os.path.join(dir_a, name)), np.load(os.path.join(dir_b, name)))
+               for name in ('ids.npy', 'offsets.npy'))
+
+if __name__ == "__main__":
+    if len(sys.argv) == 6 and sys.argv[1] == "--child":
+        run_child(sys.argv[2], sys.argv[3], sys.argv[4], int(sys.argv[5]))
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("corpus")
+    parser.add_argument("--model", default="bpe_model.bin")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--factors", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    with open(args.corpus, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    print(f"{'input MB':>9} {'workers':>8} {'lines':>9} {'lines/s':>9} {'main MB':>8} {'worker MB':>10} {'same':>5}")
+    for factor in args.factors:
+        input_path = os.path.join(tmp, f"input_{factor}.txt")
+        with open(input_path, 'w', encoding='utf-8') as f:
+            for _ in range(factor):
+                f.write(text)
+        first_out = None
+        for workers in args.workers:
+            out_dir = os.path.join(tmp, f"out_{factor}_{workers}")
+            result = subprocess.run([sys.executable, __file__, "--child", args.model, input_path, out_dir, str(workers)],
+                                    capture_output=True, text=True, check=True)
+            n_lines, n_tokens, elapsed, main_mb, worker_mb = result.stdout.split()
+            first_out = first_out or out_dir
+            same = same_output(first_out, out_dir)
+            print(f"{os.path.getsize(input_path) / 1e6:>9.1f} {workers:>8} {n_lines:>9} "
+                  f"{int(n_lines) / float(elapsed):>9.0f} {main_mb:>8} {worker_mb:>10} {str(same):>5}")
@@ -0,0 +1,54 @@
+import argparse
+import gc
+import time
+
+from corpus_reader import iter_lines
+from gujarati import (gujarati_tokenize, gujarati_words, split_words, has_gujarati,
+                      gujarati_tokenize_loop, split_gujarati_word_loop, GUJARATI_CHARS)
+
+# chars/sec of the regex segmentation vs the old char loops, outputs must be identical
+# usage: python bench_gujarati.py train_sampled.txt --lines 200000
+
+parser = argparse.ArgumentParser()
+parser.add_argument("corpus", nargs="?", default="train_sampled.txt")
+parser.add_argument("--lines", type=int, default=200000)
+args = parser.parse_args()
+
+lines = []
+for line in iter_lines(args.corpus):
+    lines.append(line.lower())
+    if len(lines) >= args.lines:
+        break
+chars = sum(len(line) for line in lines)
+print(f"{len(lines)} lines, {chars} chars")
+
+
+def timed(func):
+    # gc off, the many small lists would otherwise trigger collections in whichever runs later
+    gc.collect()
+    gc.disable()
+    start = time.perf_counter()
+    out = func()
+    elapsed = time.perf_counter() - start
+    gc.enable()
+    return out, elapsed
+
+
+old_words, old_tok_time = timed(lambda: [
+    [w for w in gujarati_tokenize_loop(line) if any(ord(c) in GUJARATI_CHARS for c in w)] for line in lines
+])
+new_words, new_tok_time = timed(lambda: [gujarati_words(line) for line in lines])
+all_tokens, _ = timed(lambda: [gujarati_tokenize_loop(line) for line in lines])
+same_tokens = all_tokens == [gujarati_tokenize(line) for line in lines]
+same_filter = all(has_gujarati(w) == any(ord(c) in GUJARATI_CHARS for c in w) for ws in all_tokens for w in ws)
+
+words = [w for ws in new_words for w in ws]
+word_chars = sum(len(w) for w in words)
+old_split, old_split_time = timed(lambda: [split_gujarati_word_loop(w) for w in words])
+new_split, new_split_time = timed(lambda: split_words(words))
+
+print(f"\n{'stage':>14} {'loop chars/s':>13} {'regex chars/s':>14} {'speedup':>8} {'identical':>10}")
+print(f"{'tokenize':>14} {chars / old_tok_time:>13.0f} {chars / new_tok_time:>14.0f} "
+      f"{old_tok_time / new_tok_time:>7.1f}x {str(old_words == new_words and same_tokens and same_filter):>10}")
+print(f"{'split words':>14} {word_chars / old_split_time:>13.0f} {word_chars / new_split_time:>14.0f} "
+      f"{old_split_time / new_split_time:>7.1f}x {str(old_split == new_split):>10}")
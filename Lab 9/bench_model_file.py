@@ -0,0 +1,58 @@
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+
+from bpe_encoder import BPEEncoder
+from model_file import convert, load_model, merge_symbols
+from wordpiece_trie import WordPieceEncoder
+
+# file size and load time of the lean model file vs the full json model
+# usage: python bench_model_file.py --bpe bpe_model.json --wordpiece wordpiece_model.json
+
+
+def best_time(func, repeat):
+    # best of repeat runs, gc off so a collection doesn't land in one of them
+    gc.disable()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    gc.enable()
+    return min(times)
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--bpe", default="bpe_model.json")
+parser.add_argument("--wordpiece", default="wordpiece_model.json")
+parser.add_argument("--repeat", type=int, default=5)
+args = parser.parse_args()
+
+encoder_class = {"bpe": BPEEncoder, "wordpiece": WordPieceEncoder}
+out_dir = tempfile.mkdtemp()
+print(f"{'model':>10} {'format':>6} {'MB':>7} {'load ms':>8} {'encoder ms':>11} {'same':>5}")
+for json_path in (args.bpe, args.wordpiece):
+    if not json_path or not os.path.exists(json_path):
+        continue
+    name = os.path.splitext(os.path.basename(json_path))[0]
+    lean_path = os.path.join(out_dir, f"{name}.bin")
+    kind = convert(json_path, lean_path, os.path.join(out_dir, f"{name}_train_state.json"))
+
+    full = load_json(json_path)
+    lean = load_model(lean_path)
+    same = (merge_symbols(kind, full["merges"]) == merge_symbols(kind, lean["merges"])
+            and set(full["vocab"]) == set(lean["vocab"])
+            and encoder_class[kind].from_file(json_path).tokens == lean["tokens"])
+
+    for fmt, path, load in (("json", json_path, load_json), ("lean", lean_path, load_model)):
+        load_time = best_time(lambda: load(path), args.repeat)
+        encoder_time = best_time(lambda: encoder_class[kind].from_file(path), args.repeat)
+        print(f"{kind:>10} {fmt:>6} {os.path.getsize(path) / 1e6:>7.2f} {load_time * 1000:>8.1f} "
+              f"{encoder_time * 1000:>11.1f} {str(same) if fmt == 'lean' else '':>5}")
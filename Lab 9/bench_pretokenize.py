@@ -0,0 +1,27 @@
+import argparse
+import time
+
+from BPE import read_corpus, get_word_freqs
+from pretokenize import count_word_freqs
+
+# single process get_word_freqs against count_word_freqs with 1/2/4/8 workers
+# usage: python bench_pretokenize.py train_sampled.txt --workers 1 2 4 8
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("corpus", nargs="?", default="train_sampled.txt")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    expected = get_word_freqs(read_corpus(args.corpus))
+    base_time = time.perf_counter() - start
+    print(f"get_word_freqs(read_corpus): {base_time:.2f}s, {len(expected)} distinct words")
+
+    print(f"\n{'workers':>8} {'time (s)':>10} {'speedup':>9} {'same':>6}")
+    for workers in args.workers:
+        start = time.perf_counter()
+        word_freqs, _ = count_word_freqs(args.corpus, workers)
+        elapsed = time.perf_counter() - start
+        same = word_freqs == expected and list(word_freqs) == list(expected)
+        print(f"{workers:>8} {elapsed:>10.2f} {base_time / elapsed:>8.2f}x {str(same):>6}")
@@ -0,0 +1,62 @@
+import argparse
+import time
+import tracemalloc
+
+from bpe_encoder import BPEEncoder
+from corpus_reader import iter_lines
+from token_ids import unpack_tokens
+from wordpiece_trie import WordPieceEncoder
+
+# memory and speed of encode_batch (int32 buffer + offsets) vs lists of token strings
+# usage: python bench_token_ids.py heldout.txt --bpe bpe_model.json --wordpiece wordpiece_model.json
+
+
+def measure(func):
+    # (result, seconds, bytes still held by the result), timed without tracemalloc slowing it
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = func()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, elapsed, held
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("corpus", nargs="?", default="train_sampled.txt")
+parser.add_argument("--bpe", default="bpe_model.json")
+parser.add_argument("--wordpiece", default="wordpiece_model.json")
+parser.add_argument("--lines", type=int, default=20000)
+args = parser.parse_args()
+
+texts = []
+for line in iter_lines(args.corpus):
+    texts.append(line)
+    if len(texts) >= args.lines:
+        break
+
+encoders = []
+if args.bpe:
+    encoders.append(("bpe", BPEEncoder.from_file(args.bpe)))
+if args.wordpiece:
+    encoders.append(("wordpiece", WordPieceEncoder.from_file(args.wordpiece)))
+
+print(f"{len(texts)} texts")
+print(f"\n{'model':>10} {'output':>14} {'texts/s':>9} {'tokens':>9} {'MB held':>8} {'same tokens':>12}")
+for name, encoder in encoders:
+    # warm the word caches so both paths see the same cache state
+    for text in texts:
+        encoder.encode_ids(text)
+    lists, list_time, list_bytes = measure(lambda: [encoder.encode(text) for text in texts])
+    (ids, offsets), batch_time, batch_bytes = measure(lambda: encoder.encode_batch(texts))
+    n_tokens = len(ids)
+    decoded = unpack_tokens(ids, offsets, encoder.tokens)
+    known = set(encoder.tokens)
+    same = all(d == [t if t in known else '<unk>' for t in l] for d, l in zip(decoded, lists))
+    print(f"{name:>10} {'str lists':>14} {len(texts) / list_time:>9.0f} {n_tokens:>9} {list_bytes / 1e6:>8.2f}")
+    print(f"{name:>10} {'int32 + offs':>14} {len(texts) / batch_time:>9.0f} {n_tokens:>9} {batch_bytes / 1e6:>8.2f} {str(same):>12}")
+
+    start = time.perf_counter()
+    encoder.decode_batch(ids, offsets)
+    print(f"{name:>10} {'decode_batch':>14} {len(texts) / (time.perf_counter() - start):>9.0f}")
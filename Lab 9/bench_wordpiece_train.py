@@ -0,0 +1,41 @@
+import argparse
+import time
+from collections import Counter
+
+from WordPiece import read_sentences, build_word_symbols
+from gujarati import gujarati_words
+from wordpiece_trainer import train_wordpiece, train_wordpiece_naive
+
+# compares the old full rescan trainer with the incremental one
+# usage: python bench_wordpiece_train.py train_sampled.txt --itr 1000 4000 32000
+
+parser = argparse.ArgumentParser()
+parser.add_argument("corpus", nargs="?", default="train_sampled.txt")
+parser.add_argument("--itr", type=int, nargs="+", default=[1000, 4000, 32000])
+parser.add_argument("--vocab-size", type=int, default=32000)
+parser.add_argument("--skip-naive", action="store_true", help="only time the incremental trainer")
+args = parser.parse_args()
+
+tokens = []
+for sentence in read_sentences(args.corpus):
+    tokens.extend(gujarati_words(sentence))
+word_freqs = Counter(tokens)
+word_symbols = build_word_symbols(tokens)
+print(f"Corpus: {len(tokens)} tokens, {len(word_symbols)} distinct words")
+
+print(f"\n{'itr':>8} {'naive (s)':>12} {'incremental (s)':>16} {'speedup':>9} {'same':>6}")
+for itr in args.itr:
+    start = time.perf_counter()
+    fast = train_wordpiece(word_symbols, word_freqs, itr, args.vocab_size, verbose=False)
+    fast_time = time.perf_counter() - start
+
+    if args.skip_naive:
+        print(f"{itr:>8} {'-':>12} {fast_time:>16.2f} {'-':>9} {'-':>6}")
+        continue
+
+    start = time.perf_counter()
+    naive = train_wordpiece_naive(word_symbols, word_freqs, itr, args.vocab_size, verbose=False)
+    naive_time = time.perf_counter() - start
+
+    same = naive == fast
+    print(f"{itr:>8} {naive_time:>12.2f} {fast_time:>16.2f} {naive_time / fast_time:>8.1f}x {str(same):>6}")
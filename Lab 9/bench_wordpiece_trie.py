@@ -0,0 +1,46 @@
+import argparse
+import json
+import time
+
+from WordPiece import wordpiece_tokenize
+from wordpiece_trie import WordPieceTrie, wordpiece_tokenize_trie, set_memory_bytes
+
+# checks the trie tokenizer against wordpiece_tokenize, compares speed and memory
+# usage: python bench_wordpiece_trie.py test.txt --model wordpiece_model.json
+
+parser = argparse.ArgumentParser()
+parser.add_argument("text", nargs="?", default="train_sampled.txt")
+parser.add_argument("--model", default="wordpiece_model.json")
+parser.add_argument("--lines", type=int, default=10000)
+args = parser.parse_args()
+
+with open(args.model, 'r', encoding='utf-8') as f:
+    final_vocab = set(json.load(f)['vocab'])
+
+start = time.perf_counter()
+trie = WordPieceTrie(final_vocab)
+build_time = time.perf_counter() - start
+
+sentences = []
+with open(args.text, 'r', encoding='utf-8') as f:
+    for line in f:
+        if line.strip():
+            sentences.append(line.strip().lower())
+        if len(sentences) >= args.lines:
+            break
+
+start = time.perf_counter()
+old = [wordpiece_tokenize(s, final_vocab) for s in sentences]
+old_time = time.perf_counter() - start
+
+start = time.perf_counter()
+new = [wordpiece_tokenize_trie(s, trie) for s in sentences]
+new_time = time.perf_counter() - start
+
+mismatches = sum(o != n for o, n in zip(old, new))
+print(f"Vocab: {len(final_vocab)} pieces, trie: {trie.nodes} nodes in {len(trie.check)} cells, built in {build_time:.2f}s")
+print(f"Sentences checked: {len(sentences)}, mismatches: {mismatches}")
+print(f"wordpiece_tokenize:      {old_time:.2f}s ({len(sentences) / old_time:.0f} sentences/s)")
+print(f"wordpiece_tokenize_trie: {new_time:.2f}s ({len(sentences) / new_time:.0f} sentences/s)")
+print(f"Speedup: {old_time / new_time:.1f}x")
+print(f"Memory: vocab set {set_memory_bytes(final_vocab) / 1e6:.2f} MB, trie {trie.memory_bytes() / 1e6:.2f} MB")
@@ -0,0 +1,126 @@
+import heapq
+from bisect import bisect_right
+from functools import lru_cache
+
+from gujarati import gujarati_words, split_gujarati_word
+from model_file import find_model, read_model
+from token_ids import bpe_token_table, pack_ids, unpack_tokens
+
+CACHE_SIZE = 100000
+
+
+class BPEEncoder:
+    """
+    Applies BPE merges by rank instead of running one regex per merge per word.
+
+    Output is identical to bpe_encode: bpe_encode does one left to right pass per
+    merge in list order, so a pair whose rank is below the last applied merge is
+    never merged again even if it shows up later. The heap only takes ranks above
+    the last applied one to keep that behaviour. Words are cached in a bounded LRU
+    cache since word frequencies are very skewed.
+
+    Token ids come from the model's sorted 'tokens' table (bpe_token_table for
+    models saved without one), the unknown id is len(tokens).
+    """
+
+    def __init__(self, merges, vocab=None, cache_size=CACHE_SIZE, tokens=None):
+        self.merges = [tuple(pair) for pair in merges]
+        # pair -> every rank it was merged at, almost always just one
+        self.ranks = {}
+        for rank, pair in enumerate(self.merges):
+            self.ranks.setdefault(pair, []).append(rank)
+        self.vocab = list(vocab) if vocab is not None else []
+        self.tokens = list(tokens) if tokens is not None else bpe_token_table(self.vocab, self.merges)
+        self.token_to_id = {token: i for i, token in enumerate(self.tokens)}
+        self.unk_id = len(self.tokens)
+        self.encode_word = lru_cache(maxsize=cache_size)(self._encode_word)
+
+    @classmethod
+    def from_file(cls, path=None, cache_size=CACHE_SIZE):
+        # lean bpe_model.bin or a json model
+        model = read_model(path or find_model('bpe_model'))
+        return cls(model['merges'], model['vocab'], cache_size=cache_size, tokens=model.get('tokens'))
+
+    def rank_after(self, pair, last):
+        # first rank of this pair that comes after the last applied merge
+        ranks = self.ranks.get(pair)
+        if ranks is None or ranks[-1] <= last:
+            return None
+        if ranks[0] > last:
+            return ranks[0]
+        return ranks[bisect_right(ranks, last)]
+
+    def _encode_word(self, word):
+        symbols = split_gujarati_word(word) + ['</w>']
+        n = len(symbols)
+        nxt = list(range(1, n + 1))
+        prev = list(range(-1, n - 1))
+        merges = self.merges
+
+        heap = []
+        for i in range(n - 1):
+            rank = self.rank_after((symbols[i], symbols[i + 1]), -1)
+            if rank is not None:
+                heap.append((rank, i))
+        heapq.heapify(heap)
+
+        while heap:
+            rank = heap[0][0]
+            pair = merges[rank]
+            # all occurrences of this merge, applied left to right like re.sub
+            positions = []
+            while heap and heap[0][0] == rank:
+                positions.append(heapq.heappop(heap)[1])
+            positions.sort()
+            for i in positions:
+                j = nxt[i]
+                if symbols[i] is None or j >= n or (symbols[i], symbols[j]) != pair:
+                    continue
+                symbols[i] = symbols[i] + symbols[j]
+                symbols[j] = None
+                nxt[i] = nxt[j]
+                if nxt[i] < n:
+                    prev[nxt[i]] = i
+                # new neighbours only count if their merge comes later in the list
+                if prev[i] >= 0:
+                    left = self.rank_after((symbols[prev[i]], symbols[i]), rank)
+                    if left is not None:
+                        heapq.heappush(heap, (left, prev[i]))
+                if nxt[i] < n:
+                    right = self.rank_after((symbols[i], symbols[nxt[i]]), rank)
+                    if right is not None:
+                        heapq.heappush(heap, (right, i))
+
+        tokens = tuple(s for s in symbols if s is not None)
+        ids = tuple(self.token_to_id.get(t, self.unk_id) for t in tokens)
+        return tokens, ids
+
+    def words(self, text):
+        return gujarati_words(text.lower())
+
+    def encode(self, text):
+        encoded = []
+        for word in self.words(text):
+            encoded.extend(self.encode_word(word)[0])
+        return encoded
+
+    def encode_ids(self, text):
+        ids = []
+        for word in self.words(text):
+            ids.extend(self.encode_word(word)[1])
+        return ids
+
+    def encode_batch(self, texts):
+        # (int32 ids, int64 offsets), text i is ids[offsets[i]:offsets[i + 1]]
+        ids = []
+        offsets = [0]
+        encode_word = self.encode_word
+        for text in texts:
+            for word in gujarati_words(text.lower()):
+                ids.extend(encode_word(word)[1])
+            offsets.append(len(ids))
+        return pack_ids(ids, offsets)
+
+    def decode_batch(self, ids, offsets):
+        # token strings per text, ids outside the table come back as UNK_TOKEN
+        return unpack_tokens(ids, offsets, self.tokens)
@@ -0,0 +1,186 @@
+import heapq
+import re
+from collections import Counter, defaultdict
+
+
+def get_stats(vocab):
+    pairs = Counter()
+    for word, freq in vocab.items():
+        symbols = word.split()
+        for i in range(len(symbols) - 1):
+            pairs[(symbols[i], symbols[i + 1])] += freq
+    return pairs
+
+def merge_vocab(pair, vocab): # pair is tuple of 2 symbols
+    new_vocab = {}
+    bigram = re.escape(' '.join(pair)) # space thi join kairi, used escape for handling special chars
+    #not preceded by a non-space character and not followed by a non-space character
+    p = re.compile(r'(?<!\S)' + bigram + r'(?!\S)')
+    for word in vocab:
+        new_word = p.sub(''.join(pair), word)
+        new_vocab[new_word] = vocab[word]
+    return new_vocab
+
+def train_bpe_naive(vocab, merge_steps, vocab_size, verbose=True):
+    # original training loop, recounts every pair of every word on each step
+    merges = []
+    for i in range(merge_steps):
+        if verbose and i % 1000 == 0:
+            print(f"Merge {i}/{merge_steps}")
+
+        pairs = get_stats(vocab)
+        if not pairs:
+            if verbose:
+                print(f"No more pairs to merge at step {i}")
+            break
+
+        # BPE: select most frequent pair (frequency-based)
+        best_pair = pairs.most_common(1)[0][0]
+        vocab = merge_vocab(best_pair, vocab)
+        merges.append(best_pair)
+
+        # check vocabulary size
+        all_symbols = set(' '.join(vocab.keys()).split())
+        if len(all_symbols) >= vocab_size:
+            if verbose:
+                print(f"Reached vocab size {len(all_symbols)} at step {i}")
+            break
+
+    return merges, vocab
+
+def merge_word(symbols, pair):
+    # same left to right, non overlapping replacement as the regex in merge_vocab
+    first, second = pair
+    new_symbol = first + second
+    merged = []
+    i = 0
+    while i < len(symbols):
+        if i < len(symbols) - 1 and symbols[i] == first and symbols[i + 1] == second:
+            merged.append(new_symbol)
+            i += 2
+        else:
+            merged.append(symbols[i])
+            i += 1
+    return merged
+
+def word_pairs(symbols):
+    # pair -> [occurrences, char offset of first occurrence]
+    # char offsets dont move when other pairs get merged, so they are safe to keep around
+    pairs = {}
+    offset = 0
+    for i in range(len(symbols) - 1):
+        pair = (symbols[i], symbols[i + 1])
+        if pair in pairs:
+            pairs[pair][0] += 1
+        else:
+            pairs[pair] = [1, offset]
+        offset += len(symbols[i])
+    return pairs
+
+def train_bpe(vocab, merge_steps, vocab_size, verbose=True):
+    """
+    Incremental version of train_bpe_naive, gives the exact same merges.
+
+    Keeps pair -> count, pair -> word ids and a max heap with lazy invalidation,
+    so a merge only rescans the words that contain the merged pair.
+    Counter.most_common breaks ties by first occurrence while scanning the vocab,
+    that is tracked as (word id, char offset) and used as the heap tie breaker.
+    """
+    words = [word.split() for word in vocab]
+    freqs = list(vocab.values())
+
+    pair_counts = {}
+    pair_words = defaultdict(set)
+    pair_first = {}
+    symbol_counts = Counter()
+
+    for idx, symbols in enumerate(words):
+        symbol_counts.update(symbols)
+        for pair, (n, offset) in word_pairs(symbols).items():
+            pair_counts[pair] = pair_counts.get(pair, 0) + n * freqs[idx]
+            pair_words[pair].add(idx)
+            if pair not in pair_first:
+                pair_first[pair] = (idx, offset)
+
+    heap = [(-count, pair_first[pair], pair) for pair, count in pair_counts.items()]
+    heapq.heapify(heap)
+
+    merges = []
+    for i in range(merge_steps):
+        if verbose and i % 1000 == 0:
+            print(f"Merge {i}/{merge_steps}")
+
+        # pop stale entries until the top matches the live count and tie breaker
+        best_pair = None
+        while heap:
+            neg_count, first, pair = heapq.heappop(heap)
+            if pair_counts.get(pair) == -neg_count and pair_first.get(pair) == first:
+                best_pair = pair
+                break
+        if best_pair is None:
+            if verbose:
+                print(f"No more pairs to merge at step {i}")
+            break
+
+        changed = set()
+        dirty = set()
+        for idx in list(pair_words[best_pair]):
+            old_symbols = words[idx]
+            new_symbols = merge_word(old_symbols, best_pair)
+            words[idx] = new_symbols
+            freq = freqs[idx]
+
+            n_merged = len(old_symbols) - len(new_symbols)
+            symbol_counts[best_pair[0]] -= n_merged
+            symbol_counts[best_pair[1]] -= n_merged
+            symbol_counts[best_pair[0] + best_pair[1]] += n_merged
+
+            old_pairs = word_pairs(old_symbols)
+            new_pairs = word_pairs(new_symbols)
+            for pair in old_pairs.keys() | new_pairs.keys():
+                old = old_pairs.get(pair)
+                new = new_pairs.get(pair)
+                if old == new:
+                    continue
+                changed.add(pair)
+                delta = (new[0] if new else 0) - (old[0] if old else 0)
+                pair_counts[pair] = pair_counts.get(pair, 0) + delta * freq
+
+                current = pair_first.get(pair)
+                if new is None:
+                    pair_words[pair].discard(idx)
+                    if current[0] == idx:
+                        dirty.add(pair)
+                    continue
+                pair_words[pair].add(idx)
+                # this word was already the first one, or it is earlier than the first one
+                if current is None or current[0] == idx or (idx, new[1]) < current:
+                    pair_first[pair] = (idx, new[1])
+
+        for symbol in (best_pair[0], best_pair[1]):
+            if symbol_counts[symbol] <= 0:
+                del symbol_counts[symbol]
+
+        for pair in dirty:
+            if pair_words[pair]:
+                idx = min(pair_words[pair])
+                pair_first[pair] = (idx, word_pairs(words[idx])[pair][1])
+
+        for pair in changed:
+            if pair_counts[pair] > 0:
+                heapq.heappush(heap, (-pair_counts[pair], pair_first[pair], pair))
+            else:
+                del pair_counts[pair]
+                del pair_words[pair]
+                del pair_first[pair]
+
+        merges.append(best_pair)
+
+        # check vocabulary size
+        if len(symbol_counts) >= vocab_size:
+            if verbose:
+                print(f"Reached vocab size {len(symbol_counts)} at step {i}")
+            break
+
+    vocab = {' '.join(symbols): freq for symbols, freq in zip(words, freqs)}
+    return merges, vocab
@@ -0,0 +1,78 @@
+import argparse
+import gzip
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+
+# shows that peak RSS of the streaming counters stays flat while the corpus grows
+# the corpus reuses one fixed word list, so only the file size changes between runs
+# usage: python check_streaming_memory.py --lines 50000 --factors 1 4 16
+
+WORDS = ["ગુજરાત", "રાજ્ય", "સરકાર", "જિલ્લા", "ફોરમમાં", "તમારા", "કાર્યાલયનું", "સરનામું", "ભાઈ", "છો"]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_child(mode, path):
+    if mode == "list":
+        from BPE import get_word_freqs
+        with open(path, 'r', encoding='utf-8') as f:
+            corpus = [line.strip() for line in f if line.strip()]  # the old read_corpus
+        word_freqs = get_word_freqs(corpus)
+    elif mode == "stream":
+        from pretokenize import stream_word_freqs
+        word_freqs, _ = stream_word_freqs(path)
+    else:
+        from pretokenize import count_word_freqs
+        word_freqs, _ = count_word_freqs(path, workers=1)
+    print(f"{peak_rss_mb():.1f} {sum(word_freqs.values())}")
+
+def write_corpus(path, lines):
+    rng = random.Random(0)
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wt', encoding='utf-8') as f:
+        for _ in range(lines):
+            f.write(' '.join(rng.choice(WORDS) for _ in range(12)) + '.\n')
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        run_child(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=50000)
+    parser.add_argument("--factors", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'lines':>9} {'file MB':>8} {'list RSS':>9} {'stream RSS':>11} {'gz stream RSS':>14} {'parallel RSS':>13}")
+        for factor in args.factors:
+            lines = args.lines * factor
+            path = os.path.join(tmp, f"corpus_{factor}.txt")
+            gz_path = path + ".gz"
+            write_corpus(path, lines)
+            write_corpus(gz_path, lines)
+
+            rss = {}
+            for mode, target in (("list", path), ("stream", path), ("gz", gz_path), ("parallel", path)):
+                child_mode = "stream" if mode == "gz" else mode
+                out = subprocess.run([sys.executable, __file__, "--child", child_mode, target],
+                                     capture_output=True, text=True, check=True).stdout.split()
+                rss[mode] = float(out[0])
+                assert int(out[1]) == lines * 12, "word count mismatch"
+            results[factor] = rss
+            size_mb = os.path.getsize(path) / 1e6
+            print(f"{lines:>9} {size_mb:>8.1f} {rss['list']:>9.1f} {rss['stream']:>11.1f} {rss['gz']:>14.1f} {rss['parallel']:>13.1f}")
+
+    smallest, largest = results[min(results)], results[max(results)]
+    for mode in ("stream", "gz", "parallel"):
+        growth = largest[mode] - smallest[mode]
+        status = "flat" if growth < 10 else "GROWING"
+        print(f"{mode}: peak RSS grew {growth:.1f} MB over {max(results) // min(results)}x more data -> {status}")
+    sys.exit(0 if all(largest[m] - smallest[m] < 10 for m in ("stream", "gz", "parallel")) else 1)
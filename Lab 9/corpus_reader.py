@@ -0,0 +1,49 @@
+import gzip
+
+PARQUET_COLUMNS = ('sentence', 'text')  # column names written by ass1/tokeniser.ipynb
+PARQUET_BATCH_SIZE = 10000
+
+
+def iter_text_lines(filepath):
+    # plain or gzip text, one line at a time
+    if filepath.endswith('.gz'):
+        f = gzip.open(filepath, 'rt', encoding='utf-8')
+    else:
+        f = open(filepath, 'r', encoding='utf-8')
+    with f:
+        for line in f:
+            yield line
+
+def iter_parquet_lines(filepath, column=None, row_groups=None, batch_size=PARQUET_BATCH_SIZE, keep_nulls=False):
+    # reads one row group at a time, never the whole table, null rows are skipped or read as ""
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(filepath)
+    if column is None:
+        names = pf.schema_arrow.names
+        column = next((c for c in PARQUET_COLUMNS if c in names), names[0])
+    if row_groups is None:
+        row_groups = range(pf.num_row_groups)
+    for group in row_groups:
+        for batch in pf.iter_batches(batch_size=batch_size, row_groups=[group], columns=[column]):
+            for value in batch.column(0).to_pylist():
+                if value is not None:
+                    yield value
+                elif keep_nulls:
+                    yield ''
+
+def iter_lines(filepath, column=None):
+    """
+    Stream the non empty, stripped lines of a corpus with constant memory.
+
+    Works on plain text, .gz text and .parquet files (the sentence/text column of
+    the ass1 output, or `column`).
+    """
+    if filepath.endswith('.parquet'):
+        lines = iter_parquet_lines(filepath, column)
+    else:
+        lines = iter_text_lines(filepath)
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield line
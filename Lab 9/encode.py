@@ -0,0 +1,158 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+
+import numpy as np
+from numpy.lib import format as npy_format
+
+from bpe_encoder import BPEEncoder
+from corpus_reader import iter_text_lines, iter_parquet_lines
+from model_file import find_model, read_model
+from wordpiece_trie import WordPieceEncoder
+
+# encode a text file (or stdin) with a saved model into out_dir/ids.npy + out_dir/offsets.npy,
+# line i of the input is ids[offsets[i]:offsets[i + 1]], like encode_batch
+# usage: python encode.py input.txt out_dir --model bpe_model.bin --workers 4
+#        cat input.txt | python encode.py - out_dir --model wordpiece_model.bin
+
+BATCH_LINES = 2000
+PENDING_PER_WORKER = 2  # batches in flight per worker, this is what bounds the memory
+
+
+def model_kind(model):
+    # lean files say it, in the json models bpe merges are [a, b] and wordpiece [[a, b], merged]
+    if 'kind' in model:
+        return model['kind']
+    return 'bpe' if isinstance(model['merges'][0][0], str) else 'wordpiece'
+
+def load_encoder(path):
+    model = read_model(path)
+    if model_kind(model) == 'bpe':
+        return BPEEncoder(model['merges'], model['vocab'], tokens=model.get('tokens'))
+    return WordPieceEncoder(model['vocab'], tokens=model.get('tokens'))
+
+def read_lines(path, column=None):
+    # every line, empty ones too, so output rows line up with input lines
+    if path == '-':
+        return sys.stdin
+    if path.endswith('.parquet'):
+        return iter_parquet_lines(path, column, keep_nulls=True)
+    return iter_text_lines(path)
+
+def batches(lines, size):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class NpyWriter:
+    """
+    Appends to a 1-d .npy file whose length is only known at the end.
+
+    The header is written for a huge placeholder length and rewritten on close, both
+    fit the same padded header so the data never moves. np.load(path, mmap_mode='r')
+    reads the result.
+    """
+
+    def __init__(self, path, dtype):
+        self.dtype = np.dtype(dtype).newbyteorder('<')
+        self.f = open(path, 'wb')
+        self.length = 0
+        self._write_header(2 ** 62)
+        self.data_start = self.f.tell()
+
+    def _write_header(self, length):
+        header = {'descr': npy_format.dtype_to_descr(self.dtype), 'fortran_order': False, 'shape': (length,)}
+        npy_format.write_array_header_1_0(self.f, header)
+
+    def write(self, values):
+        self.f.write(np.asarray(values, dtype=self.dtype).tobytes())
+        self.length += len(values)
+
+    def close(self):
+        self.f.seek(0)
+        self._write_header(self.length)
+        assert self.f.tell() == self.data_start
+        self.f.close()
+
+
+_encoder = None
+
+def init_worker(model_path):
+    # every worker loads the model once, batches only carry text
+    global _encoder
+    _encoder = load_encoder(model_path)
+
+def encode_worker(batch):
+    return _encoder.encode_batch(batch)
+
+def encoded_batches(model_path, lines, workers=1, batch_lines=BATCH_LINES):
+    """
+    (ids, offsets) per batch of lines, in input order.
+
+    With workers > 1 batches go to a process pool, at most PENDING_PER_WORKER per
+    worker are in flight and they are collected oldest first, so the order is kept
+    and neither the input nor the output piles up in memory.
+    """
+    if workers == 1:
+        encoder = load_encoder(model_path)
+        for batch in batches(lines, batch_lines):
+            yield encoder.encode_batch(batch)
+        return
+    with Pool(workers, initializer=init_worker, initargs=(model_path,)) as pool:
+        pending = deque()
+        for batch in batches(lines, batch_lines):
+            pending.append(pool.apply_async(encode_worker, (batch,)))
+            if len(pending) >= workers * PENDING_PER_WORKER:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+def encode_stream(model_path, lines, out_dir, workers=1, batch_lines=BATCH_LINES):
+    # writes out_dir/ids.npy (int32) and out_dir/offsets.npy (int64), returns (lines, tokens)
+    os.makedirs(out_dir, exist_ok=True)
+    ids_out = NpyWriter(os.path.join(out_dir, 'ids.npy'), np.int32)
+    offsets_out = NpyWriter(os.path.join(out_dir, 'offsets.npy'), np.int64)
+    offsets_out.write([0])
+    n_lines = 0
+    n_tokens = 0
+    for ids, offsets in encoded_batches(model_path, lines, workers, batch_lines):
+        offsets_out.write(offsets[1:] + n_tokens)
+        ids_out.write(ids)
+        n_lines += len(offsets) - 1
+        n_tokens += len(ids)
+    ids_out.close()
+    offsets_out.close()
+    return n_lines, n_tokens
+
+def load_encoded(out_dir, mmap=True):
+    mode = 'r' if mmap else None
+    return (np.load(os.path.join(out_dir, 'ids.npy'), mmap_mode=mode),
+            np.load(os.path.join(out_dir, 'offsets.npy'), mmap_mode=mode))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input", help="text, .gz or .parquet file, - for stdin")
+    parser.add_argument("out_dir")
+    parser.add_argument("--model", default=None, help="bpe/wordpiece model, .bin or .json")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-lines", type=int, default=BATCH_LINES)
+    parser.add_argument("--column", default=None, help="parquet column")
+    args = parser.parse_args()
+
+    model_path = args.model or find_model('bpe_model')
+    start = time.perf_counter()
+    n_lines, n_tokens = encode_stream(model_path, read_lines(args.input, args.column), args.out_dir,
+                                      args.workers, args.batch_lines)
+    elapsed = time.perf_counter() - start
+    print(f"{n_lines} lines, {n_tokens} tokens, {args.workers} workers: "
+          f"{n_lines / elapsed:.0f} lines/s", file=sys.stderr)
@@ -0,0 +1,89 @@
+import re
+
+# shared by BPE.py, WordPiece.py and the tools around them
+GUJARATI_CHARS = set(range(0x0A80, 0x0B00))
+GUJARATI_MATRAS = set([0x0ABE, 0x0ABF, 0x0AC0, 0x0AC1, 0x0AC2, 0x0AC3, 0x0AC4, 0x0AC5, 0x0AC7, 0x0AC8, 0x0AC9, 0x0ACB, 0x0ACC])
+GUJARATI_VIRAMAS = set([0x0ACD])
+
+# a word is a run of gujarati block chars and alphanumerics, re's \w is isalnum() plus "_",
+# so "_" is turned into a space before matching (it splits words like any other symbol)
+WORD_CHARS = r"\w\u0A80-\u0AFF"
+WORD_RE = re.compile(rf"[{WORD_CHARS}]+")
+# only the words with at least one gujarati char, found without looking at the others twice
+GUJARATI_WORD_RE = re.compile(rf"[{WORD_CHARS}]*?[\u0A80-\u0AFF][{WORD_CHARS}]*")
+GUJARATI_RE = re.compile(r"[\u0A80-\u0AFF]")
+# one char and the matras / virama that follow it
+CLUSTER_RE = re.compile(r"(?s).[\u0ABE-\u0AC5\u0AC7-\u0AC9\u0ACB-\u0ACD]*")
+
+
+def gujarati_tokenize(text):
+    # split on whitespace and symbols, gujarati chars and alphanumerics make up the words
+    if "_" in text:
+        text = text.replace("_", " ")
+    return WORD_RE.findall(text)
+
+def gujarati_words(text):
+    # the words of gujarati_tokenize that have a gujarati char, the ones every tool keeps
+    if "_" in text:
+        text = text.replace("_", " ")
+    return GUJARATI_WORD_RE.findall(text)
+
+def has_gujarati(word):
+    return GUJARATI_RE.search(word) is not None
+
+def split_gujarati_word(word):
+    # characters with their matras / virama attached
+    return CLUSTER_RE.findall(word)
+
+def split_words(words):
+    # split_gujarati_word for many words
+    findall = CLUSTER_RE.findall
+    return [findall(word) for word in words]
+
+
+# the original char by char versions, kept to check and time the regex ones against
+
+def gujarati_tokenize_loop(text):
+    tokens = []
+    current_word = []
+    
+    for char in text:
+        char_code = ord(char)
+        
+        if char_code in GUJARATI_CHARS:
+            current_word.append(char)
+        elif char.isspace(): # space aave to tokens ma add kari devo 
+            if current_word:
+                tokens.append(''.join(current_word))
+                current_word = []
+        elif char.isalnum():
+            current_word.append(char)
+        else:
+            if current_word:
+                tokens.append(''.join(current_word))
+                current_word = []
+    
+    if current_word: # last ma to add karvanuj che
+        tokens.append(''.join(current_word))
+    
+    return tokens
+
+def split_gujarati_word_loop(word):
+    chars = []
+    i = 0
+    while i < len(word):
+        char = word[i]
+        
+        chars.append(char)
+        i += 1
+        
+        while i < len(word):
+            next_char = word[i]
+            next_code = ord(next_char)
+            if next_code in GUJARATI_MATRAS or next_code in GUJARATI_VIRAMAS:
+                chars[-1] += next_char
+                i += 1
+            else:
+                break
+    
+    return chars
@@ -0,0 +1,140 @@
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+from token_ids import bpe_token_table, wordpiece_token_table
+
+# lean inference file: only tokens, vocab and merges, the training state goes to its own json
+#
+#   header   magic, version, kind, n_strings, n_tokens, n_vocab, n_merges, blob bytes
+#   int32    length of every string in chars (the length prefixes, kept together)
+#   int32    vocab as string ids
+#   int32    merges as string ids, (a, b) for bpe and (a, b, merged) for wordpiece
+#   utf-8    all strings back to back
+#
+# strings[:n_tokens] is the sorted token id table, strings after it are merge symbols that
+# are not in the table. Everything before the blob is int32, so it loads with np.frombuffer.
+MAGIC = b"TOKM"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIIIQ")
+KINDS = {"bpe": 0, "wordpiece": 1}
+MERGE_WIDTH = {"bpe": 2, "wordpiece": 3}
+TRAIN_STATE = {"bpe": "word_vocab", "wordpiece": "word_symbols"}
+
+
+def merge_symbols(kind, merges):
+    # bpe merges are [a, b], wordpiece merges are [[a, b], merged]
+    if kind == "bpe":
+        return [tuple(pair) for pair in merges]
+    return [(a, b, merged) for (a, b), merged in merges]
+
+def save_model(path, kind, vocab, merges, tokens=None):
+    """
+    Write the lean model file of a bpe or wordpiece model.
+
+    tokens is the model's token id table, bpe_token_table / wordpiece_token_table when
+    not given (what the encoders build for models saved without one).
+    """
+    merges = merge_symbols(kind, merges)
+    if tokens is None:
+        if kind == "bpe":
+            tokens = bpe_token_table(vocab, [m[:2] for m in merges])
+        else:
+            tokens = wordpiece_token_table(vocab)
+    strings = list(tokens)
+    ids = {s: i for i, s in enumerate(strings)}
+    for merge in merges:
+        for s in merge:
+            if s not in ids:
+                ids[s] = len(strings)
+                strings.append(s)
+
+    lengths = np.array([len(s) for s in strings], dtype=np.int32)
+    vocab_ids = np.array(sorted(ids[t] for t in set(vocab)), dtype=np.int32)
+    merge_ids = np.array([[ids[s] for s in merge] for merge in merges], dtype=np.int32).reshape(-1, MERGE_WIDTH[kind])
+    blob = "".join(strings).encode("utf-8")
+    header = HEADER.pack(MAGIC, VERSION, KINDS[kind], len(strings), len(tokens), len(vocab_ids), len(merge_ids), len(blob))
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(lengths.tobytes())
+        f.write(vocab_ids.tobytes())
+        f.write(merge_ids.tobytes())
+        f.write(blob)
+
+def save_train_state(path, kind, state):
+    # word_vocab / word_symbols, only needed to look at or continue the training
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({TRAIN_STATE[kind]: state}, f, ensure_ascii=False)
+
+def load_model(path):
+    """
+    Read a lean model file into the fields of the json models.
+
+    Returns a dict with kind, tokens, vocab and merges (merges shaped like in the json,
+    tuples for bpe and ((a, b), merged) for wordpiece), plus the raw int32 merge_ids.
+    The strings are decoded with one decode call and sliced by the length prefixes.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, kind_id, n_strings, n_tokens, n_vocab, n_merges, blob_bytes = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} model file")
+    kind = next(k for k, v in KINDS.items() if v == kind_id)
+    width = MERGE_WIDTH[kind]
+
+    offset = HEADER.size
+    lengths = np.frombuffer(data, dtype=np.int32, count=n_strings, offset=offset)
+    offset += 4 * n_strings
+    vocab_ids = np.frombuffer(data, dtype=np.int32, count=n_vocab, offset=offset)
+    offset += 4 * n_vocab
+    merge_ids = np.frombuffer(data, dtype=np.int32, count=n_merges * width, offset=offset).reshape(-1, width)
+    offset += 4 * n_merges * width
+    text = data[offset:offset + blob_bytes].decode("utf-8")
+
+    ends = np.cumsum(lengths).tolist()
+    strings = [text[start:end] for start, end in zip([0] + ends, ends)]
+    # column by column through map / zip, no python loop per merge
+    columns = [map(strings.__getitem__, merge_ids[:, j].tolist()) for j in range(width)]
+    if kind == "bpe":
+        merges = list(zip(*columns))
+    else:
+        merges = list(zip(zip(columns[0], columns[1]), columns[2]))
+    return {
+        "kind": kind,
+        "tokens": strings[:n_tokens],
+        "vocab": list(map(strings.__getitem__, vocab_ids.tolist())),
+        "merges": merges,
+        "merge_ids": merge_ids,
+    }
+
+def read_model(path):
+    # lean file or the old json with everything in it, told apart by the magic bytes
+    with open(path, "rb") as f:
+        lean = f.read(len(MAGIC)) == MAGIC
+    if lean:
+        return load_model(path)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def find_model(name):
+    # name.bin when it has been written (or converted), else the old name.json
+    path = f"{name}.bin"
+    return path if os.path.exists(path) else f"{name}.json"
+
+def convert(json_path, model_path, state_path=None):
+    # split an old json model into the lean file and (optionally) its training state
+    with open(json_path, "r", encoding="utf-8") as f:
+        model = json.load(f)
+    kind = "bpe" if "word_vocab" in model else "wordpiece"
+    save_model(model_path, kind, model["vocab"], model["merges"], model.get("tokens"))
+    if state_path:
+        save_train_state(state_path, kind, model[TRAIN_STATE[kind]])
+    return kind
+
+
+if __name__ == "__main__":
+    # usage: python model_file.py bpe_model.json bpe_model.bin [bpe_train_state.json]
+    convert(*sys.argv[1:4])
@@ -0,0 +1,102 @@
+import os
+from collections import Counter
+from multiprocessing import Pool
+
+from gujarati import gujarati_words
+from corpus_reader import iter_lines, iter_parquet_lines
+
+CHUNKS_PER_WORKER = 4
+MAX_CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def chunk_ranges(filepath, n_chunks):
+    # split the file into byte ranges that start and end on a line boundary
+    size = os.path.getsize(filepath)
+    bounds = [0]
+    with open(filepath, 'rb') as f:
+        for i in range(1, n_chunks):
+            pos = size * i // n_chunks
+            if pos <= bounds[-1]:
+                continue
+            f.seek(pos - 1)
+            f.readline()  # move to the start of the next line
+            pos = f.tell()
+            if pos >= size:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+def count_lines(lines):
+    # same words as get_word_freqs, returns (word counter, number of non empty lines)
+    word_freqs = Counter()
+    n_lines = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        n_lines += 1
+        word_freqs.update(gujarati_words(line.lower()))
+    return word_freqs, n_lines
+
+def read_range(filepath, start, end):
+    # lines of one byte range, read one by one so a worker never holds its whole chunk
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        pos = start
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            pos += len(line)
+            yield line.decode('utf-8')
+
+def count_chunk(job):
+    filepath, start, end = job
+    return count_lines(read_range(filepath, start, end))
+
+def count_row_group(job):
+    filepath, group, column = job
+    return count_lines(iter_parquet_lines(filepath, column, row_groups=[group]))
+
+def stream_word_freqs(filepath, column=None):
+    # single process, counts while the file streams in, works for any format iter_lines reads
+    return count_lines(iter_lines(filepath, column))
+
+def merge_counts(results):
+    word_freqs = Counter()
+    n_lines = 0
+    for chunk_freqs, chunk_lines in results:
+        word_freqs.update(chunk_freqs)
+        n_lines += chunk_lines
+    return word_freqs, n_lines
+
+def count_word_freqs(filepath, workers=None, column=None):
+    """
+    Word frequency table for a corpus file, counted in parallel.
+
+    Plain text is cut into line aligned byte ranges and Parquet into row groups,
+    which a multiprocessing pool tokenizes. Per chunk counters are merged in file
+    order, so the table has the same insertion order as
+    get_word_freqs(read_corpus(filepath)). Gzip can't be split, so it is streamed
+    in one process. Returns (word_freqs, number of non empty lines).
+    """
+    workers = workers or os.cpu_count() or 1
+    if filepath.endswith('.gz'):
+        return stream_word_freqs(filepath)
+    if filepath.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        n_groups = pq.ParquetFile(filepath).num_row_groups
+        jobs = [(filepath, group, column) for group in range(n_groups)]
+        func = count_row_group
+    else:
+        n_chunks = max(workers * CHUNKS_PER_WORKER, os.path.getsize(filepath) // MAX_CHUNK_BYTES + 1)
+        jobs = [(filepath, start, end) for start, end in chunk_ranges(filepath, n_chunks)]
+        func = count_chunk
+
+    if workers == 1:
+        return merge_counts(map(func, jobs))
+    with Pool(workers) as pool:
+        return merge_counts(pool.imap(func, jobs))
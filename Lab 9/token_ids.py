@@ -0,0 +1,50 @@
+import numpy as np
+
+from gujarati import split_gujarati_word
+
+UNK_TOKEN = '<unk>'  # id len(tokens), never stored in the table
+
+
+def bpe_token_table(vocab, merges):
+    """
+    Sorted token list of a BPE model, a token's id is its position.
+
+    Holds the final vocab, every symbol a merge consumes or produces and the
+    characters (with matras) these are made of, so the symbols of words that never
+    got merged still have ids. Sorted so ids never depend on set order, old model
+    files only have list(set(...)) as vocab.
+    """
+    tokens = set(vocab)
+    for a, b in merges:
+        tokens.update((a, b, a + b))
+    for token in list(tokens):
+        tokens.update(split_gujarati_word(token[:-4] if token.endswith('</w>') else token))
+    tokens.add('</w>')
+    tokens.discard('')
+    return sorted(tokens)
+
+def wordpiece_token_table(vocab):
+    # the vocab plus every single character, plain and ##, which tokenize_word falls back to
+    tokens = set(vocab)
+    for token in vocab:
+        for ch in token[2:] if token.startswith('##') else token:
+            tokens.update((ch, f"##{ch}"))
+    return sorted(tokens)
+
+def pack_ids(ids, offsets):
+    """
+    Flat token ids and text offsets as contiguous NumPy buffers.
+
+    Returns (int32 ids, int64 offsets), the ids of text i are
+    ids[offsets[i]:offsets[i + 1]].
+    """
+    return np.array(ids, dtype=np.int32), np.array(offsets, dtype=np.int64)
+
+def unpack_tokens(ids, offsets, tokens):
+    # token strings per text, any id outside 0..len(tokens) - 1 comes back as UNK_TOKEN
+    table = np.array(list(tokens) + [UNK_TOKEN], dtype=object)
+    ids = np.asarray(ids, dtype=np.int64)
+    ids = np.where((ids >= 0) & (ids < len(tokens)), ids, len(tokens))
+    flat = table[ids].tolist()
+    bounds = np.asarray(offsets).tolist()
+    return [flat[start:end] for start, end in zip(bounds, bounds[1:])]
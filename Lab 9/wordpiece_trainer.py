@@ -0,0 +1,319 @@
+import heapq
+from collections import Counter, defaultdict
+
+# pairs whose ratio is this close to the best one get their real float score compared
+SCORE_TOLERANCE = 1e-12
+
+
+def get_pair_counts(word_symbols, word_freqs):
+    pairs = Counter()
+    for word, symbols in word_symbols.items():
+        freq = word_freqs[word]
+        for i in range(len(symbols) - 1):
+            pairs[(symbols[i], symbols[i + 1])] += freq
+    return pairs
+
+def find_best_merge(pairs, word_symbols, word_freqs):
+    # WordPiece uses probability-based scoring: P(xy) / (P(x) * P(y))
+    symbol_counts = Counter()
+
+    # count individual symbols weighted by word frequency
+    for word, symbols in word_symbols.items():
+        freq = word_freqs[word]
+        for symbol in symbols:
+            symbol_counts[symbol] += freq
+
+    total_pairs = sum(pairs.values())
+    total_symbols = sum(symbol_counts.values())
+
+    best_pair = None
+    best_score = float('-inf')
+
+    for (x, y), freq in pairs.items():
+        if freq > 1:  # only consider pairs that appear more than once
+            p_xy = freq / total_pairs if total_pairs > 0 else 0
+            p_x = symbol_counts[x] / total_symbols if total_symbols > 0 else 0
+            p_y = symbol_counts[y] / total_symbols if total_symbols > 0 else 0
+
+            # WordPiece probability score: P(xy) / (P(x) * P(y))
+            if p_x > 0 and p_y > 0:
+                score = p_xy / (p_x * p_y)
+                if score > best_score:
+                    best_score = score
+                    best_pair = (x, y)
+
+    return best_pair, best_score
+
+def merge_symbols(pair, word_symbols):
+    symbol1, symbol2 = pair
+    y_clean = symbol2[2:] if symbol2.startswith('##') else symbol2
+    new_symbol = symbol1 + y_clean
+
+    new_word_symbols = {}
+    for word, symbols in word_symbols.items():
+        new_symbols = []
+        i = 0
+        while i < len(symbols):
+            if i < len(symbols) - 1 and symbols[i] == symbol1 and symbols[i + 1] == symbol2:
+                new_symbols.append(new_symbol)
+                i += 2
+            else:
+                new_symbols.append(symbols[i])
+                i += 1
+        new_word_symbols[word] = new_symbols
+
+    return new_word_symbols, new_symbol
+
+def train_wordpiece_naive(word_symbols, word_freqs, itr, vocab_size, verbose=True):
+    # original training loop, recounts everything on each iteration
+    vocab_symbols = set()
+    for symbols in word_symbols.values():
+        vocab_symbols.update(symbols)
+
+    merged_pairs = []
+    for i in range(itr):
+        if verbose and i % 1000 == 0:
+            print(f"Merge {i}/{itr}, vocab size: {len(vocab_symbols)}")
+
+        pairs = get_pair_counts(word_symbols, word_freqs)
+        if not pairs:
+            if verbose:
+                print(f"No more pairs to merge at step {i}")
+            break
+
+        if len(vocab_symbols) >= vocab_size:
+            if verbose:
+                print(f"Reached vocab size {len(vocab_symbols)} at step {i}")
+            break
+
+        # WordPiece: select pair with highest probability score
+        best_pair, score = find_best_merge(pairs, word_symbols, word_freqs)
+        if best_pair is None:
+            if verbose:
+                print(f"No valid pair found at step {i}")
+            break
+
+        word_symbols, new_symbol = merge_symbols(best_pair, word_symbols)
+        merged_pairs.append((best_pair, new_symbol))
+        vocab_symbols.add(new_symbol)
+
+    return merged_pairs, word_symbols, vocab_symbols
+
+def symbol_length(symbol):
+    return len(symbol) - 2 if symbol.startswith('##') else len(symbol)
+
+def word_pairs(symbols):
+    # pair -> [occurrences, char offset of first occurrence], offsets ignore the ## prefix
+    pairs = {}
+    offset = 0
+    for i in range(len(symbols) - 1):
+        pair = (symbols[i], symbols[i + 1])
+        if pair in pairs:
+            pairs[pair][0] += 1
+        else:
+            pairs[pair] = [1, offset]
+        offset += symbol_length(symbols[i])
+    return pairs
+
+def merge_word(symbols, pair, new_symbol):
+    merged = []
+    i = 0
+    while i < len(symbols):
+        if i < len(symbols) - 1 and symbols[i] == pair[0] and symbols[i + 1] == pair[1]:
+            merged.append(new_symbol)
+            i += 2
+        else:
+            merged.append(symbols[i])
+            i += 1
+    return merged
+
+def train_wordpiece(word_symbols, word_freqs, itr, vocab_size, verbose=True):
+    """
+    Incremental version of train_wordpiece_naive, gives the same merged_pairs and vocab_symbols.
+
+    Pair counts, weighted symbol counts and the totals are kept up to date, and a merge
+    only rescans the words holding the merged pair. Pairs are grouped by their
+    (pair count, x count, y count) signature: pairs in one group always get the same
+    float score, so inside a group the first one in scan order (word id, char offset)
+    wins, like the strict > in find_best_merge. A heap orders the groups by
+    count / (x count * y count), and groups within SCORE_TOLERANCE of the top are
+    compared with the exact float formula from find_best_merge.
+    """
+    words = list(word_symbols)
+    freqs = [word_freqs[word] for word in words]
+    symbols_list = [list(word_symbols[word]) for word in words]
+
+    vocab_symbols = set()
+    symbol_counts = Counter()
+    pair_counts = {}
+    pair_words = defaultdict(set)
+    pair_first = {}
+    symbol_pairs = defaultdict(set)
+
+    for idx, symbols in enumerate(symbols_list):
+        vocab_symbols.update(symbols)
+        for symbol in symbols:
+            symbol_counts[symbol] += freqs[idx]
+        for pair, (n, offset) in word_pairs(symbols).items():
+            pair_counts[pair] = pair_counts.get(pair, 0) + n * freqs[idx]
+            pair_words[pair].add(idx)
+            if pair not in pair_first:
+                pair_first[pair] = (idx, offset)
+                symbol_pairs[pair[0]].add(pair)
+                symbol_pairs[pair[1]].add(pair)
+
+    total_pairs = sum(pair_counts.values())
+    total_symbols = sum(symbol_counts.values())
+
+    pair_state = {}  # pair -> (signature, first occurrence) of its live heap entry
+    groups = {}
+    group_heap = []
+
+    def push(pair):
+        count = pair_counts[pair]
+        if count <= 1:  # only consider pairs that appear more than once
+            pair_state.pop(pair, None)
+            return
+        sig = (count, symbol_counts[pair[0]], symbol_counts[pair[1]])
+        if pair_state.get(pair) == (sig, pair_first[pair]):
+            return
+        pair_state[pair] = (sig, pair_first[pair])
+        if sig not in groups:
+            groups[sig] = []
+            heapq.heappush(group_heap, (-(sig[0] / (sig[1] * sig[2])), sig))
+        heapq.heappush(groups[sig], (pair_first[pair], pair))
+
+    def group_top(sig):
+        # drop stale entries, returns (first, pair) or None when the group is empty
+        group = groups[sig]
+        while group:
+            first, pair = group[0]
+            if pair_state.get(pair) == (sig, first):
+                return group[0]
+            heapq.heappop(group)
+        del groups[sig]
+        return None
+
+    def select_best():
+        candidates = []
+        best_ratio = None
+        while group_heap:
+            neg_ratio, sig = group_heap[0]
+            if best_ratio is not None and -neg_ratio < best_ratio * (1 - SCORE_TOLERANCE):
+                break
+            heapq.heappop(group_heap)
+            if sig not in groups:
+                continue
+            top = group_top(sig)
+            if top is None:
+                continue
+            if best_ratio is None:
+                best_ratio = -neg_ratio
+            candidates.append((neg_ratio, sig, top))
+
+        best_pair = None
+        best_key = None
+        for neg_ratio, sig, (first, pair) in candidates:
+            heapq.heappush(group_heap, (neg_ratio, sig))
+            freq, x_count, y_count = sig
+            p_xy = freq / total_pairs
+            p_x = x_count / total_symbols
+            p_y = y_count / total_symbols
+            score = p_xy / (p_x * p_y)
+            key = (-score, first)
+            if best_key is None or key < best_key:
+                best_key = key
+                best_pair = pair
+        return best_pair
+
+    for pair in pair_counts:
+        push(pair)
+
+    merged_pairs = []
+    for i in range(itr):
+        if verbose and i % 1000 == 0:
+            print(f"Merge {i}/{itr}, vocab size: {len(vocab_symbols)}")
+
+        if not pair_counts:
+            if verbose:
+                print(f"No more pairs to merge at step {i}")
+            break
+
+        if len(vocab_symbols) >= vocab_size:
+            if verbose:
+                print(f"Reached vocab size {len(vocab_symbols)} at step {i}")
+            break
+
+        best_pair = select_best()
+        if best_pair is None:
+            if verbose:
+                print(f"No valid pair found at step {i}")
+            break
+
+        symbol1, symbol2 = best_pair
+        new_symbol = symbol1 + (symbol2[2:] if symbol2.startswith('##') else symbol2)
+
+        changed = set()
+        dirty = set()
+        for idx in list(pair_words[best_pair]):
+            old_symbols = symbols_list[idx]
+            new_symbols = merge_word(old_symbols, best_pair, new_symbol)
+            symbols_list[idx] = new_symbols
+            freq = freqs[idx]
+
+            merged = (len(old_symbols) - len(new_symbols)) * freq
+            symbol_counts[symbol1] -= merged
+            symbol_counts[symbol2] -= merged
+            symbol_counts[new_symbol] += merged
+            total_symbols -= merged
+            total_pairs -= merged
+
+            old_pairs = word_pairs(old_symbols)
+            new_pairs = word_pairs(new_symbols)
+            for pair in old_pairs.keys() | new_pairs.keys():
+                old = old_pairs.get(pair)
+                new = new_pairs.get(pair)
+                if old == new:
+                    continue
+                changed.add(pair)
+                delta = (new[0] if new else 0) - (old[0] if old else 0)
+                pair_counts[pair] = pair_counts.get(pair, 0) + delta * freq
+
+                current = pair_first.get(pair)
+                if new is None:
+                    pair_words[pair].discard(idx)
+                    if current[0] == idx:
+                        dirty.add(pair)
+                    continue
+                if current is None:
+                    symbol_pairs[pair[0]].add(pair)
+                    symbol_pairs[pair[1]].add(pair)
+                pair_words[pair].add(idx)
+                if current is None or current[0] == idx or (idx, new[1]) < current:
+                    pair_first[pair] = (idx, new[1])
+
+        for pair in dirty:
+            if pair_words[pair]:
+                idx = min(pair_words[pair])
+                pair_first[pair] = (idx, word_pairs(symbols_list[idx])[pair][1])
+
+        for pair in changed:
+            if pair_counts[pair] == 0:
+                del pair_counts[pair]
+                del pair_words[pair]
+                del pair_first[pair]
+                pair_state.pop(pair, None)
+                symbol_pairs[pair[0]].discard(pair)
+                symbol_pairs[pair[1]].discard(pair)
+
+        # the symbol counts of both halves moved, so every pair using them gets a new score
+        rescored = changed | symbol_pairs[symbol1] | symbol_pairs[symbol2] | symbol_pairs[new_symbol]
+        for pair in rescored:
+            if pair in pair_counts:
+                push(pair)
+
+        merged_pairs.append((best_pair, new_symbol))
+        vocab_symbols.add(new_symbol)
+
+    word_symbols = dict(zip(words, symbols_list))
+    return merged_pairs, word_symbols, vocab_symbols
@@ -0,0 +1,203 @@
+import sys
+from array import array
+from functools import lru_cache
+
+from gujarati import gujarati_words
+from model_file import find_model, read_model
+from token_ids import wordpiece_token_table, pack_ids, unpack_tokens
+
+ROOT = 0
+CONT_ROOT = 1  # root for ## continuation pieces, stored without the ##
+
+
+class WordPieceTrie:
+    """
+    Double-array trie over the vocab for greedy longest-match tokenization.
+
+    Characters are mapped to a dense alphabet, a child of node p with code c sits at
+    base[p] + c and is valid when check[base[p] + c] == p. There are separate roots
+    for word-initial and ## pieces, so matching at a position is one walk per root
+    instead of slicing every w[i:j] and its ## copy. Matching is per character like
+    wordpiece_tokenize, not per grapheme cluster, otherwise the output would change.
+    """
+
+    def __init__(self, vocab):
+        # plain nested dict trie first, then packed into base/check
+        nested = [{}, {}]
+        terminal = [False, False]
+        self.size = 0
+        chars = set()
+        for token in vocab:
+            if token.startswith('##'):
+                root, piece = CONT_ROOT, token[2:]
+            else:
+                root, piece = ROOT, token
+            if not piece:
+                continue
+            node = root
+            for ch in piece:
+                chars.add(ch)
+                child = nested[node].get(ch)
+                if child is None:
+                    child = len(nested)
+                    nested[node][ch] = child
+                    nested.append({})
+                    terminal.append(False)
+                node = child
+            if not terminal[node]:
+                terminal[node] = True
+                self.size += 1
+
+        # code 0 is left for characters that are not in the vocab at all
+        self.alphabet = {ch: i + 1 for i, ch in enumerate(sorted(chars))}
+        self.base = array('i', [0, 0])
+        self.check = array('i', [-2, -2])  # roots are taken but have no parent
+        self.terminal = bytearray(2)
+        self.nodes = len(nested)
+
+        first_free = 2
+        queue = [(ROOT, ROOT), (CONT_ROOT, CONT_ROOT)]  # (nested node, position)
+        for node, pos in queue:
+            if terminal[node]:
+                self.terminal[pos] = 1
+            if not nested[node]:
+                continue
+            codes = sorted((self.alphabet[ch], child) for ch, child in nested[node].items())
+            while first_free < len(self.check) and self.check[first_free] != -1:
+                first_free += 1
+            b = max(1, first_free - codes[0][0])
+            while not self._fits(b, codes):
+                b += 1
+            self.base[pos] = b
+            for code, child in codes:
+                self._grow(b + code + 1)
+                self.check[b + code] = pos
+                queue.append((child, b + code))
+
+    def _fits(self, b, codes):
+        for code, _ in codes:
+            if b + code < len(self.check) and self.check[b + code] != -1:
+                return False
+        return True
+
+    def _grow(self, size):
+        extra = size - len(self.check)
+        if extra > 0:
+            self.base.extend([0] * extra)
+            self.check.extend([-1] * extra)
+            self.terminal.extend(bytes(extra))
+
+    def tokenize_word(self, w):
+        base = self.base
+        check = self.check
+        terminal = self.terminal
+        size = len(check)
+        codes = [self.alphabet.get(ch, 0) for ch in w]
+        n = len(codes)
+        pieces = []
+        i = 0
+        while i < n:
+            # longest plain piece, then longest ## piece
+            plain = 0
+            node = ROOT
+            k = i
+            while k < n and codes[k]:
+                t = base[node] + codes[k]
+                if t >= size or check[t] != node:
+                    break
+                node = t
+                k += 1
+                if terminal[node]:
+                    plain = k - i
+            cont = 0
+            if i > 0:
+                node = CONT_ROOT
+                k = i
+                while k < n and codes[k]:
+                    t = base[node] + codes[k]
+                    if t >= size or check[t] != node:
+                        break
+                    node = t
+                    k += 1
+                    if terminal[node]:
+                        cont = k - i
+            # same length: wordpiece_tokenize checks the plain piece first
+            if plain == 0 and cont == 0:
+                pieces.append(w[i] if i == 0 else f"##{w[i]}")
+                i += 1
+            elif plain >= cont:
+                pieces.append(w[i:i + plain])
+                i += plain
+            else:
+                pieces.append(f"##{w[i:i + cont]}")
+                i += cont
+        return pieces
+
+    def memory_bytes(self):
+        alphabet_bytes = sys.getsizeof(self.alphabet) + sum(sys.getsizeof(ch) for ch in self.alphabet)
+        return sys.getsizeof(self.base) + sys.getsizeof(self.check) + sys.getsizeof(self.terminal) + alphabet_bytes
+
+
+def wordpiece_tokenize_trie(sentence, trie):
+    # drop in for wordpiece_tokenize(sentence, final_vocab)
+    out = []
+    for word in gujarati_words(sentence):
+        out.extend(trie.tokenize_word(word.lower()))
+    return out
+
+def set_memory_bytes(vocab):
+    return sys.getsizeof(vocab) + sum(sys.getsizeof(token) for token in vocab)
+
+
+class WordPieceEncoder:
+    """
+    wordpiece_tokenize_trie with token ids, for batch encoding into NumPy buffers.
+
+    Ids come from the model's sorted 'tokens' table (wordpiece_token_table for models
+    saved without one), characters that are not in the vocab at all get the unknown
+    id len(tokens). Words are cached like in BPEEncoder.
+    """
+
+    def __init__(self, vocab, tokens=None, cache_size=100000):
+        self.trie = WordPieceTrie(vocab)
+        self.tokens = list(tokens) if tokens is not None else wordpiece_token_table(vocab)
+        self.token_to_id = {token: i for i, token in enumerate(self.tokens)}
+        self.unk_id = len(self.tokens)
+        self.encode_word = lru_cache(maxsize=cache_size)(self._encode_word)
+
+    @classmethod
+    def from_file(cls, path=None):
+        # lean wordpiece_model.bin or a json model
+        model = read_model(path or find_model('wordpiece_model'))
+        return cls(model['vocab'], tokens=model.get('tokens'))
+
+    def _encode_word(self, w):
+        pieces = tuple(self.trie.tokenize_word(w))
+        return pieces, tuple(self.token_to_id.get(p, self.unk_id) for p in pieces)
+
+    def encode(self, sentence):
+        out = []
+        for word in gujarati_words(sentence):
+            out.extend(self.encode_word(word.lower())[0])
+        return out
+
+    def encode_ids(self, sentence):
+        ids = []
+        for word in gujarati_words(sentence):
+            ids.extend(self.encode_word(word.lower())[1])
+        return ids
+
+    def encode_batch(self, sentences):
+        # (int32 ids, int64 offsets), sentence i is ids[offsets[i]:offsets[i + 1]]
+        ids = []
+        offsets = [0]
+        encode_word = self.encode_word
+        for sentence in sentences:
+            for word in gujarati_words(sentence):
+                ids.extend(encode_word(word.lower())[1])
+            offsets.append(len(ids))
+        return pack_ids(ids, offsets)
+
+    def decode_batch(self, ids, offsets):
+        # token strings per text, ids outside the table come back as UNK_TOKEN
+        return unpack_tokens(ids, offsets, self.tokens)
@@ -0,0 +1,182 @@
+import argparse
+import math
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from lm_eval import Evaluator
+from packed_lm import ORDER_NAMES, PackedNgrams
+
+# per sentence loops of Lab 5 task23 / task4 and q1 vs the batched Evaluator, results and throughput
+# usage: python bench_lm_eval.py sentences.txt --train 40000 --eval 2000
+
+
+# Lab 5 task23 (space joined string counters)
+def good_turing_probs(counter, vocab_size, n):
+    N = sum(counter.values())
+    freq_of_freq = Counter(counter.values())
+    N1 = freq_of_freq[1]
+    probs = {}
+    for ng, c in counter.items():
+        Nc = freq_of_freq[c]
+        Nc1 = freq_of_freq.get(c+1, 0)
+        if Nc > 0:
+            c_star = (c+1) * Nc1 / Nc
+        else:
+            c_star = c
+        probs[ng] = c_star / N
+    if n == 1:
+        unseen_count = vocab_size - len(counter)
+    else:
+        unseen_count = vocab_size**n - len(counter)
+    p_unseen = (N1 / N) / max(1, unseen_count)
+    return probs, p_unseen
+
+def sentence_log_prob(sentence, probs, p_unseen, n):
+    tokens = ["<s>"]*(n-1) + sentence.strip().split() + ["</s>"]
+    log_prob = 0.0
+    for i in range(len(tokens)-n+1):
+        ng = " ".join(tokens[i:i+n])
+        p = probs.get(ng, p_unseen)
+        log_prob += math.log(p if p > 0 else 1e-15)
+    return log_prob
+
+def sentence_perplexity(sentence, probs, p_unseen, n):
+    tokens = ["<s>"]*(n-1) + sentence.strip().split() + ["</s>"]
+    log_prob = 0.0
+    for i in range(len(tokens)-n+1):
+        ng = " ".join(tokens[i:i+n])
+        p = probs.get(ng, p_unseen)
+        log_prob += math.log(p if p > 0 else 1e-15)
+    length = len(tokens)
+    return math.exp(-log_prob / length)
+
+# Lab 5 task4
+def interpolated_prob(ngram, lambdas, c):
+    w = ngram.split()
+    quad = c[4].get(" ".join(w),0) / max(1,c[3].get(" ".join(w[:3]),0))
+    tri  = c[3].get(" ".join(w[1:]),0) / max(1,c[2].get(" ".join(w[1:3]),0))
+    bi   = c[2].get(" ".join(w[2:]),0) / max(1,c[1].get(w[2],0))
+    uni  = c[1].get(w[3],0) / sum(c[1].values())
+    return lambdas[0]*quad + lambdas[1]*tri + lambdas[2]*bi + lambdas[3]*uni
+
+def sentence_interp(sentence, lambdas, c):
+    tokens = ["<s>","<s>","<s>"] + sentence.strip().split() + ["</s>"]
+    log_prob = 0.0
+    for i in range(len(tokens)-3):
+        ng = " ".join(tokens[i:i+4])
+        p = interpolated_prob(ng, lambdas, c)
+        log_prob += math.log(p if p>0 else 1e-15)
+    return log_prob, math.exp(-log_prob / max(1, len(sentence.strip().split())))
+
+# q1 (tuple counters, unigram keys are words)
+def q1_log_prob(sent, n, smoothing, k, counts, total_tokens, vocab_size, followers):
+    log_prob = 0.0
+    for i in range(3, len(sent)):
+        w = sent[i]
+        if n == 1:
+            num = counts['unigram'].get(w, 0) + k
+            den = total_tokens + k * vocab_size
+        else:
+            ctx = tuple(sent[i-n+1:i])
+            ctx_counts = counts[ORDER_NAMES[n-2]]
+            ctx_count = ctx_counts.get(ctx[0] if n == 2 else ctx, 0)
+            if smoothing == 'add_k':
+                scale = vocab_size
+            else:
+                f = followers[n].get(ctx, 0)
+                scale = f if f > 0 else vocab_size
+            num = counts[ORDER_NAMES[n-1]].get((*ctx, w), 0) + k
+            den = ctx_count + k * scale
+        prob = num / den if den > 0 else 0.0
+        log_prob += math.log(prob + 1e-12)
+    return log_prob
+
+def compute_follower_counts(ngram_counts):
+    follower_map = defaultdict(set)
+    for ngram in ngram_counts:
+        follower_map[ngram[:-1]].add(ngram[-1])
+    return {context: len(fset) for context, fset in follower_map.items()}
+
+def generate_ngrams(tokens, n):
+    for i in range(len(tokens) - n + 1):
+        yield tuple(tokens[i:i+n])
+
+def close(a, b):
+    return np.allclose(a, b, rtol=1e-9, atol=1e-9)
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("corpus")
+parser.add_argument("--train", type=int, default=40000)
+parser.add_argument("--eval", type=int, default=2000)
+args = parser.parse_args()
+
+with open(args.corpus, "r", encoding="utf-8") as f:
+    lines = [line for line in f if line.strip()]
+train, sentences = lines[:args.train], lines[args.train:args.train + args.eval]
+if not sentences:
+    parser.error(f"{args.corpus} has {len(lines)} lines, none left to evaluate after --train {args.train}")
+
+counts = {name: Counter() for name in ORDER_NAMES}
+for line in train:
+    sent = ['<s>', '<s>', '<s>'] + line.split() + ['</s>']
+    counts['unigram'].update(sent)
+    for n, name in enumerate(ORDER_NAMES[1:], 2):
+        counts[name].update(generate_ngrams(sent, n))
+string_counts = {n: Counter({k if isinstance(k, str) else " ".join(k): v for k, v in counts[name].items()})
+                 for n, name in enumerate(ORDER_NAMES, 1)}
+packed = PackedNgrams.from_counters(counts)
+vocab_size = len(counts['unigram'])
+total_tokens = sum(counts['unigram'].values())
+followers = {n: compute_follower_counts(counts[ORDER_NAMES[n-1]]) for n in (2, 3, 4)}
+lambdas = [0.4, 0.3, 0.2, 0.1]
+prepared = [['<s>', '<s>', '<s>'] + s.split() + ['</s>'] for s in sentences]
+
+def loops():
+    out = {}
+    for n in (1, 2, 3, 4):
+        probs, pu = good_turing_probs(string_counts[n], vocab_size, n)
+        out[f"gt{n}"] = ([sentence_log_prob(s, probs, pu, n) for s in sentences],
+                         [sentence_perplexity(s, probs, pu, n) for s in sentences])
+    out["interp"] = tuple(zip(*[sentence_interp(s, lambdas, string_counts) for s in sentences]))
+    for n in (1, 2, 3, 4):
+        for k in (1.0, 0.5):
+            out[f"add{k}_{n}"] = ([q1_log_prob(s, n, 'add_k', k, counts, total_tokens, vocab_size, followers)
+                                   for s in prepared], None)
+        if n > 1:
+            out[f"tt{n}"] = ([q1_log_prob(s, n, 'token_type', 1.0, counts, total_tokens, vocab_size, followers)
+                              for s in prepared], None)
+    return out
+
+def batched():
+    ev = Evaluator(packed, [s.split() for s in sentences])
+    out = {}
+    for n in (1, 2, 3, 4):
+        out[f"gt{n}"] = ev.good_turing(n)
+    out["interp"] = ev.interpolated(lambdas)
+    for n in (1, 2, 3, 4):
+        for k in (1.0, 0.5):
+            out[f"add{k}_{n}"] = ev.add_k(n, k)
+        if n > 1:
+            out[f"tt{n}"] = ev.token_type(n, 1.0)
+    return out
+
+old, old_time = timed(loops)
+new, new_time = timed(batched)
+print(f"{len(sentences)} sentences, {len(old)} schemes, {len(packed.ids[4])} quadrigrams in the model")
+print(f"{'scheme':>10} {'logprob':>8} {'ppl':>6}")
+for name in old:
+    same_ppl = "-" if old[name][1] is None else str(close(old[name][1], new[name][1]))
+    print(f"{name:>10} {str(close(old[name][0], new[name][0])):>8} {same_ppl:>6}")
+max_diff = max(float(np.abs(np.array(old[name][0]) - new[name][0]).max()) for name in old)
+print(f"\nmax |logprob| diff {max_diff:.1e}")
+print(f"loops   {old_time:.2f}s  {len(sentences) * len(old) / old_time:.0f} sentence-schemes/s")
+print(f"batched {new_time:.2f}s  {len(sentences) * len(old) / new_time:.0f} sentence-schemes/s "
+      f"({old_time / new_time:.0f}x)")
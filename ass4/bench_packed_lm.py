@@ -0,0 +1,100 @@
+import argparse
+import csv
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+import numpy as np
+
+from packed_lm import ORDER_NAMES, PackedNgrams, read_count_csv
+
+# memory of build_ngram_models' Counters vs the packed tables, csv vs packed file load time,
+# dict vs batch lookups and an ARPA round trip
+# usage: python bench_packed_lm.py sentences.txt --lines 100000
+
+
+def generate_ngrams(tokens, n):
+    for i in range(len(tokens) - n + 1):
+        yield tuple(tokens[i:i+n])
+
+def build_counts(path, max_lines):
+    # build_ngram_models of q1.ipynb on whitespace tokens
+    counts = {name: Counter() for name in ORDER_NAMES}
+    with open(path, "r", encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            if i >= max_lines:
+                break
+            sent = ['<s>', '<s>', '<s>'] + line.split() + ['</s>']
+            counts['unigram'].update(sent)
+            for n, name in enumerate(ORDER_NAMES[1:], 2):
+                counts[name].update(generate_ngrams(sent, n))
+    return counts
+
+def timed(func):
+    gc.disable()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    gc.enable()
+    return result, elapsed
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("corpus")
+parser.add_argument("--lines", type=int, default=100000)
+parser.add_argument("--queries", type=int, default=200000)
+args = parser.parse_args()
+tmp = tempfile.mkdtemp()
+
+tracemalloc.start()
+counts = build_counts(args.corpus, args.lines)
+counter_bytes = tracemalloc.get_traced_memory()[0]
+tracemalloc.stop()
+n_grams = sum(len(c) for c in counts.values())
+packed, build_time = timed(lambda: PackedNgrams.from_counters(counts))
+same = all(packed.to_counter(n) == Counter({(k,) if isinstance(k, str) else k: v for k, v in counts[name].items()})
+           for n, name in enumerate(ORDER_NAMES, 1))
+print(f"{n_grams} n-grams, {len(packed.words)} words, packed in {build_time:.2f}s, same counts: {same}")
+print(f"Counters: {counter_bytes / 1e6:.1f} MB ({counter_bytes / n_grams:.0f} B/n-gram), "
+      f"packed arrays: {packed.nbytes() / 1e6:.1f} MB ({packed.nbytes() / n_grams:.1f} B/n-gram)")
+
+# LAB4 style csvs vs one packed file
+csv_paths = {}
+for n, name in enumerate(ORDER_NAMES, 1):
+    csv_paths[n] = os.path.join(tmp, f"{name}.csv")
+    with open(csv_paths[n], "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Ngram", "Count"])
+        for key, c in counts[name].items():
+            writer.writerow([key if isinstance(key, str) else " ".join(key), c])
+lm_path = os.path.join(tmp, "ngram_counts.lm")
+packed.save(lm_path)
+_, csv_time = timed(lambda: {n: read_count_csv(path) for n, path in csv_paths.items()})
+loaded, load_time = timed(lambda: PackedNgrams.load(lm_path))
+csv_mb = sum(os.path.getsize(p) for p in csv_paths.values()) / 1e6
+print(f"\nload csvs: {csv_time:.2f}s ({csv_mb:.1f} MB), load packed file: {load_time:.3f}s "
+      f"({os.path.getsize(lm_path) / 1e6:.1f} MB)")
+
+# quadrigram lookups, half of them unseen
+rng = np.random.default_rng(0)
+quads = list(counts['quadrigram'])
+queries = [quads[i] for i in rng.integers(0, len(quads), args.queries // 2)]
+words = np.array(loaded.words, dtype=object)
+queries += list(map(tuple, words[rng.integers(0, len(words), (args.queries - len(queries), 4))].tolist()))
+expected, dict_time = timed(lambda: [counts['quadrigram'].get(q, 0) for q in queries])
+query_ids = np.array([loaded.encode(q) for q in queries])
+found, packed_time = timed(lambda: loaded.lookup(query_ids))
+print(f"{len(queries)} quadrigram lookups: dict {dict_time:.3f}s, packed batch {packed_time:.3f}s, "
+      f"same: {found.tolist() == expected}")
+
+# ARPA export / import of the MLE estimates
+arpa_path = os.path.join(tmp, "model.arpa")
+_, arpa_write = timed(lambda: loaded.write_arpa(arpa_path))
+arpa, arpa_read = timed(lambda: PackedNgrams.read_arpa(arpa_path))
+max_diff = max(float(np.abs(arpa.logprobs[n] - loaded.mle_log10_probs(n)).max()) for n in loaded.orders)
+same_rows = arpa.words == loaded.words and all(np.array_equal(arpa.ids[n], loaded.ids[n]) for n in loaded.orders)
+print(f"ARPA write {arpa_write:.2f}s, read {arpa_read:.2f}s, same n-grams: {same_rows}, "
+      f"max |log10 p| diff: {max_diff:.1e}")
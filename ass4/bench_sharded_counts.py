@@ -0,0 +1,61 @@
+import argparse
+import os
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from packed_lm import ORDER_NAMES
+from sharded_counts import count_ngrams_sharded, count_sentences, sentence_text
+
+# build_ngram_models in one process vs the sharded map-reduce counting, same counts and time
+# usage: python bench_sharded_counts.py sentences.txt --lines 40000 --row-group 5000 --workers 4
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+def same_counts(packed, counts):
+    return all(packed.to_counter(n) == Counter({(k,) if isinstance(k, str) else k: v for k, v in counts[name].items()})
+               for n, name in enumerate(ORDER_NAMES, 1))
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("corpus")
+parser.add_argument("--lines", type=int, default=40000)
+parser.add_argument("--row-group", type=int, default=5000)
+parser.add_argument("--workers", type=int, default=os.cpu_count())
+args = parser.parse_args()
+tmp = tempfile.mkdtemp()
+
+with open(args.corpus, "r", encoding="utf-8") as f:
+    sentences = [line.strip() for line, _ in zip(f, range(args.lines))]
+# a null row in the first and the last row group, both modes count it as an empty sentence
+sentences[0] = sentences[-1] = None
+path = os.path.join(tmp, "sentences.parquet")
+pd.DataFrame({"sentence": sentences}).to_parquet(path, row_group_size=args.row_group)
+
+# q1: read the whole column, tokenize and count in one process
+def single():
+    return count_sentences([sentence_text(value) for value in pd.read_parquet(path)["sentence"].tolist()])
+
+(counts, total_tokens), single_time = timed(single)
+n_grams = sum(len(c) for c in counts.values())
+print(f"{len(sentences)} sentences, {n_grams} n-grams, "
+      f"{-(-len(sentences) // args.row_group)} row groups of {args.row_group}")
+print(f"single process: {single_time:.2f}s")
+
+for workers, block_rows in ((1, None), (args.workers, None), (args.workers, 1000)):
+    spill = tempfile.mkdtemp(dir=tmp)
+    kwargs = {"block_rows": block_rows} if block_rows else {}
+    (packed, tokens), seconds = timed(lambda: count_ngrams_sharded(path, workers=workers, spill_dir=spill, **kwargs))
+    spill_mb = sum(os.path.getsize(os.path.join(spill, name)) for name in os.listdir(spill)) / 1e6
+    label = f"{workers} workers" + (f", merge blocks of {block_rows}" if block_rows else "")
+    print(f"sharded, {label}: {seconds:.2f}s, {spill_mb:.1f} MB spilled, "
+          f"same counts: {same_counts(packed, counts) and tokens == total_tokens}")
+print(f"rows per order: {[len(packed.ids[n]) for n in packed.orders]}, "
+      f"total count check: {int(np.sum(packed.counts[1])) == total_tokens}")
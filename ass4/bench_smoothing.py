@@ -0,0 +1,206 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from packed_lm import ORDER_NAMES, PackedNgrams
+from smoothing import SmoothedModel
+
+# eager Good-Turing dicts and estimate_lambdas of Lab 5 vs the lazy SmoothedModel tables,
+# per order build time / memory, and the Kneser-Ney tables against a dict implementation
+# usage: python bench_smoothing.py sentences.txt --lines 20000
+
+
+def generate_ngrams(tokens, n):
+    for i in range(len(tokens) - n + 1):
+        yield tuple(tokens[i:i+n])
+
+# Lab 5 task23 / task4 (space joined string counters)
+def good_turing_probs(counter, vocab_size, n):
+    N = sum(counter.values())
+    freq_of_freq = Counter(counter.values())
+    N1 = freq_of_freq[1]
+    probs = {}
+    for ng, c in counter.items():
+        Nc = freq_of_freq[c]
+        Nc1 = freq_of_freq.get(c+1, 0)
+        if Nc > 0:
+            c_star = (c+1) * Nc1 / Nc
+        else:
+            c_star = c
+        probs[ng] = c_star / N
+    if n == 1:
+        unseen_count = vocab_size - len(counter)
+    else:
+        unseen_count = vocab_size**n - len(counter)
+    p_unseen = (N1 / N) / max(1, unseen_count)
+    return probs, p_unseen
+
+def estimate_lambdas(quad_c, tri_c, bi_c, uni_c):
+    lambda_counts = [0,0,0,0]
+    for qng, qcount in quad_c.items():
+        if qcount < 2:
+            continue
+        w1,w2,w3,w4 = qng.split()
+        trig = " ".join([w2,w3,w4])
+        bigr = " ".join([w3,w4])
+        unigr = w4
+        trig_prefix = " ".join([w1,w2,w3])
+        trig_count = tri_c.get(trig_prefix, 0)
+        bigr_count = bi_c.get(" ".join([w2,w3]), 0)
+        unigr_count = uni_c.get(w3, 0)
+        probs = [
+            (qcount-1) / max(1, trig_count-1),
+            tri_c.get(trig,0) / max(1, bigr_count-1),
+            bi_c.get(bigr,0) / max(1, unigr_count-1),
+            uni_c.get(unigr,0) / sum(uni_c.values())
+        ]
+        max_index = np.argmax(probs)
+        lambda_counts[max_index] += qcount
+    total = sum(lambda_counts)
+    if total == 0:
+        return [0.25,0.25,0.25,0.25]
+    return [c/total for c in lambda_counts]
+
+def kneser_ney_reference(counts, top, vocab_size):
+    # interpolated Kneser-Ney with dicts, one n-gram at a time
+    used = {top: counts[top]}
+    for n in range(top - 1, 0, -1):
+        continuation = Counter(g[1:] for g in counts[n + 1])
+        used[n] = {g: continuation.get(g, 0) for g in counts[n]}
+    discount, totals, types = {}, {}, {}
+    for n in range(1, top + 1):
+        n1 = sum(1 for c in used[n].values() if c == 1)
+        n2 = sum(1 for c in used[n].values() if c == 2)
+        discount[n] = n1 / (n1 + 2 * n2) if n1 + n2 else 0.0
+        totals[n], types[n] = defaultdict(int), defaultdict(int)
+        for g, c in used[n].items():
+            totals[n][g[:-1]] += c
+            types[n][g[:-1]] += c > 0
+
+    def prob(g):
+        n = len(g)
+        lower = 1 / vocab_size if n == 1 else prob(g[1:])
+        total = totals[n].get(g[:-1], 0)
+        if total == 0:
+            return lower
+        d = discount[n]
+        return max(used[n].get(g, 0) - d, 0) / total + d * types[n][g[:-1]] / total * lower
+    return prob
+
+def arpa_prob(arpa, ids):
+    # backoff reading of an ARPA model, log10
+    n = len(ids)
+    pos, found = arpa.find(np.array([ids]))
+    if found[0]:
+        return float(arpa.logprobs[n][pos[0]])
+    pos, found = arpa.find(np.array([ids[:-1]]))
+    backoff = float(arpa.backoffs[n - 1][pos[0]]) if found[0] else 0.0
+    return backoff + arpa_prob(arpa, ids[1:])
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+def traced(func):
+    tracemalloc.start()
+    result, seconds = timed(func)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument("corpus")
+parser.add_argument("--lines", type=int, default=20000)
+parser.add_argument("--queries", type=int, default=2000)
+args = parser.parse_args()
+
+counts = {name: Counter() for name in ORDER_NAMES}
+with open(args.corpus, "r", encoding="utf-8") as f:
+    for i, line in enumerate(f):
+        if i >= args.lines:
+            break
+        sent = ['<s>', '<s>', '<s>'] + line.split() + ['</s>']
+        counts['unigram'].update(sent)
+        for n, name in enumerate(ORDER_NAMES[1:], 2):
+            counts[name].update(generate_ngrams(sent, n))
+string_counts = {n: Counter({k if isinstance(k, str) else " ".join(k): v for k, v in counts[name].items()})
+                 for n, name in enumerate(ORDER_NAMES, 1)}
+tuple_counts = {n: {(k,) if isinstance(k, str) else k: v for k, v in counts[name].items()}
+                for n, name in enumerate(ORDER_NAMES, 1)}
+packed = PackedNgrams.from_counters(counts)
+vocab_size = len(counts['unigram'])
+print(f"{args.lines} lines, rows per order: {[len(packed.ids[n]) for n in packed.orders]}")
+
+# everything up front (task23 cell 3) vs one order on first use
+eager, eager_time, eager_peak = traced(lambda: {n: good_turing_probs(string_counts[n], vocab_size, n)
+                                                for n in (1, 2, 3, 4)})
+_, lazy_time, lazy_peak = traced(lambda: SmoothedModel(packed).good_turing(2))
+print(f"\nGood-Turing, all orders as dicts: {eager_time:.2f}s, {eager_peak / 1e6:.1f} MB peak")
+print(f"Good-Turing, bigrams only on first use: {lazy_time:.3f}s, {lazy_peak / 1e6:.1f} MB peak")
+
+model = SmoothedModel(packed)
+print(f"\n{'table':>12} {'order':>5} {'rows':>8} {'build s':>8} {'MB':>6} {'peak MB':>8}")
+for n in (1, 2, 3, 4):
+    for scheme, build in (("good_turing", lambda: model.good_turing(n)),
+                          ("kneser_ney", lambda: model.kneser_ney(n, n == 4))):
+        _, _, peak = traced(build)
+        key = (scheme, n) if scheme == "good_turing" else (scheme, n, n == 4)
+        seconds, nbytes = model.build_stats[key]
+        print(f"{scheme:>12} {n:>5} {len(packed.ids[n]):>8} {seconds:>8.3f} {nbytes / 1e6:>6.2f} {peak / 1e6:>8.2f}")
+print(f"discounts of the 4-gram model: {np.round(model.discounts(4), 4).tolist()}")
+
+gt_diff = 0.0
+table = np.array(packed.words, dtype=object)
+for n in (1, 2, 3, 4):
+    probs, p_unseen = eager[n]
+    grams = [" ".join(g) for g in table[packed.ids[n].astype(np.int64)].tolist()]
+    expected = np.array([probs[g] for g in grams])
+    got = model.good_turing(n).probs
+    # c* is 0 where no n-gram has count c + 1
+    gt_diff = max(gt_diff, float((np.abs(got - expected) / np.where(expected > 0, expected, 1)).max()))
+    assert model.good_turing(n).unseen == p_unseen
+print(f"Good-Turing float32 tables vs dicts: max relative diff {gt_diff:.1e}")
+
+# Kneser-Ney: random seen and unseen n-grams of every order against the dict version
+rng = np.random.default_rng(0)
+kn_diff = 0.0
+for top in (2, 4):
+    reference = kneser_ney_reference(tuple_counts, top, vocab_size)
+    rows = packed.ids[top][rng.integers(0, len(packed.ids[top]), args.queries // 2)].astype(np.int64)
+    unseen = rng.integers(0, len(packed.words) + 1, (args.queries // 2, top))
+    queries = np.concatenate([rows, unseen])
+    got = model.kn_prob(queries)
+    words = np.array(packed.words + ["<unk>"], dtype=object)
+    expected = np.array([reference(tuple(g)) for g in words[queries].tolist()])
+    kn_diff = max(kn_diff, float(np.abs(got / expected - 1).max()))
+print(f"Kneser-Ney vs dict version on {2 * args.queries} n-grams: max relative diff {kn_diff:.1e}")
+
+# every seen context is a distribution over the vocabulary
+starts = packed.context_starts(4)
+contexts = packed.ids[4][starts[rng.integers(0, len(starts), 10)], :-1].astype(np.int64)
+vocab = np.arange(len(packed.words))
+sums = [model.kn_prob(np.c_[np.repeat(ctx[None], len(vocab), axis=0), vocab]).sum() for ctx in contexts]
+print(f"sum over the vocabulary for 10 contexts: {min(sums):.5f} .. {max(sums):.5f}")
+
+# ARPA export of the 4-gram model read back with plain backoff
+arpa_path = os.path.join(tempfile.mkdtemp(), "kn.arpa")
+packed.write_arpa(arpa_path, *model.arpa_tables())
+arpa = PackedNgrams.read_arpa(arpa_path)
+queries = np.concatenate([packed.ids[4][rng.integers(0, len(packed.ids[4]), 200)].astype(np.int64),
+                          rng.integers(0, len(packed.words), (200, 4))])
+got = np.log10(model.kn_prob(queries))
+from_arpa = np.array([arpa_prob(arpa, arpa.encode([packed.words[i] for i in q])) for q in queries])
+print(f"ARPA backoff reading vs kn_prob: max |log10 p| diff {np.abs(got - from_arpa).max():.1e}")
+
+lambdas, old_time = timed(lambda: estimate_lambdas(string_counts[4], string_counts[3], string_counts[2],
+                                                   string_counts[1]))
+new, new_time = timed(lambda: SmoothedModel(packed).interpolation_lambdas())
+print(f"\nestimate_lambdas {old_time:.2f}s, interpolation_lambdas {new_time:.3f}s, same: {lambdas == new} "
+      f"{[round(x, 4) for x in new]}")
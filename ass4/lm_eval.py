@@ -0,0 +1,134 @@
+import numpy as np
+
+from packed_lm import row_keys
+from smoothing import SmoothedModel
+
+PAD = 3  # <s> in front of every sentence, context for quadrigrams like prepare_sentences
+LOG_FLOOR = 1e-15  # Lab 5: math.log(p if p > 0 else 1e-15)
+LOG_EPS = 1e-12  # q1: math.log(prob + 1e-12)
+
+
+class Evaluator:
+    """
+    Scores a whole evaluation set against a PackedNgrams table, all sentences at once.
+
+    The sentences are encoded once into one flat id array (<s> x 3 + tokens + </s>),
+    and every scored token (the tokens and </s>) gets a row of the 4 ids ending at
+    it, the n-gram of order n is the last n columns. Counts of the n-grams and their
+    contexts are looked up once per order with one searchsorted and cached, every
+    smoothing scheme is a few array operations on them, and per sentence sums are one
+    np.add.reduceat. The float operations follow the notebooks' formulas in the same
+    order, so results match the per sentence loops up to the summation order.
+
+    Each scheme returns (log prob, perplexity) arrays with one entry per sentence.
+    Good-Turing and Kneser-Ney tables come from model, a float64 SmoothedModel over
+    packed unless one is passed in.
+    """
+
+    def __init__(self, packed, token_lists, pad=PAD, model=None):
+        self.packed = packed
+        self.model = model or SmoothedModel(packed, dtype=np.float64)
+        self.pad = pad
+        lengths = [len(tokens) for tokens in token_lists]
+        words = []
+        for tokens in token_lists:
+            words.extend(["<s>"] * pad)
+            words.extend(tokens)
+            words.append("</s>")
+        ids = packed.encode(words)
+        self.lengths = np.array(lengths, dtype=np.int64)
+        scored = self.lengths + 1
+        offsets = np.r_[0, np.cumsum(self.lengths + pad + 1)]
+        # flat positions of the scored tokens, pad positions are skipped
+        self.starts = (np.cumsum(scored) - scored).astype(np.int64)
+        positions = np.arange(scored.sum()) - np.repeat(self.starts, scored) + np.repeat(offsets[:-1] + pad, scored)
+        self.windows = ids[positions[:, None] + np.arange(-pad, 1)]
+        self.vocab_size = len(packed.ids[1])
+        self._cache = {}
+
+    def _cached(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def ngram(self, n):
+        return self.windows[:, self.pad + 1 - n:]
+
+    def counts(self, n):
+        # count of every scored n-gram, 0 when unseen
+        return self._cached(("counts", n), lambda: self.packed.lookup(self.ngram(n)))
+
+    def context_counts(self, n):
+        # count of the n - 1 word context as an (n - 1)-gram, like bigram_counts.get(context, 0)
+        return self._cached(("context", n), lambda: self.packed.lookup(self.ngram(n)[:, :-1]))
+
+    def followers(self, n):
+        # distinct words seen after each scored context (compute_follower_counts), 0 when unseen
+        def build():
+            starts = self.packed.context_starts(n)
+            sizes = np.diff(np.r_[starts, len(self.packed.ids[n])])
+            contexts = row_keys(self.packed.ids[n][starts, :-1])
+            query = row_keys(self.ngram(n)[:, :-1])
+            if not len(contexts):
+                return np.zeros(len(query), dtype=np.int64)
+            pos = np.minimum(np.searchsorted(contexts, query), len(contexts) - 1)
+            return np.where(contexts[pos] == query, sizes[pos], 0)
+        return self._cached(("followers", n), build)
+
+    def sentence_sums(self, log_probs):
+        if not len(self.starts):
+            # no sentences, reduceat needs at least one index
+            return np.zeros(0)
+        return np.add.reduceat(log_probs, self.starts)
+
+    def _result(self, log_probs, lengths):
+        log_prob = self.sentence_sums(log_probs)
+        return log_prob, np.exp(-log_prob / lengths)
+
+    def good_turing(self, n):
+        """
+        good_turing_probs + sentence_log_prob / sentence_perplexity of Lab 5 task23.
+
+        c* = (c + 1) N_{c+1} / N_c for every table row, unseen n-grams get
+        (N1 / N) / (V^n - rows). The perplexity divides by the padded length
+        (n - 1) + tokens + 1 like sentence_perplexity.
+        """
+        table = self.model.good_turing(n)
+        pos, found = self.packed.find(self.ngram(n))
+        p = np.where(found, table.probs[pos], table.unseen)
+        return self._result(np.log(np.where(p > 0, p, LOG_FLOOR)), self.lengths + n)
+
+    def kneser_ney(self, n):
+        # interpolated Kneser-Ney of order n, perplexity over the scored tokens (tokens + </s>)
+        p = self._cached(("kn", n), lambda: self.model.kn_prob(self.ngram(n)))
+        return self._result(np.log(np.where(p > 0, p, LOG_FLOOR)), self.lengths + 1)
+
+    def add_k(self, n, k):
+        # prob_add_k_* of q1, perplexity over the scored tokens (tokens + </s>)
+        if n == 1:
+            numerator = self.counts(1) + k
+            denominator = int(self.packed.counts[1].sum()) + k * self.vocab_size
+        else:
+            numerator = self.counts(n) + k
+            denominator = self.context_counts(n) + k * self.vocab_size
+        prob = np.where(denominator > 0, numerator / denominator, 0.0)
+        return self._result(np.log(prob + LOG_EPS), self.lengths + 1)
+
+    def token_type(self, n, k):
+        # prob_token_type_* of q1, k scaled by the number of follower types of the context
+        followers = self.followers(n)
+        scale = np.where(followers > 0, followers, self.vocab_size)
+        numerator = self.counts(n) + k
+        denominator = self.context_counts(n) + k * scale
+        prob = np.where(denominator > 0, numerator / denominator, 0.0)
+        return self._result(np.log(prob + LOG_EPS), self.lengths + 1)
+
+    def interpolated(self, lambdas):
+        # interpolated_prob + sentence_prob_interp / sentence_perplexity_interp of Lab 5 task4
+        quad = self.counts(4) / np.maximum(1, self.context_counts(4))
+        tri = self.counts(3) / np.maximum(1, self.context_counts(3))
+        bi = self.counts(2) / np.maximum(1, self.context_counts(2))
+        uni = self.counts(1) / int(self.packed.counts[1].sum())
+        p = lambdas[0]*quad + lambdas[1]*tri + lambdas[2]*bi + lambdas[3]*uni
+        return self._result(np.log(np.where(p > 0, p, LOG_FLOOR)), np.maximum(1, self.lengths))
+
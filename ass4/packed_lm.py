@@ -0,0 +1,294 @@
+import csv
+import json
+import struct
+import sys
+from collections import Counter
+
+import numpy as np
+
+ORDER_NAMES = ("unigram", "bigram", "trigram", "quadrigram")
+ID_DTYPE = np.dtype(">u4")  # big endian, so the raw bytes of a row sort like its id tuple
+MAGIC = b"NGRM"
+ALIGN = 8
+
+
+def ngram_key(key):
+    # tuples from build_ngram_models, "w1 w2" strings from the LAB4 csvs, plain unigram words
+    return tuple(key.split()) if isinstance(key, str) else tuple(key)
+
+def aligned(size):
+    return -(-size // ALIGN) * ALIGN
+
+def order_of(name):
+    return ORDER_NAMES.index(name) + 1 if isinstance(name, str) else int(name)
+
+def row_keys(ids):
+    # one fixed size bytes value per row, numpy sorts and searches these like the id tuples
+    ids = np.ascontiguousarray(ids, dtype=ID_DTYPE)
+    return ids.view(np.dtype((np.void, ids.shape[1] * ID_DTYPE.itemsize))).reshape(-1)
+
+def read_count_csv(path):
+    # Ngram,Count tables like LAB4/*.csv, n-grams space separated
+    counts = Counter()
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if len(row) < 2:
+                continue
+            try:
+                count = int(row[1])
+            except ValueError:
+                continue
+            ngram = ngram_key(row[0])
+            if ngram:
+                counts[ngram] = count
+    return counts
+
+
+class PackedNgrams:
+    """
+    N-gram tables as sorted NumPy arrays over an integer vocabulary.
+
+    words is the sorted vocabulary (id = position). Order n has an (rows, n) array of
+    big endian uint32 ids, sorted lexicographically, with aligned int64 counts
+    (or float32 log10 probs / backoffs when read from ARPA). A lookup is a
+    searchsorted over the rows viewed as fixed size byte strings, 4 bytes per word
+    plus 8 for the count instead of a tuple of str keys in a dict. save / load use
+    one file whose arrays are memory-mapped.
+    """
+
+    def __init__(self, words, ids, counts=None, logprobs=None, backoffs=None):
+        self.words = list(words)
+        self.word_index = {w: i for i, w in enumerate(self.words)}
+        self.unk_id = len(self.words)  # matches no row
+        self.ids = ids
+        self.counts = counts
+        self.logprobs = logprobs
+        self.backoffs = backoffs
+        self._keys = {n: row_keys(rows) for n, rows in ids.items()}
+
+    @property
+    def orders(self):
+        return sorted(self.ids)
+
+    @classmethod
+    def from_counters(cls, counters):
+        """
+        Pack {order: Counter} tables, orders given as 1..4 or 'unigram'..'quadrigram'.
+
+        Works on the dict build_ngram_models returns (tuple keys, unigram keys are
+        words) and on the space joined string Counters of Lab 5.
+        """
+        tables = {order_of(name): counter for name, counter in counters.items()}
+        words = sorted({w for counter in tables.values() for key in counter for w in ngram_key(key)})
+        word_index = {w: i for i, w in enumerate(words)}
+        ids = {}
+        counts = {}
+        for n, counter in sorted(tables.items()):
+            flat = np.fromiter((word_index[w] for key in counter for w in ngram_key(key)),
+                               dtype=np.uint32, count=len(counter) * n)
+            rows = flat.reshape(-1, n).astype(ID_DTYPE)
+            values = np.fromiter(counter.values(), dtype=np.int64, count=len(counter))
+            order = np.argsort(row_keys(rows), kind="stable")
+            ids[n] = rows[order]
+            counts[n] = values[order]
+        return cls(words, ids, counts)
+
+    @classmethod
+    def from_csv(cls, paths):
+        # {order: csv path} of LAB4 style count tables
+        return cls.from_counters({n: read_count_csv(path) for n, path in paths.items()})
+
+    def encode(self, tokens):
+        # token ids, unknown words get unk_id
+        get = self.word_index.get
+        unk = self.unk_id
+        return np.array([get(w, unk) for w in tokens], dtype=np.int64)
+
+    def find(self, ids):
+        """
+        Row positions of a (k, n) array of id rows, and whether each row is in the table.
+
+        Positions of missing rows are clipped into range, mask them with found.
+        """
+        ids = np.asarray(ids)
+        n = ids.shape[1]
+        keys = self._keys[n]
+        if not len(keys):
+            return np.zeros(len(ids), dtype=np.int64), np.zeros(len(ids), dtype=bool)
+        query = row_keys(ids)
+        pos = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+        return pos, keys[pos] == query
+
+    def lookup(self, ids, values=None, default=0):
+        # values (counts by default) of the id rows, default where the n-gram is not in the table
+        ids = np.asarray(ids)
+        n = ids.shape[1]
+        values = self.counts[n] if values is None else values[n]
+        pos, found = self.find(ids)
+        return np.where(found, values[pos], default)
+
+    def count(self, ngram):
+        ngram = ngram_key(ngram)
+        return int(self.lookup(self.encode(ngram).reshape(1, -1))[0])
+
+    def context_starts(self, n):
+        # first row of every context (the first n - 1 words), rows are sorted so a context is one run
+        prefix = self.ids[n][:, :-1]
+        if not len(prefix):
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(np.r_[True, (prefix[1:] != prefix[:-1]).any(axis=1)])
+
+    def context_totals(self, n):
+        """
+        Sum of the counts of all n-grams that share each row's first n - 1 words.
+
+        Every context is one run of rows, summed with reduceat. Unigrams all share
+        the empty context.
+        """
+        counts = self.counts[n]
+        if n == 1 or not len(counts):
+            return np.full(len(counts), counts.sum(), dtype=np.int64)
+        starts = self.context_starts(n)
+        totals = np.add.reduceat(counts, starts)
+        return np.repeat(totals, np.diff(np.r_[starts, len(counts)]))
+
+    def to_counter(self, n):
+        # the order n table as a Counter of word tuples
+        table = np.array(self.words, dtype=object)
+        grams = table[self.ids[n].astype(np.int64)].tolist()
+        return Counter(dict(zip(map(tuple, grams), self.counts[n].tolist())))
+
+    def nbytes(self):
+        arrays = list(self.ids.values())
+        for extra in (self.counts, self.logprobs, self.backoffs):
+            if extra:
+                arrays.extend(extra.values())
+        return sum(a.nbytes for a in arrays)
+
+    # one file: MAGIC, header length, json header, then the sections, each 8 byte aligned
+    def save(self, path):
+        sections = [("words", np.frombuffer("\n".join(self.words).encode("utf-8"), dtype=np.uint8))]
+        for n in self.orders:
+            for name, table in (("ids", self.ids), ("counts", self.counts),
+                                ("logprobs", self.logprobs), ("backoffs", self.backoffs)):
+                if table:
+                    sections.append((f"{n}.{name}", np.ascontiguousarray(table[n])))
+        header = {"orders": self.orders, "sections": {}}
+        offset = 0
+        for name, data in sections:
+            header["sections"][name] = {"offset": offset, "dtype": data.dtype.str, "shape": list(data.shape)}
+            offset += aligned(data.nbytes)
+        header_bytes = json.dumps(header).encode("utf-8")
+        data_start = aligned(len(MAGIC) + 8 + len(header_bytes))
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<Q", len(header_bytes)))
+            f.write(header_bytes)
+            for name, data in sections:
+                f.seek(data_start + header["sections"][name]["offset"])
+                f.write(data.tobytes())
+            f.truncate(data_start + offset)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        # only the vocabulary is read, the arrays are memory-mapped (or read when mmap=False)
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a packed n-gram file")
+            (header_len,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_len))
+        data_start = aligned(len(MAGIC) + 8 + header_len)
+        sections = header["sections"]
+
+        def array(name, use_mmap=mmap):
+            entry = sections[name]
+            dtype = np.dtype(entry["dtype"])
+            shape = tuple(entry["shape"])
+            offset = data_start + entry["offset"]
+            if use_mmap and np.prod(shape):
+                return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)
+            return np.fromfile(path, dtype=dtype, count=int(np.prod(shape)), offset=offset).reshape(shape)
+
+        text = array("words", use_mmap=False).tobytes().decode("utf-8")
+        tables = {}
+        for name in ("ids", "counts", "logprobs", "backoffs"):
+            if f"{header['orders'][0]}.{name}" in sections:
+                tables[name] = {n: array(f"{n}.{name}") for n in header["orders"]}
+        return cls(text.split("\n") if text else [], **tables)
+
+    def mle_log10_probs(self, n):
+        # log10 c(ngram) / c(context), context counts summed over the table itself
+        return np.log10(self.counts[n] / self.context_totals(n))
+
+    def write_arpa(self, path, logprobs=None, backoffs=None):
+        """
+        Write the tables in ARPA format.
+
+        logprobs / backoffs are {order: log10 array aligned to the rows}, the stored
+        ones or the unsmoothed MLE estimates (no backoff weights) when neither is given.
+        """
+        logprobs = logprobs or self.logprobs or {n: self.mle_log10_probs(n) for n in self.orders}
+        backoffs = backoffs or self.backoffs or {}
+        table = np.array(self.words, dtype=object)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n\\data\\\n")
+            for n in self.orders:
+                f.write(f"ngram {n}={len(self.ids[n])}\n")
+            for n in self.orders:
+                f.write(f"\n\\{n}-grams:\n")
+                grams = table[self.ids[n].astype(np.int64)].tolist()
+                probs = np.asarray(logprobs[n]).tolist()
+                if n in backoffs:
+                    for gram, p, b in zip(grams, probs, np.asarray(backoffs[n]).tolist()):
+                        f.write(f"{p:.6f}\t{' '.join(gram)}\t{b:.6f}\n")
+                else:
+                    for gram, p in zip(grams, probs):
+                        f.write(f"{p:.6f}\t{' '.join(gram)}\n")
+            f.write("\n\\end\\\n")
+
+    @classmethod
+    def read_arpa(cls, path):
+        # float32 log10 probs and backoffs (0 when an entry has none) per order
+        entries = {}
+        n = None
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("ngram ") or line == "\\data\\":
+                    continue
+                if line == "\\end\\":
+                    break
+                if line.startswith("\\") and line.endswith("-grams:"):
+                    n = int(line[1:-len("-grams:")])
+                    entries[n] = []
+                    continue
+                # "logprob <tab> w1 w2 ... [<tab> backoff]", some writers use spaces instead of tabs
+                parts = line.split()
+                gram = tuple(parts[1:1 + n])
+                backoff = float(parts[1 + n]) if len(parts) > 1 + n else 0.0
+                entries[n].append((gram, float(parts[0]), backoff))
+
+        words = sorted({w for rows in entries.values() for gram, _, _ in rows for w in gram})
+        word_index = {w: i for i, w in enumerate(words)}
+        ids, logprobs, backoffs = {}, {}, {}
+        for n, rows in entries.items():
+            grams = np.array([[word_index[w] for w in gram] for gram, _, _ in rows], dtype=ID_DTYPE).reshape(-1, n)
+            order = np.argsort(row_keys(grams), kind="stable")
+            ids[n] = grams[order]
+            logprobs[n] = np.array([p for _, p, _ in rows], dtype=np.float32)[order]
+            backoffs[n] = np.array([b for _, _, b in rows], dtype=np.float32)[order]
+        return cls(words, ids, logprobs=logprobs, backoffs=backoffs)
+
+
+if __name__ == "__main__":
+    # replace the LAB4 count csvs with one packed file, the order is read from the first row
+    # usage: python packed_lm.py ngram_counts.lm LAB4/unigram.csv LAB4/bigram.csv LAB4/trigram.csv LAB4/quadrigram.csv
+    out_path, csv_paths = sys.argv[1], sys.argv[2:]
+    counters = {}
+    for csv_path in csv_paths:
+        counter = read_count_csv(csv_path)
+        n = len(next(iter(counter))) if counter else 1
+        counters[n] = counter
+    PackedNgrams.from_counters(counters).save(out_path)
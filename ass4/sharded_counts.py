@@ -0,0 +1,184 @@
+import argparse
+import os
+import re
+import tempfile
+from collections import Counter
+from multiprocessing import Pool
+
+import numpy as np
+
+from packed_lm import ID_DTYPE, ORDER_NAMES, PackedNgrams, row_keys
+
+COLUMN_NAME = 'sentence'
+MERGE_BLOCK_ROWS = 1 << 18  # rows read from each shard file at a time while merging
+
+
+def gujarati_word_tokenizer(sentence):
+    # the tokenizer of q1.ipynb, which imports it from here so the pool workers and the
+    # single process counts use the same one
+    if not isinstance(sentence, str):
+        return []
+    sentence = re.sub(r'\s+', ' ', sentence.strip())
+
+    url_pattern = r'https?://\S+|www\.\S+'
+    email_pattern = r'\b[\w\.-]+@[\w\.-]+\.\w+\b'
+    date_pattern = r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b|\b\d{1,2}(?:st|nd|rd|th)?\s+\w+\s+\d{4}\b'
+    number_pattern = r'\b\d+(?:[\.,]\d+)?\b'
+    full_pattern = re.compile(
+        f'{url_pattern}|{email_pattern}|{date_pattern}|{number_pattern}|[a-zA-Z]+|[\u0A80-\u0AFF]+|[^\w\s]',
+        re.UNICODE
+    )
+    return re.findall(full_pattern, sentence)
+
+def generate_ngrams(tokens, n):
+    for i in range(len(tokens) - n + 1):
+        yield tuple(tokens[i:i+n])
+
+def sentence_text(value):
+    # a parquet cell as a sentence, nulls (None from pyarrow, NaN from pandas) are empty
+    # sentences, q1 reads every cell through this in both counting modes
+    if value is None or (isinstance(value, float) and value != value):
+        return ''
+    return str(value)
+
+def read_row_group(path, group, column=COLUMN_NAME):
+    # the sentences of one row group
+    import pyarrow.parquet as pq
+
+    table = pq.ParquetFile(path).read_row_group(group, columns=[column])
+    return [sentence_text(value) for value in table.column(0).to_pylist()]
+
+def num_rows(path):
+    import pyarrow.parquet as pq
+
+    return pq.ParquetFile(path).metadata.num_rows
+
+def read_rows(path, rows, column=COLUMN_NAME):
+    # the sentences at the given row numbers, in that order, reading one row group at a time
+    import pyarrow.parquet as pq
+
+    meta = pq.ParquetFile(path).metadata
+    starts = np.cumsum([0] + [meta.row_group(g).num_rows for g in range(meta.num_row_groups)])
+    rows = np.asarray(rows, dtype=np.int64)
+    groups = np.searchsorted(starts, rows, side="right") - 1
+    sentences = [None] * len(rows)
+    for group in np.unique(groups):
+        group_sentences = read_row_group(path, int(group), column)
+        for i in np.flatnonzero(groups == group):
+            sentences[i] = group_sentences[rows[i] - starts[group]]
+    return sentences
+
+def count_sentences(sentences):
+    # build_ngram_models of q1 on the raw sentences of one shard, returns (counts, total_tokens)
+    counts = {name: Counter() for name in ORDER_NAMES}
+    total_tokens = 0
+    for sentence in sentences:
+        sent = ['<s>', '<s>', '<s>'] + gujarati_word_tokenizer(sentence) + ['</s>']
+        total_tokens += len(sent)
+        counts['unigram'].update(sent)
+        for n, name in enumerate(ORDER_NAMES[1:], 2):
+            counts[name].update(generate_ngrams(sent, n))
+    return counts, total_tokens
+
+def count_shard(job):
+    # map step: count one row group and spill it as a sorted packed file
+    path, group, column, out_path = job
+    counts, total_tokens = count_sentences(read_row_group(path, group, column))
+    PackedNgrams.from_counters(counts).save(out_path)
+    return out_path, total_tokens
+
+def merge_order(shards, maps, n, block_rows=MERGE_BLOCK_ROWS):
+    """
+    k-way merge of the sorted order n tables of the shard files.
+
+    Each shard is read block_rows rows at a time (memory-mapped) and mapped to the
+    global vocabulary, which keeps it sorted. Every step takes the smallest last key
+    over the current blocks: no shard has rows at or below it outside its current
+    block, so those rows are final, they are sorted together and equal n-grams summed.
+    """
+    positions = [0] * len(shards)
+    blocks = [(np.zeros((0, n), dtype=ID_DTYPE), np.zeros(0, dtype=np.int64))] * len(shards)
+    out_ids, out_counts = [], []
+    while True:
+        for i, shard in enumerate(shards):
+            # refill blocks that were used up
+            if not len(blocks[i][1]) and positions[i] < len(shard.counts[n]):
+                end = positions[i] + block_rows
+                ids = maps[i][shard.ids[n][positions[i]:end].astype(np.int64)].astype(ID_DTYPE)
+                blocks[i] = (ids, np.asarray(shard.counts[n][positions[i]:end], dtype=np.int64))
+                positions[i] = min(end, len(shard.counts[n]))
+        live = [i for i, shard in enumerate(shards) if len(blocks[i][1])]
+        if not live:
+            break
+        pending = [i for i in live if positions[i] < len(shards[i].counts[n])]
+        bound = np.sort(np.concatenate([row_keys(blocks[i][0][-1:]) for i in pending]))[0] if pending else None
+        take_ids, take_counts = [], []
+        for i in live:
+            ids, counts = blocks[i]
+            cut = len(counts) if bound is None else np.searchsorted(row_keys(ids), bound, side="right")
+            take_ids.append(ids[:cut])
+            take_counts.append(counts[:cut])
+            blocks[i] = (ids[cut:], counts[cut:])
+        ids = np.concatenate(take_ids)
+        counts = np.concatenate(take_counts)
+        order = np.argsort(row_keys(ids), kind="stable")
+        ids, counts = ids[order], counts[order]
+        starts = np.flatnonzero(np.r_[True, (ids[1:] != ids[:-1]).any(axis=1)])
+        out_ids.append(ids[starts])
+        out_counts.append(np.add.reduceat(counts, starts))
+    if not out_ids:
+        return np.zeros((0, n), dtype=ID_DTYPE), np.zeros(0, dtype=np.int64)
+    # concatenate gives native byte order, the packed rows are big endian
+    return np.concatenate(out_ids).astype(ID_DTYPE), np.concatenate(out_counts)
+
+def merge_shards(paths, block_rows=MERGE_BLOCK_ROWS):
+    # reduce step: one PackedNgrams over the global (sorted) vocabulary of all shard files
+    shards = [PackedNgrams.load(path) for path in paths]
+    words = sorted({w for shard in shards for w in shard.words})
+    word_index = {w: i for i, w in enumerate(words)}
+    maps = [np.array([word_index[w] for w in shard.words], dtype=np.int64) for shard in shards]
+    ids, counts = {}, {}
+    for n in range(1, len(ORDER_NAMES) + 1):
+        ids[n], counts[n] = merge_order(shards, maps, n, block_rows)
+    return PackedNgrams(words, ids, counts)
+
+def count_ngrams_sharded(path, column=COLUMN_NAME, workers=None, spill_dir=None, block_rows=MERGE_BLOCK_ROWS):
+    """
+    build_ngram_models for a Parquet sentence file as map-reduce over its row groups.
+
+    A process pool tokenizes and counts one row group per job and spills it as a
+    sorted packed count file, then merge_shards sums them with a k-way merge. Only
+    one row group per worker and one block per shard are in memory besides the
+    final tables, write the Parquet file with smaller row groups for more shards.
+    Returns (PackedNgrams, total_tokens), the counts equal the single process Counters.
+    The shard files go to a temporary directory unless spill_dir is given.
+    """
+    import pyarrow.parquet as pq
+
+    workers = workers or os.cpu_count() or 1
+    n_groups = pq.ParquetFile(path).num_row_groups
+    with tempfile.TemporaryDirectory() as tmp:
+        out_dir = spill_dir or tmp
+        os.makedirs(out_dir, exist_ok=True)
+        jobs = [(path, group, column, os.path.join(out_dir, f"shard_{group:05d}.lm")) for group in range(n_groups)]
+        if workers == 1:
+            results = list(map(count_shard, jobs))
+        else:
+            with Pool(min(workers, max(1, n_groups))) as pool:
+                results = list(pool.imap(count_shard, jobs))
+        packed = merge_shards([shard_path for shard_path, _ in results], block_rows)
+    return packed, sum(tokens for _, tokens in results)
+
+
+if __name__ == "__main__":
+    # usage: python sharded_counts.py ../ass1/gujarati_sentence_tokenized.parquet ngram_counts.lm --workers 8
+    parser = argparse.ArgumentParser()
+    parser.add_argument("parquet")
+    parser.add_argument("out")
+    parser.add_argument("--column", default=COLUMN_NAME)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--spill-dir", default=None)
+    args = parser.parse_args()
+    packed, total_tokens = count_ngrams_sharded(args.parquet, args.column, args.workers, args.spill_dir)
+    packed.save(args.out)
+    print(f"{total_tokens} tokens, rows per order: {[len(packed.ids[n]) for n in packed.orders]}")
@@ -0,0 +1,212 @@
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from packed_lm import row_keys
+
+# one order of a smoothed model, arrays aligned to packed.ids[n]
+GoodTuring = namedtuple("GoodTuring", ["probs", "unseen"])
+# probs of the rows (interpolated with the lower orders), backoff weight of every context
+# (one per run of rows sharing the first n - 1 words) and the sorted context keys
+KneserNey = namedtuple("KneserNey", ["probs", "backoffs", "contexts", "discount"])
+
+
+class SmoothedModel:
+    """
+    Good-Turing and interpolated Kneser-Ney probabilities over a PackedNgrams table.
+
+    Nothing is computed up front: the table of an order is built the first time it is
+    used and cached, along with the count-of-counts and discounts it needs. Every
+    table is an array aligned to the packed rows (float32 by default, pass
+    dtype=np.float64 for the exact notebook numbers), so a probability is a
+    searchsorted instead of a dict entry per n-gram. build_stats has the build time
+    and array size of every table that was built.
+    """
+
+    def __init__(self, packed, dtype=np.float32):
+        self.packed = packed
+        self.dtype = np.dtype(dtype)
+        self.vocab_size = len(packed.ids[1])
+        self.build_stats = {}
+        self._cache = {}
+
+    def _cached(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def _timed(self, key, build):
+        # only the table itself is timed, callers build what it depends on first
+        start = time.perf_counter()
+        table = build()
+        seconds = time.perf_counter() - start
+        nbytes = sum(a.nbytes for a in table if isinstance(a, np.ndarray))
+        self.build_stats[key] = (seconds, nbytes)
+        return table
+
+    def count_of_counts(self, n, continuation=False):
+        # (c, N_c) of the nonzero counts of order n, the raw counts or the continuation counts
+        def build():
+            counts = self.kn_counts(n, highest=False) if continuation else self.packed.counts[n]
+            return np.unique(counts[counts > 0], return_counts=True)
+        return self._cached(("coc", n, continuation), build)
+
+    def good_turing(self, n):
+        """
+        Good-Turing table of order n, like good_turing_probs of Lab 5 task23.
+
+        c* = (c + 1) N_{c+1} / N_c for every row, divided by the total count, and the
+        probability of an unseen n-gram (N1 / N) / (V^n - rows).
+        """
+        def build():
+            counts = self.packed.counts[n]
+            total = int(counts.sum())
+            values, freq = self.count_of_counts(n)
+            n_c = freq[np.searchsorted(values, counts)]
+            next_pos = np.minimum(np.searchsorted(values, counts + 1), len(values) - 1)
+            n_c1 = np.where(values[next_pos] == counts + 1, freq[next_pos], 0)
+            c_star = (counts + 1) * n_c1 / n_c
+            n1 = int(freq[0]) if len(values) and values[0] == 1 else 0
+            unseen = self.vocab_size - len(counts) if n == 1 else self.vocab_size**n - len(counts)
+            return GoodTuring((c_star / total).astype(self.dtype), (n1 / total) / max(1, unseen))
+
+        if ("gt", n) not in self._cache:
+            self.count_of_counts(n)
+        return self._cached(("gt", n), lambda: self._timed(("good_turing", n), build))
+
+    def kn_counts(self, n, highest):
+        """
+        Counts Kneser-Ney uses for order n: the raw counts for the highest order of the
+        model, otherwise the continuation counts N1+(. w1..wn), the number of distinct
+        words seen before the n-gram (rows of order n + 1 ending with it).
+        """
+        if highest or n + 1 not in self.packed.ids:
+            return self.packed.counts[n]
+
+        def build():
+            pos, found = self.packed.find(self.packed.ids[n + 1][:, 1:])
+            return np.bincount(pos[found], minlength=len(self.packed.ids[n])).astype(np.int64)
+        return self._cached(("continuation", n), build)
+
+    def discount(self, n, highest=False):
+        # absolute discount D = N1 / (N1 + 2 N2) of the counts Kneser-Ney uses for order n
+        def build():
+            counts = self.kn_counts(n, highest)
+            n1 = int((counts == 1).sum())
+            n2 = int((counts == 2).sum())
+            return n1 / (n1 + 2 * n2) if n1 + n2 else 0.0
+        return self._cached(("discount", n, highest), build)
+
+    def discounts(self, top):
+        # the discount of every order of a top-order model, index = order
+        return np.array([0.0] + [self.discount(n, n == top) for n in range(1, top + 1)])
+
+    def kneser_ney(self, n, highest=True):
+        """
+        Interpolated Kneser-Ney table of order n.
+
+        P(w | h) = max(c(h w) - D, 0) / c(h) + D N1+(h .) / c(h) * P(w | h'), h' is h
+        without its first word and c the raw counts for the highest order, continuation
+        counts below. Unigrams interpolate with the uniform 1 / V. A context whose
+        counts are all 0 backs off with weight 1.
+        """
+        key = ("kn", n, highest)
+        if key not in self._cache:
+            # dependencies first, so build_stats times only this order
+            if n > 1:
+                self.kneser_ney(n - 1, highest=False)
+            self.kn_counts(n, highest)
+            self.discount(n, highest)
+        return self._cached(key, lambda: self._timed(("kneser_ney", n, highest), lambda: self._build_kn(n, highest)))
+
+    def _build_kn(self, n, highest):
+        ids = self.packed.ids[n]
+        counts = self.kn_counts(n, highest)
+        d = self.discount(n, highest)
+        starts = self.packed.context_starts(n) if n > 1 else np.zeros(min(1, len(ids)), dtype=np.int64)
+        sizes = np.diff(np.r_[starts, len(ids)])
+        if len(ids):
+            totals = np.add.reduceat(counts, starts)
+            types = np.add.reduceat((counts > 0).astype(np.int64), starts)
+        else:
+            totals = types = np.zeros(0, dtype=np.int64)
+        backoffs = np.where(totals > 0, d * types / np.maximum(totals, 1), 1.0)
+        row_totals = np.repeat(totals, sizes)
+        discounted = np.where(row_totals > 0, np.maximum(counts - d, 0) / np.maximum(row_totals, 1), 0.0)
+        if n == 1:
+            lower = 1.0 / self.vocab_size
+        else:
+            lower = self.kn_prob(ids[:, 1:], highest=False)
+        probs = discounted + np.repeat(backoffs, sizes) * lower
+        contexts = row_keys(ids[starts, :-1]) if n > 1 else None
+        return KneserNey(probs.astype(self.dtype), backoffs.astype(self.dtype), contexts, d)
+
+    def kn_prob(self, ids, highest=True):
+        """
+        Kneser-Ney probability of a (k, n) array of id rows under the order n model.
+
+        Rows in the table read their stored probability, unseen rows are the backoff
+        weight of their context times the probability one order down.
+        """
+        ids = np.asarray(ids)
+        n = ids.shape[1]
+        table = self.kneser_ney(n, highest)
+        pos, found = self.packed.find(ids)
+        if n == 1:
+            lower = np.full(len(ids), float(table.backoffs[0]) / self.vocab_size if len(table.backoffs) else 0.0)
+            return np.where(found, table.probs[pos], lower)
+        lower = self.kn_prob(ids[:, 1:], highest=False)
+        weights = np.ones(len(ids))
+        if len(table.contexts):
+            query = row_keys(ids[:, :-1])
+            cpos = np.minimum(np.searchsorted(table.contexts, query), len(table.contexts) - 1)
+            weights = np.where(table.contexts[cpos] == query, table.backoffs[cpos], 1.0)
+        return np.where(found, table.probs[pos], weights * lower)
+
+    def arpa_tables(self, top=None):
+        """
+        log10 probs and backoffs of the Kneser-Ney model for PackedNgrams.write_arpa.
+
+        The backoff of an (n - 1)-gram is the weight of it as a context of order n,
+        0 (weight 1) when it is never one.
+        """
+        top = top or max(self.packed.orders)
+        logprobs, backoffs = {}, {}
+        for n in range(1, top + 1):
+            logprobs[n] = np.log10(self.kneser_ney(n, n == top).probs)
+            backoffs[n] = np.zeros(len(self.packed.ids[n]), dtype=self.dtype)
+        for n in range(2, top + 1):
+            table = self.kneser_ney(n, n == top)
+            starts = self.packed.context_starts(n)
+            pos, found = self.packed.find(self.packed.ids[n][starts, :-1])
+            backoffs[n - 1][pos[found]] = np.log10(table.backoffs[found])
+        return logprobs, backoffs
+
+    def interpolation_lambdas(self, min_count=2):
+        """
+        estimate_lambdas of Lab 5 task4 on the top order rows, computed once.
+
+        Every n-gram seen at least min_count times votes, with its count, for the order
+        whose leave-one-out estimate is the largest (first one on ties), the top order
+        first. The weights are the vote shares.
+        """
+        def build():
+            top = max(self.packed.orders)
+            counts = self.packed.counts[top]
+            keep = counts >= min_count
+            rows = self.packed.ids[top][keep]
+            votes = counts[keep]
+            lookup = self.packed.lookup
+            estimates = [(votes - 1) / np.maximum(1, lookup(rows[:, :-1]) - 1)]
+            for m in range(top - 1, 1, -1):
+                tail = rows[:, top - m:]
+                estimates.append(lookup(tail) / np.maximum(1, lookup(tail[:, :-1]) - 1))
+            estimates.append(lookup(rows[:, -1:]) / int(self.packed.counts[1].sum()))
+            best = np.argmax(np.stack(estimates), axis=0) if len(votes) else np.zeros(0, dtype=np.int64)
+            lambda_counts = [int(votes[best == i].sum()) for i in range(top)]
+            total = sum(lambda_counts)
+            if total == 0:
+                return [1 / top] * top
+            return [c / total for c in lambda_counts]
+        return self._cached(("lambdas", min_count), build)